@@ -0,0 +1,348 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from statistics import median
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pytest
+
+from benchmarks.stand_in_app import StandInApp
+from src.utils.perf_report import percentile
+
+CASES_DIR = "benchmarks/cases"
+RESULTS_DIR = os.path.join("reports", "benchmarks")
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+BENCH_USERNAME = "bench_user"
+BENCH_PASSWORD = "bench_pass"
+# 越大越好的指标，其余指标越小越好
+HIGHER_IS_BETTER = ("cases_per_minute", "per_second")
+# 冷启动预算（毫秒，已扣除空解释器的启动耗时），超出时退出码为1，与是否有基线无关
+STARTUP_BUDGET_MS = {"import": 800, "collect_only": 1500}
+# 导入框架和收集用例时不应加载的依赖，只在用到对应功能（启动浏览器、生成随机数据、视觉对比等）时导入
+LAZY_MODULES = ("playwright", "faker", "selenium", "numpy", "PIL", "psutil", "allure")
+# 已安装的pytest插件在pytest启动时导入、框架无法推迟的依赖（allure-pytest插件导入allure），只在对应阶段豁免
+PLUGIN_MODULES = {"collect_only": ("allure",)}
+# 冷启动子进程结束前输出已加载的重量级依赖
+_LAZY_PROBE = ("import json, sys; "
+               f"print('LAZY_LOADED=' + json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))")
+
+
+def _summary(samples: List[float], scale: float = 1000) -> Dict[str, float]:
+    """耗时样本(秒)的p50/p95/max，默认换算为毫秒"""
+    ordered = sorted(samples)
+    return {"p50": percentile(ordered, 50) * scale, "p95": percentile(ordered, 95) * scale,
+            "max": ordered[-1] * scale}
+
+
+def _timeit(func: Callable, iterations: int) -> List[float]:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+class PeakMemory:
+    """采样浏览器子进程的RSS峰值（需安装psutil），Python进程峰值取自getrusage"""
+
+    def __init__(self):
+        try:
+            import psutil
+            self._process = psutil.Process()
+        except ImportError:
+            self._process = None
+        self.browser_peak_mb = 0.0
+
+    def sample(self) -> None:
+        if self._process is None:
+            return
+        total = 0
+        for child in self._process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except Exception:
+                continue
+        self.browser_peak_mb = max(self.browser_peak_mb, total / 1024 / 1024)
+
+    @staticmethod
+    def python_peak_mb() -> Optional[float]:
+        try:
+            import resource
+        except ImportError:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux单位为KB，macOS为字节
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+class PhaseCollector:
+    """收集每个用例setup/call/teardown阶段耗时的pytest插件"""
+
+    def __init__(self):
+        self.phases: Dict[str, List[float]] = {"setup": [], "call": [], "teardown": []}
+        self.passed = 0
+        self.failed = 0
+
+    def pytest_runtest_logreport(self, report):
+        self.phases[report.when].append(report.duration)
+        if report.when == "call":
+            if report.passed:
+                self.passed += 1
+            else:
+                self.failed += 1
+
+
+def bench_actions(config, iterations: int, memory: PeakMemory) -> Dict[str, float]:
+    """BasePage各动作的延迟，以及run_step相对直接调用页面对象方法的分发开销"""
+    from src.driver import Driver
+    from src.execution_plan import compile_step
+    from src.page_objects import PAGE_OBJECT_MAP
+    from src.test_case_runner import TestCaseRunner
+    from src.utils.locator_parser import LocatorParser
+
+    metrics = {}
+    driver = Driver(config)
+    page = driver.start()
+    try:
+        search_page = PAGE_OBJECT_MAP["search_page"](page, LocatorParser(), config)
+        search_page.load()
+        memory.sample()
+        actions = {
+            "load": search_page.load,
+            "fill": lambda: search_page.fill("test keyword", "search_input"),
+            "click": lambda: search_page.click("search_button"),
+            "get_text": lambda: search_page.get_text("no_results_message"),
+            "is_visible": lambda: search_page.is_visible("results_container"),
+        }
+        for name, action in actions.items():
+            action()
+            for stat, value in _summary(_timeit(action, iterations)).items():
+                metrics[f"action.{name}.{stat}_ms"] = value
+        memory.sample()
+
+        runner = TestCaseRunner(page, config, search_page)
+        step = compile_step({"action": "call_method", "args": ["get_search_result_count"],
+                             "description": "获取搜索结果数量"}, type(search_page), config)
+        direct = _timeit(search_page.get_search_result_count, iterations)
+        dispatched = _timeit(lambda: runner.run_step(step), iterations)
+        metrics["dispatch.run_step_overhead_us"] = (median(dispatched) - median(direct)) * 1e6
+    finally:
+        driver.stop()
+    return metrics
+
+
+def bench_suite(app_url: str, workers: int) -> Dict[str, float]:
+    """以指定worker数运行基准用例，统计每分钟用例数；单worker时在进程内运行并统计fixture耗时"""
+    pytest_args = [f"{CASES_DIR}/", f"--base-url={app_url}", "--headless=true", "-q", "-p", "no:cacheprovider",
+                   f"--alluredir={os.path.join(RESULTS_DIR, 'allure-results')}"]
+    metrics = {}
+    started = time.perf_counter()
+    if workers == 1:
+        collector = PhaseCollector()
+        pytest.main(pytest_args, plugins=[collector])
+        case_count = collector.passed + collector.failed
+        for phase in ("setup", "teardown"):
+            if collector.phases[phase]:
+                for stat, value in _summary(collector.phases[phase]).items():
+                    metrics[f"fixture.{phase}.{stat}_ms"] = value
+    else:
+        from pytest_runner import run_parallel
+        from src.sharding import discover_case_ids
+        from src.utils.config_parser import ConfigParser
+        run_parallel(workers, pytest_args, ConfigParser(), CASES_DIR)
+        case_count = len(discover_case_ids(CASES_DIR))
+    wall_time = time.perf_counter() - started
+    metrics[f"suite.workers_{workers}.cases_per_minute"] = case_count / wall_time * 60 if wall_time else 0.0
+    return metrics
+
+
+def bench_visual(iterations: int, width: int = 1280, height: int = 4000) -> Dict[str, float]:
+    """视觉对比吞吐量：整页尺寸的合成截图，分别测量字节一致跳过、逐像素对比和完整check的耗时"""
+    try:
+        import numpy
+    except ImportError:
+        print("未安装numpy/Pillow，跳过视觉对比基准")
+        return {}
+    from src.utils.visual import VisualEngine, decode_image, diff_pixels, encode_png
+
+    # 白底上的若干色块模拟页面布局，变化版本改动一小块区域
+    rng = numpy.random.default_rng(0)
+    baseline = numpy.full((height, width, 3), 255, dtype=numpy.uint8)
+    for top in range(0, height - 200, 300):
+        baseline[top:top + 200, 40:width - 40] = rng.integers(0, 256, 3, dtype=numpy.uint8)
+    changed = baseline.copy()
+    changed[height // 2:height // 2 + 40, 100:400] = 0
+    baseline_png, changed_png = encode_png(baseline), encode_png(changed)
+    masks = [{"x": 0, "y": 0, "width": width, "height": 80}]
+
+    metrics = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        engine = VisualEngine(os.path.join(temp_dir, "baselines"), index_dir=os.path.join(temp_dir, "index"))
+        engine.check("bench", "page", baseline_png)
+        decoded = decode_image(changed_png)
+        timings = {
+            "bytes_skip": _timeit(lambda: engine.check("bench", "page", baseline_png), iterations),
+            "pixel_diff": _timeit(lambda: diff_pixels(decoded, baseline, masks), iterations),
+            "check_changed": _timeit(lambda: engine.check("bench", "page", changed_png, masks), iterations),
+        }
+    for name, samples in timings.items():
+        metrics[f"visual.{name}.p50_ms"] = percentile(sorted(samples), 50) * 1000
+        metrics[f"visual.{name}.per_second"] = 1 / median(samples)
+    metrics["visual.pixel_diff.megapixels_per_second"] = width * height / 1e6 / median(timings["pixel_diff"])
+    return metrics
+
+
+def _cold_run(code: str) -> Tuple[float, List[str]]:
+    """在新的Python进程中执行代码，返回(耗时秒, 已加载的重量级依赖)"""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    probe = [line for line in result.stdout.splitlines() if line.startswith("LAZY_LOADED=")]
+    if result.returncode not in (0, pytest.ExitCode.NO_TESTS_COLLECTED) or not probe:
+        raise RuntimeError(f"冷启动子进程执行失败（退出码 {result.returncode}）:\n{result.stdout[-2000:]}{result.stderr[-2000:]}")
+    return elapsed, json.loads(probe[-1].split("=", 1)[1])
+
+
+def bench_startup(runs: int) -> Tuple[Dict[str, float], Dict[str, List[str]]]:
+    """冷启动耗时：新进程中导入conftest（框架全部模块）、--collect-only收集基准用例（含预检查），
+    扣除空解释器启动耗时；同时返回各阶段提前加载的重量级依赖"""
+    interpreter = median(_cold_run(_LAZY_PROBE)[0] for _ in range(runs))
+    phases = {
+        "import": f"import conftest; {_LAZY_PROBE}",
+        "collect_only": (f"import pytest, sys; code = pytest.main(['--collect-only', '-q', '-p', 'no:cacheprovider', "
+                         f"{CASES_DIR!r}]); {_LAZY_PROBE}; sys.exit(code)"),
+    }
+    metrics = {"startup.interpreter.p50_ms": interpreter * 1000}
+    loaded = {}
+    for phase, code in phases.items():
+        samples = []
+        for _ in range(runs):
+            elapsed, modules = _cold_run(code)
+            samples.append(max(elapsed - interpreter, 0.0))
+        metrics[f"startup.{phase}.p50_ms"] = median(samples) * 1000
+        metrics[f"startup.{phase}.max_ms"] = max(samples) * 1000
+        loaded[phase] = [module for module in modules if module not in PLUGIN_MODULES.get(phase, ())]
+    return metrics, loaded
+
+
+def check_startup_budget(metrics: Dict[str, float], loaded: Dict[str, List[str]],
+                         budgets: Dict[str, float]) -> List[str]:
+    """冷启动超出预算或提前加载了重量级依赖时返回问题列表"""
+    problems = []
+    for phase, budget in budgets.items():
+        value = metrics.get(f"startup.{phase}.p50_ms")
+        if value is not None and value > budget:
+            problems.append(f"startup.{phase}: p50 {value:.0f}ms 超出预算 {budget:.0f}ms")
+    for phase, modules in loaded.items():
+        if modules:
+            problems.append(f"startup.{phase}: 提前加载了 {', '.join(modules)}，应在使用时再导入")
+    return problems
+
+
+def compare_with_baseline(metrics: Dict[str, float], baseline: Dict[str, Any],
+                          threshold: float) -> List[Dict[str, Any]]:
+    """与基线对比，返回变差超过阈值（相对比例）的指标"""
+    regressions = []
+    for name, base_value in baseline.get("metrics", {}).items():
+        current = metrics.get(name)
+        if current is None or not base_value:
+            continue
+        change = (current - base_value) / abs(base_value)
+        if name.endswith(HIGHER_IS_BETTER):
+            change = -change
+        if change > threshold:
+            regressions.append({"metric": name, "baseline": base_value, "current": current, "change": change})
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="在本地替身站点上测量框架自身开销，并与基线对比")
+    parser.add_argument("--iterations", type=int, default=30, help="每个动作的测量次数")
+    parser.add_argument("--workers", default="1,2,4", help="吞吐量测试的worker数列表，逗号分隔")
+    parser.add_argument("--output", help="结果JSON路径，默认：reports/benchmarks/<时间>.json")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基线JSON路径")
+    parser.add_argument("--threshold", type=float, default=0.2, help="回归阈值，指标变差超过该比例视为回归")
+    parser.add_argument("--update-baseline", action="store_true", help="把本次结果写为新的基线")
+    parser.add_argument("--visual-only", action="store_true", help="只运行视觉对比基准（不需要浏览器）")
+    parser.add_argument("--startup-only", action="store_true", help="只运行冷启动基准（不需要浏览器）")
+    parser.add_argument("--startup-runs", type=int, default=5, help="冷启动测量次数，取中位数")
+    parser.add_argument("--import-budget-ms", type=float, default=STARTUP_BUDGET_MS["import"],
+                        help="导入框架的冷启动预算（毫秒）")
+    parser.add_argument("--collect-budget-ms", type=float, default=STARTUP_BUDGET_MS["collect_only"],
+                        help="--collect-only收集基准用例的冷启动预算（毫秒）")
+    args = parser.parse_args()
+
+    # 配置在首次创建时读取环境变量，需在导入配置前设置
+    os.environ["UI_AUTOMATION_LOGIN_USERNAME"] = BENCH_USERNAME
+    os.environ["UI_AUTOMATION_LOGIN_PASSWORD"] = BENCH_PASSWORD
+    from src.utils.config_parser import ConfigParser
+
+    memory = PeakMemory()
+    config = ConfigParser()
+    metrics, startup_problems = {}, []
+    if not args.visual_only:
+        startup_metrics, loaded = bench_startup(args.startup_runs)
+        metrics.update(startup_metrics)
+        startup_problems = check_startup_budget(startup_metrics, loaded, {"import": args.import_budget_ms,
+                                                                          "collect_only": args.collect_budget_ms})
+    if not args.startup_only:
+        metrics.update(bench_visual(args.iterations))
+    if not args.visual_only and not args.startup_only:
+        with StandInApp(password=BENCH_PASSWORD) as app:
+            config.update_from_cli({"base_url": app.url, "headless": True})
+            metrics.update(bench_actions(config, args.iterations, memory))
+            for workers in (int(value) for value in args.workers.split(",")):
+                metrics.update(bench_suite(app.url, workers))
+
+    python_peak = memory.python_peak_mb()
+    if python_peak is not None:
+        metrics["rss.python_peak_mb"] = python_peak
+    if memory.browser_peak_mb:
+        metrics["rss.browser_peak_mb"] = memory.browser_peak_mb
+
+    results = {
+        "meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+                 "platform": platform.platform(), "browser": config.get("browser"), "iterations": args.iterations},
+        "metrics": metrics,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print(f"\n基准测试结果: {output}")
+    for name, value in sorted(metrics.items()):
+        print(f"  {name:<48}{value:>12.2f}")
+
+    exit_code = 0
+    if startup_problems:
+        exit_code = 1
+        print("\n冷启动预算:")
+        for problem in startup_problems:
+            print(f"  {problem}")
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_with_baseline(metrics, json.load(f), args.threshold)
+        if regressions:
+            exit_code = 1
+            print(f"\n性能回归（阈值 {args.threshold:.0%}）:")
+            for item in regressions:
+                print(f"  {item['metric']}: {item['baseline']:.2f} -> {item['current']:.2f} ({item['change']:+.0%})")
+        else:
+            print(f"\n未发现超过 {args.threshold:.0%} 的性能回归（基线: {args.baseline}）")
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"已更新基线: {args.baseline}")
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# 与config/locators.yaml中login_page/search_page定位器一致的替身页面
+LOGIN_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>登录</title></head>
+<body>
+  <form onsubmit="return false">
+    <input name="username" type="text">
+    <input name="password" type="password">
+    <button id="submit-login" type="button">登录</button>
+  </form>
+  <div class="error-message" hidden>用户名或密码错误</div>
+  <div class="success-message" hidden>登录成功</div>
+  <script>
+    document.getElementById("submit-login").addEventListener("click", async () => {
+      const body = JSON.stringify({
+        username: document.querySelector("input[name='username']").value,
+        password: document.querySelector("input[name='password']").value
+      });
+      const result = await (await fetch("/api/login", {method: "POST", body})).json();
+      document.querySelector(".success-message").hidden = !result.ok;
+      document.querySelector(".error-message").hidden = result.ok;
+    });
+  </script>
+</body></html>
+"""
+
+SEARCH_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>搜索</title></head>
+<body>
+  <input id="search-box" type="text">
+  <button id="search-btn" type="button">搜索</button>
+  <div class="results-container" hidden></div>
+  <p class="no-results" hidden>没有找到相关结果</p>
+  <script>
+    document.getElementById("search-btn").addEventListener("click", async () => {
+      const keyword = document.getElementById("search-box").value;
+      const results = await (await fetch("/api/search?q=" + encodeURIComponent(keyword))).json();
+      const container = document.querySelector(".results-container");
+      container.innerHTML = results.map(r => `<div class="result-item">${r}</div>`).join("");
+      container.hidden = results.length === 0;
+      document.querySelector(".no-results").hidden = results.length > 0;
+    });
+  </script>
+</body></html>
+"""
+
+
+class StandInApp:
+    """本地替身站点：提供登录页和搜索页，用于在不依赖真实环境的情况下测量框架自身开销"""
+
+    def __init__(self, password: str, host: str = "127.0.0.1", port: int = 0, result_count: int = 5):
+        self.password = password
+        self.result_count = result_count
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stand-in-app", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StandInApp":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "StandInApp":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def search(self, keyword: str) -> list:
+        """空关键字或包含invalid的关键字无结果"""
+        if not keyword.strip() or "invalid" in keyword:
+            return []
+        return [f"{keyword} 结果 {index}" for index in range(1, self.result_count + 1)]
+
+    def _handler_class(self):
+        app = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/login":
+                    self._send(200, LOGIN_HTML, "text/html")
+                elif url.path == "/search":
+                    self._send(200, SEARCH_HTML, "text/html")
+                elif url.path == "/api/search":
+                    keyword = parse_qs(url.query).get("q", [""])[0]
+                    self._send(200, json.dumps(app.search(keyword), ensure_ascii=False), "application/json")
+                else:
+                    self._send(404, "not found", "text/plain")
+
+            def do_POST(self):
+                if urlparse(self.path).path != "/api/login":
+                    self._send(404, "not found", "text/plain")
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                ok = bool(body.get("username")) and body.get("password") == app.password
+                self._send(200, json.dumps({"ok": ok}), "application/json")
+
+            def _send(self, status: int, body: str, content_type: str) -> None:
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
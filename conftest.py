@@ -1,36 +1,119 @@
+import json
 import os
+import time
 from typing import Any
 import pytest
+from src.auth_cache import AuthStateCache
+from src.browser_pool import BrowserPool
 from src.driver import Driver
+from src.preflight import Preflight, format_issues
 from src.test_case_runner import TestCaseRunner
-from src.utils.config_parser import ConfigParser
+from src.readiness import readiness_stats
+from src.result_cache import BUILD_ID_ENV, CaseFingerprint, ResultCache, ResultCachePlugin
+from src.timing_db import TimingDB, TimingRecorder
+from src.utils.artifacts import ArtifactPipeline
+from src.utils.config_parser import ConfigParser, parse_browser_list
+from src.utils.data_generator import DataEngine
 from src.utils.locator_parser import LocatorParser
-from src.page_objects.login_page import LoginPage
-from src.page_objects.search_page import SearchPage
+from src.utils.perf import recorder
+from src.utils.perf_report import build_report
+from src.page_objects import PAGE_OBJECT_MAP
+from src.yaml_collector import YamlFile, YamlItem, is_case_file
 
-# 页面类映射，根据测试用例yaml文件中的page_object参数创建实例
-PAGE_OBJECT_MAP = {
-    "login_page": LoginPage,
-    "search_page": SearchPage,
-}
+# 基准测试用例只由benchmarks/run_benchmarks.py显式运行
+collect_ignore = ["benchmarks"]
+
+# 浏览器池指标，在会话结束时输出到终端摘要
+BROWSER_POOL_METRICS = pytest.StashKey[dict]()
+# 截图流水线统计
+ARTIFACT_STATS = pytest.StashKey[dict]()
+# 各用例的网络路由统计
+ROUTING_TOTALS = pytest.StashKey[list]()
+# 已合并命令行参数的配置，收集阶段和fixture共用
+CONFIG_PARSER = pytest.StashKey[ConfigParser]()
+# 用例执行阶段是否失败
+CASE_FAILED = pytest.StashKey[bool]()
+# 本次运行的测试数据种子
+DATA_SEED = pytest.StashKey[str]()
+# 浏览器矩阵，未指定--browsers时为空
+MATRIX_BROWSERS = pytest.StashKey[list]()
+# 本次会话中从步骤断点恢复的记录
+CHECKPOINT_RETRIES = pytest.StashKey[list]()
+# 预检查失败信息：会话中还有非YAML用例时只让YAML用例失败，不终止整个运行
+PREFLIGHT_FAILURE = pytest.StashKey[str]()
+
+def _attach_json(body: str, name: str) -> None:
+    """JSON附件写入报告；allure只在执行用例时用到，收集阶段不加载"""
+    import allure
+    allure.attach(body, name=name, attachment_type=allure.attachment_type.JSON)
 
 @pytest.fixture(scope="session")
-def config():
+def config(pytestconfig):
     """全局config Fixture"""
-    return ConfigParser()
+    return pytestconfig.stash[CONFIG_PARSER]
 
 @pytest.fixture(scope="session")
 def locator_parser():
-    """定位器解析器Fixture"""
+    """定位器解析器Fixture，定位器文件每个进程只加载一次"""
     return LocatorParser()
 
+@pytest.fixture(scope="session")
+def browser_pool(config, pytestconfig):
+    """浏览器池Fixture，每个worker进程只启动一次浏览器"""
+    pool = BrowserPool.from_config(config)
+    yield pool
+    pytestconfig.stash[BROWSER_POOL_METRICS] = pool.metrics()
+    pool.close()
+
+@pytest.fixture(scope="session")
+def artifact_pipeline(config, pytestconfig):
+    """截图流水线Fixture，会话结束时等待后台线程写完"""
+    pipeline = ArtifactPipeline.shared(config)
+    yield pipeline
+    pipeline.close()
+    pytestconfig.stash[ARTIFACT_STATS] = pipeline.stats()
+
+@pytest.fixture(scope="session")
+def data_engine(config, pytestconfig):
+    """测试数据引擎Fixture，Faker每个进程只创建一次"""
+    engine = DataEngine.shared(config)
+    pytestconfig.stash[DATA_SEED] = engine.seed
+    return engine
+
+@pytest.fixture(scope="session")
+def auth_cache(config, locator_parser):
+    """登录态缓存Fixture"""
+    return AuthStateCache(config, locator_parser)
+
+@pytest.fixture(scope="function")
+def case_config(config, request):
+    """当前用例的配置，浏览器矩阵中browser为item的浏览器"""
+    return getattr(request.node, "case_config", config)
+
 @pytest.fixture(scope="function")
-def driver(config):
-    """浏览器驱动Fixture，每个测试函数创建一个新实例"""
-    driver = Driver(config)
-    driver.start()
-    yield driver
-    driver.stop()
+def driver(case_config, browser_pool, auth_cache, request):
+    """浏览器驱动Fixture，每个测试函数从浏览器池获取独立的上下文和页面"""
+    driver = Driver(case_config, pool=browser_pool, auth_cache=auth_cache)
+    # 用例声明auth: <profile>时，上下文直接带上缓存的登录态
+    case_params = getattr(request.node, "params", None) or {}
+    # 用例期间的耗时记录归属当前用例
+    with recorder.case(request.node.nodeid):
+        driver.start(auth=case_params.get("auth"), case_id=request.node.nodeid,
+                     browser=getattr(request.node, "browser", None))
+        yield driver
+        driver.stop()
+
+    # 步骤耗时（含Playwright调用次数）写入报告
+    case_records = recorder.case_records(request.node.nodeid)
+    if case_records:
+        _attach_json(json.dumps(case_records, ensure_ascii=False, indent=2), "步骤耗时")
+
+    # 网络路由统计（屏蔽/回放请求数、节省字节数）写入报告
+    if driver.router.enabled:
+        routing = driver.routing_stats.to_dict()
+        request.node.user_properties.append(("routing", routing))
+        _attach_json(json.dumps(routing, ensure_ascii=False), "网络路由统计")
+        request.config.stash.setdefault(ROUTING_TOTALS, []).append(routing)
 
 @pytest.fixture(scope="function")
 def page(driver):
@@ -38,30 +121,243 @@ def page(driver):
     return driver.get_page()
 
 @pytest.fixture(scope="function")
-def test_case_runner(page, config, request):
+def test_case_runner(driver, page, case_config, locator_parser, artifact_pipeline, data_engine, request):
     """测试用例执行器fixture，根据测试用例动态创建页面对象"""
     # 从测试用例参数获取page_object名称
     page_object_name = request.node.params.get("page_object")
     if not page_object_name or page_object_name not in PAGE_OBJECT_MAP:
         raise ValueError(f"无效的页面对象：{page_object_name}")
 
-    # 创建页面实例对象
-    locator_parser = LocatorParser()
+    # 创建页面实例对象（定位器解析器在会话内共用）
     page_object_class = PAGE_OBJECT_MAP[page_object_name]
-    page_object = page_object_class(page, locator_parser, config)
+    page_object = page_object_class(page, locator_parser, case_config)
 
-    # 创建执行器
-    return TestCaseRunner(page, config, page_object)
+    # 创建执行器，动态数据按(运行种子, 用例ID)生成
+    case_data = data_engine.for_case(request.node.nodeid)
+    runner = TestCaseRunner(page, case_config, page_object, artifact_pipeline, case_data, driver.trace, driver)
+    yield runner
+
+    # 从步骤断点恢复的记录写入报告，并由TimingRecorder写入耗时数据库
+    if runner.retries:
+        retries = [retry.to_dict() for retry in runner.retries]
+        request.node.user_properties.append(("checkpoint_retries", retries))
+        request.config.stash.setdefault(CHECKPOINT_RETRIES, []).extend(
+            dict(retry, case_id=request.node.nodeid) for retry in retries)
+        _attach_json(json.dumps(retries, ensure_ascii=False, indent=2), "断点重试")
+
+    # 用例失败时附上种子和生成的数据，便于复现
+    if request.node.stash.get(CASE_FAILED, False) and case_data.generated:
+        _attach_json(json.dumps(case_data.describe(), ensure_ascii=False, indent=2), "测试数据")
+
+def pytest_collect_file(file_path, parent):
+    """收集tests目录下的YAML用例文件"""
+    if is_case_file(file_path):
+        return YamlFile.from_parent(parent, path=file_path, config_parser=parent.config.stash[CONFIG_PARSER],
+                                    browsers=parent.config.stash[MATRIX_BROWSERS])
 
 def pytest_addoption(parser):
     """添加命令行参数"""
     parser.addoption("--browser", help="指定浏览器类型：chromium, firefox, webkit")
-    parser.addoption("--headless", type=bool, help="是否无头模式运行")
+    parser.addoption("--browsers", help="浏览器矩阵，逗号分隔（如chromium,firefox,webkit），每个用例在每个浏览器上各执行一次")
+    parser.addoption("--headless", type=_str_to_bool, help="是否无头模式运行")
     parser.addoption("--base-url", help="测试目标的基础url")
     parser.addoption("--env", help="测试环境选择, dev, test, prod")
+    parser.addoption("--case-list", help="只执行文件中列出的用例nodeid（每行一个），并行worker使用")
+    parser.addoption("--incremental", action="store_true",
+                     help="增量模式：依赖内容和被测构建均未变化、且上次通过的用例直接报告为cached，不启动浏览器")
+    parser.addoption("--build-id", help=f"被测应用的构建标识，增量模式必填（也可用环境变量{BUILD_ID_ENV}）")
+    parser.addoption("--skip-preflight", action="store_true", help="跳过启动浏览器前的用例预检查（调用方已检查过时使用）")
+
+def _str_to_bool(value: str) -> bool:
+    """命令行布尔值转换，支持true/false、1/0、yes/no"""
+    return str(value).strip().lower() in ("true", "1", "yes", "y")
 
 def pytest_configure(config):
     """配置pytest"""
     # 确保报告目录存在
     allure_result_dir = config.getoption("--alluredir") or "report/allure_results"
-    os.makedirs(allure_result_dir, exist_ok=True)
\ No newline at end of file
+    os.makedirs(allure_result_dir, exist_ok=True)
+
+    # 合并命令行参数到配置
+    config_parser = ConfigParser(env=config.getoption("--env"))
+    config_parser.update_from_cli({
+        "browser": config.getoption("--browser"),
+        "headless": config.getoption("--headless"),
+        "base_url": config.getoption("--base-url"),
+    })
+    config.stash[CONFIG_PARSER] = config_parser
+    recorder.configure(config_parser)
+    try:
+        config.stash[MATRIX_BROWSERS] = parse_browser_list(config.getoption("--browsers"))
+    except ValueError as e:
+        raise pytest.UsageError(f"--browsers: {e}")
+
+    # 增量模式：按用例依赖内容的哈希复用上次通过的结果
+    if config.getoption("--incremental"):
+        build_id = config.getoption("--build-id") or os.getenv(BUILD_ID_ENV) or config_parser.get("result_cache.build_id")
+        if not build_id:
+            raise pytest.UsageError(f"--incremental需要指定被测应用的构建标识：--build-id 或环境变量{BUILD_ID_ENV}")
+        config.pluginmanager.register(ResultCachePlugin(
+            ResultCache.from_config(config_parser),
+            CaseFingerprint(config_parser, str(build_id)),
+        ), "result_cache")
+
+    # 记录用例耗时，供并行分片使用
+    config.pluginmanager.register(TimingRecorder(
+        TimingDB(),
+        browser=config_parser.get("browser"),
+        run_id=os.getenv("UI_AUTOMATOR_RUN_ID"),
+        worker_id=os.getenv("UI_AUTOMATOR_WORKER_ID"),
+    ), "timing_recorder")
+
+def pytest_collection_modifyitems(config, items):
+    """指定--case-list时只保留列表中的用例，并按列表顺序执行"""
+    case_list = config.getoption("--case-list")
+    if not case_list:
+        return
+    with open(case_list, "r", encoding="utf-8") as f:
+        order = {line.strip(): index for index, line in enumerate(f) if line.strip()}
+    selected = [item for item in items if item.nodeid in order]
+    deselected = [item for item in items if item.nodeid not in order]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+    items[:] = sorted(selected, key=lambda item: order[item.nodeid])
+
+def pytest_collection_finish(session):
+    """收集完成后、启动浏览器前预检查选中的YAML用例，有问题时一次性列出问题
+
+    只选中了YAML用例时终止运行；同时选中了单元测试等其他用例时，其他用例照常执行，YAML用例在启动浏览器前失败
+    """
+    if session.config.getoption("--skip-preflight"):
+        return
+    # 浏览器矩阵中同一用例的各浏览器item只检查一次
+    cases = list({item.case_id: (item.case_id, item.params)
+                  for item in session.items if isinstance(item, YamlItem)}.values())
+    if not cases:
+        return
+    started = time.perf_counter()
+    issues = Preflight(session.config.stash[CONFIG_PARSER], LocatorParser()).check_cases(cases)
+    if issues:
+        reporter = session.config.pluginmanager.get_plugin("terminalreporter")
+        if reporter:
+            reporter.write_line(format_issues(issues, time.perf_counter() - started), red=True)
+        message = f"用例预检查失败: {len(issues)} 个问题"
+        if all(isinstance(item, YamlItem) for item in session.items):
+            pytest.exit(message, returncode=pytest.ExitCode.USAGE_ERROR)
+        session.config.stash[PREFLIGHT_FAILURE] = message
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item):
+    """预检查失败时YAML用例直接失败，不准备fixture也不启动浏览器"""
+    message = item.config.stash.get(PREFLIGHT_FAILURE, None)
+    if message and isinstance(item, YamlItem):
+        pytest.fail(message, pytrace=False)
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    """记录用例执行阶段是否失败，供fixture清理时使用"""
+    outcome = yield
+    report = outcome.get_result()
+    if report.when == "call" and report.failed:
+        item.stash[CASE_FAILED] = True
+
+def pytest_sessionfinish(session, exitstatus):
+    """写出本次运行的耗时记录"""
+    recorder.flush()
+
+def _write_matrix_summary(terminalreporter, config):
+    """浏览器矩阵模式下按浏览器对比用例结果和执行耗时"""
+    browsers = config.stash.get(MATRIX_BROWSERS, None)
+    if not browsers:
+        return
+    totals = {browser: {"passed": 0, "failed": 0, "duration": 0.0} for browser in browsers}
+    failed = {}
+    for reports in terminalreporter.stats.values():
+        for report in reports:
+            browser = dict(getattr(report, "user_properties", ()) or ()).get("browser")
+            if browser not in totals or getattr(report, "when", None) not in ("setup", "call", "teardown"):
+                continue
+            totals[browser]["duration"] += report.duration
+            failed[report.nodeid] = (browser, failed.get(report.nodeid, (browser, False))[1] or report.failed)
+    for browser, case_failed in failed.values():
+        totals[browser]["failed" if case_failed else "passed"] += 1
+    if not failed:
+        return
+    fastest = min((row["duration"] for row in totals.values() if row["duration"]), default=0)
+    terminalreporter.write_sep("-", "浏览器矩阵")
+    for browser, row in totals.items():
+        ratio = f"，为最快的 {row['duration'] / fastest:.2f}x" if fastest and row["duration"] else ""
+        terminalreporter.write_line(
+            f"{browser}: 通过 {row['passed']}，失败 {row['failed']}，耗时 {row['duration']:.2f}s{ratio}"
+        )
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    """输出浏览器池指标"""
+    _write_matrix_summary(terminalreporter, config)
+
+    metrics = config.stash.get(BROWSER_POOL_METRICS, None)
+    if metrics:
+        terminalreporter.write_sep("-", "浏览器池")
+        terminalreporter.write_line(
+            f"浏览器启动次数: {metrics['launches']}（连接常驻浏览器 {metrics['connections']}），"
+            f"上下文获取次数: {metrics['acquisitions']}，"
+            f"复用率: {metrics['reuse_ratio']:.2%}，回收次数: {metrics['recycles']}"
+        )
+
+    artifacts = config.stash.get(ARTIFACT_STATS, None)
+    if artifacts and artifacts["captures"]:
+        terminalreporter.write_sep("-", "截图")
+        terminalreporter.write_line(
+            f"截图 {artifacts['captures']} 张，耗时 {artifacts['capture_seconds']:.2f}s，"
+            f"写盘 {artifacts['files_written']} 个共 {artifacts['bytes_written'] / 1024:.1f}KB，"
+            f"去重 {artifacts['deduplicated']}，超出预算丢弃 {artifacts['dropped_over_budget']}"
+        )
+
+    routing = config.stash.get(ROUTING_TOTALS, None)
+    if routing:
+        terminalreporter.write_sep("-", "网络路由")
+        terminalreporter.write_line(
+            f"屏蔽请求: {sum(r['blocked'] for r in routing)}，回放请求: {sum(r['replayed'] for r in routing)}，"
+            f"节省流量: {sum(r['bytes_saved'] for r in routing) / 1024:.1f}KB"
+        )
+
+    retries = config.stash.get(CHECKPOINT_RETRIES, None)
+    if retries:
+        terminalreporter.write_sep("-", "断点重试")
+        terminalreporter.write_line(
+            f"从断点恢复 {len(retries)} 次（{len({retry['case_id'] for retry in retries})} 个用例），"
+            f"相对整个用例重跑节省 {sum(retry['saved_seconds'] for retry in retries):.1f}s"
+        )
+        hotspots = {}
+        for retry in retries:
+            key = (retry["case_id"], retry["step_index"], retry["step"])
+            hotspots.setdefault(key, []).append(retry)
+        for (case_id, step_index, step), items in sorted(hotspots.items(), key=lambda item: -len(item[1]))[:10]:
+            terminalreporter.write_line(f"  {case_id} 第{step_index}步 {step}: {len(items)} 次，{items[-1]['error']}")
+
+    data_seed = config.stash.get(DATA_SEED, None)
+    if data_seed:
+        terminalreporter.write_sep("-", "测试数据")
+        terminalreporter.write_line(f"数据种子: {data_seed}（复现: UI_AUTOMATOR_DATA_SEED={data_seed}）")
+
+    # 页面就绪等待耗时，按总等待时间降序
+    wait_summary = readiness_stats.summary()
+    if wait_summary:
+        terminalreporter.write_sep("-", "页面就绪等待")
+        for row in wait_summary[:10]:
+            terminalreporter.write_line(
+                f"{row['page']}.{row['event']} [{row['strategy']}]: {row['count']} 次，"
+                f"总计 {row['total']:.2f}s，最长 {row['max'] * 1000:.0f}ms"
+            )
+
+    # 最耗时的动作（按p95降序），完整报告使用 python -m src.utils.perf_report 生成
+    perf_records = recorder.all_records()
+    if perf_records:
+        terminalreporter.write_sep("-", "步骤耗时")
+        for row in build_report(perf_records)["by_action"][:10]:
+            terminalreporter.write_line(
+                f"{row['name']}: {row['count']} 次，p50 {row['p50_ms']:.0f}ms，p95 {row['p95_ms']:.0f}ms，"
+                f"最长 {row['max_ms']:.0f}ms，平均调用 {row['avg_calls']:.1f} 次"
+            )
+        if recorder.output_path:
+            terminalreporter.write_line(f"耗时记录: {recorder.output_path}")
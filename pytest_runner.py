@@ -1,9 +1,23 @@
 import os
+import subprocess
+import sys
+import time
+import uuid
 import pytest
-from src.utils.config_parser import ConfigParser
+from src.utils.config_parser import CONFIG_SNAPSHOT_ENV, ConfigParser, parse_browser_list
 from src.driver import Driver
+from src.distributed import Coordinator, run_worker, spawn_local_workers
+from src.preflight import run_preflight
+from src.impact import ImpactIndex, changes_since_last_run, changes_since_revision, save_run_state, select_cases
+from src.sharding import assign_lpt, assign_matrix, discover_case_ids, estimate_durations, matrix_case_ids
+from src.timing_db import TimingDB
+from src.utils.artifacts import ArtifactPipeline
 import argparse
 
+SHARD_DIR = os.path.join(".ui_cache", "shards")
+CONFIG_SNAPSHOT_DIR = os.path.join(".ui_cache", "config")
+WORKER_LOG_DIR = os.path.join("reports", "logs")
+
 
 def set_test_environment_vars():
     """临时设置测试环境变量（仅用于本地测试）"""
@@ -22,9 +36,73 @@ def main():
         choices=["dev", "test", "prod"],  # 允许的环境选项
         help="指定测试环境（dev/test/prod），默认：test"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="并行worker进程数，按历史耗时均衡分配用例，默认：1（单进程），浏览器矩阵模式默认每个浏览器一个"
+    )
+    parser.add_argument(
+        "--browsers",
+        help="浏览器矩阵，逗号分隔（如chromium,firefox,webkit）：用例只收集和检查一次，在各浏览器上并行执行"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="使用asyncio引擎在单进程内并发执行的用例数，大于1时启用，默认：1"
+    )
+    parser.add_argument(
+        "--test-dir",
+        type=str,
+        default="tests",
+        help="YAML用例目录，默认：tests"
+    )
+    parser.add_argument(
+        "--changed-since",
+        metavar="REV",
+        help="只执行受该git版本之后的变更（含未提交的修改）影响的用例"
+    )
+    parser.add_argument(
+        "--since-last-run",
+        action="store_true",
+        help="只执行受上次运行之后的变更影响的用例"
+    )
+    parser.add_argument(
+        "--coordinator",
+        action="store_true",
+        help="以协调者模式运行：收集用例并通过HTTP分发给worker，合并结果到同一个Allure结果目录"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        help="协调者监听端口，默认取配置distributed.port"
+    )
+    parser.add_argument(
+        "--local-workers",
+        type=int,
+        default=0,
+        help="协调者模式下在本机启动的worker进程数，默认：0（只等待远程worker接入）"
+    )
+    parser.add_argument(
+        "--worker",
+        metavar="URL",
+        help="以worker模式运行：从指定协调者（如 http://host:8765）逐个领取用例执行"
+    )
     # 分离出--env参数和剩余的pytest参数
     args, remaining_pytest_args = parser.parse_known_args()
 
+    # worker的配置由协调者下发，不读取本地配置文件；账号密码等敏感值从本机环境变量读取
+    if args.worker:
+        sys.exit(run_worker(args.worker, args.test_dir, remaining_pytest_args))
+
+    try:
+        browsers = parse_browser_list(args.browsers)
+    except ValueError as e:
+        parser.error(f"--browsers: {e}")
+    if browsers and (args.concurrency > 1 or args.coordinator):
+        parser.error("--browsers 暂不支持与 --concurrency / --coordinator 同时使用")
+    workers = args.workers or (len(browsers) if browsers else 1)
+
     # 1. 设置环境变量（在初始化配置前执行）
     set_test_environment_vars()
 
@@ -36,18 +114,214 @@ def main():
 
     # 4. 构造pytest参数（合并固定参数和剩余参数）
     pytest_args = [
-                      "tests/",
+                      f"{args.test_dir}/",
                       f"--browser={config.get('browser')}",
                       f"--headless={config.get('headless')}",
+                      f"--env={args.env}",
                       "--alluredir=reports/allure-results"
                   ] + remaining_pytest_args  # 附加传入的其他pytest参数（如-k、-s等）
+    if browsers:
+        pytest_args.append(f"--browsers={','.join(browsers)}")
+
+    # 按变更影响选择用例
+    selected = None
+    if args.changed_since or args.since_last_run:
+        selected = select_affected_cases(args.test_dir, args.changed_since)
+        if not selected:
+            print("没有受变更影响的用例")
+            save_run_state(args.test_dir)
+            driver_manager.stop()
+            sys.exit(0)
+
+    # 并行、异步和分布式模式在父进程预检查一次用例，有问题时不启动任何浏览器；单进程由conftest在收集后检查
+    if args.concurrency > 1 or workers > 1 or args.coordinator:
+        if run_preflight(config, args.test_dir, selected):
+            driver_manager.stop()
+            sys.exit(pytest.ExitCode.USAGE_ERROR)
+        pytest_args.append("--skip-preflight")
 
     # 5. 运行测试
     try:
-        pytest.main(pytest_args)
+        if args.coordinator:
+            exit_code = run_coordinator(config, args.test_dir, selected, args.port, args.local_workers)
+        elif args.concurrency > 1:
+            # asyncio引擎依赖playwright.async_api和allure_commons，只在使用时导入
+            from src.async_engine import run_async_engine
+            exit_code = run_async_engine(config, args.concurrency, args.test_dir, case_ids=selected)
+        elif workers > 1:
+            exit_code = run_parallel(workers, pytest_args, config, args.test_dir, case_ids=selected,
+                                     browsers=browsers)
+        else:
+            if selected is not None:
+                selected = matrix_case_ids(selected, browsers) if browsers else selected
+                pytest_args.append(f"--case-list={write_case_list(selected, 'selected')}")
+            exit_code = pytest.main(pytest_args)
     finally:
         # 6. 关闭驱动
         driver_manager.stop()
+    save_run_state(args.test_dir)
+    sys.exit(exit_code)
+
+
+def select_affected_cases(test_dir: str, revision: str = None) -> list:
+    """构建用例依赖索引，选出受变更影响的用例（上次失败的优先），并输出选择原因"""
+    index = ImpactIndex(test_dir).build()
+    changes = changes_since_revision(revision, test_dir) if revision else changes_since_last_run(test_dir)
+    timing_db = TimingDB()
+    last_outcomes = timing_db.last_outcomes(index.cases)
+    timing_db.close()
+
+    selection = select_cases(index, changes, last_outcomes)
+    since = f"版本 {revision}" if revision else "上次运行"
+    print(f"变更影响选择（相对{since}）：{len(selection)}/{len(index.cases)} 个用例")
+    for case_id, reasons in selection:
+        failed_mark = " [上次失败]" if last_outcomes.get(case_id) == "failed" else ""
+        print(f"  {case_id}{failed_mark}: {'; '.join(reasons)}")
+    return [case_id for case_id, _reasons in selection]
+
+
+def write_case_list(case_ids: list, name: str) -> str:
+    """把用例nodeid写入文件，供--case-list使用"""
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    case_list = os.path.join(SHARD_DIR, f"{uuid.uuid4().hex[:12]}-{name}.txt")
+    with open(case_list, "w", encoding="utf-8") as f:
+        f.write("\n".join(case_ids))
+    return case_list
+
+
+def run_parallel(workers: int, pytest_args: list, config: ConfigParser, test_dir: str = "tests",
+                 case_ids: list = None, browsers: list = None) -> int:
+    """按历史耗时(LPT)把用例分配给多个worker进程并行执行，返回最大的退出码；
+    浏览器矩阵模式下worker按浏览器划分，各自只启动一种浏览器"""
+    case_ids = case_ids if case_ids is not None else discover_case_ids(test_dir)
+    timing_db = TimingDB()
+    if browsers:
+        history = matrix_history(timing_db, case_ids, browsers)
+        durations = estimate_durations(matrix_case_ids(case_ids, browsers), history)
+        shards = assign_matrix(durations, workers)
+    else:
+        durations = estimate_durations(case_ids, timing_db.average_durations(case_ids))
+        shards = assign_lpt(durations, workers)
+
+    run_id = uuid.uuid4().hex[:12]
+    # 所有worker使用同一数据种子，唯一值按worker分区
+    data_seed = os.getenv("UI_AUTOMATOR_DATA_SEED") or config.get("data.seed") or str(uuid.uuid4().int % 10 ** 9)
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    os.makedirs(WORKER_LOG_DIR, exist_ok=True)
+    ArtifactPipeline.cleanup_old_runs(config.get("report.screenshots"), int(config.get("artifacts.keep_runs", 5)))
+    # worker直接加载父进程编译好的配置快照
+    snapshot_path = os.path.join(CONFIG_SNAPSHOT_DIR, f"{run_id}.json")
+    config.dump_snapshot(snapshot_path)
+
+    processes = []
+    started = time.monotonic()
+    for shard in shards:
+        case_list = os.path.join(SHARD_DIR, f"{run_id}-worker-{shard.worker_id}.txt")
+        with open(case_list, "w", encoding="utf-8") as f:
+            f.write("\n".join(shard.cases))
+
+        # 截图按运行ID和worker ID写入独立目录，Allure结果文件名为uuid，可共用同一目录
+        env_vars = dict(os.environ)
+        env_vars.update({
+            "UI_AUTOMATOR_RUN_ID": run_id,
+            "UI_AUTOMATOR_WORKER_ID": str(shard.worker_id),
+            "UI_AUTOMATOR_WORKER_COUNT": str(len(shards)),
+            "UI_AUTOMATOR_DATA_SEED": str(data_seed),
+            CONFIG_SNAPSHOT_ENV: snapshot_path,
+        })
+        log_path = os.path.join(WORKER_LOG_DIR, f"worker-{shard.worker_id}.log")
+        log_file = open(log_path, "w", encoding="utf-8")
+        command = [sys.executable, "-m", "pytest", *pytest_args, f"--case-list={case_list}"]
+        process = subprocess.Popen(command, env=env_vars, stdout=log_file, stderr=subprocess.STDOUT)
+        processes.append((shard, process, log_file, log_path))
+        engine = f"[{shard.browser}] " if shard.browser else ""
+        print(f"worker-{shard.worker_id}: {engine}{len(shard.cases)} 个用例，预估耗时 {shard.estimated:.1f}s，"
+              f"日志: {log_path}")
+
+    exit_code = 0
+    for shard, process, log_file, _log_path in processes:
+        exit_code = max(exit_code, process.wait())
+        log_file.close()
+    wall_time = time.monotonic() - started
+
+    print_parallel_summary(shards, timing_db.run_summary(run_id), wall_time)
+    if browsers:
+        print_browser_summary(shards, timing_db.browser_summary(run_id))
+    print_retry_hotspots(timing_db.retry_hotspots(run_id))
+    print(f"  数据种子: {data_seed}（复现: UI_AUTOMATOR_DATA_SEED={data_seed}）")
+    timing_db.close()
+    return exit_code
+
+
+def matrix_history(timing_db: TimingDB, case_ids: list, browsers: list) -> dict:
+    """矩阵用例的历史耗时，未在矩阵中执行过的用例使用该浏览器单独运行时的记录"""
+    history = timing_db.average_durations(matrix_case_ids(case_ids, browsers))
+    for browser in browsers:
+        for case_id, duration in timing_db.average_durations(case_ids, browser=browser).items():
+            history.setdefault(f"{case_id}[{browser}]", duration)
+    return history
+
+
+def run_coordinator(config: ConfigParser, test_dir: str = "tests", case_ids: list = None, port: int = None,
+                    local_workers: int = 0) -> int:
+    """以协调者模式分发用例，等待全部用例完成后输出汇总，返回退出码"""
+    case_ids = case_ids if case_ids is not None else discover_case_ids(test_dir)
+    try:
+        coordinator = Coordinator.from_config(case_ids, config, port=port,
+                                              allure_dir=config.get("report.allure_results", "reports/allure-results"))
+    except ValueError as e:
+        print(f"协调者启动失败: {e}")
+        return pytest.ExitCode.USAGE_ERROR
+    print(f"协调者已启动: {coordinator.url}，{len(case_ids)} 个用例，运行ID {coordinator.run_id}")
+    print(f"  worker接入: python pytest_runner.py --worker {coordinator.url}")
+    processes = spawn_local_workers(local_workers, coordinator.local_url, test_dir)
+    exit_code = coordinator.run()
+    for process in processes:
+        process.wait()
+    coordinator.print_summary()
+    return exit_code
+
+
+def print_parallel_summary(shards: list, summary: dict, wall_time: float) -> None:
+    """输出总耗时、各worker利用率及与理想均衡的差距"""
+    print(f"\n并行执行完成：{sum(len(s.cases) for s in shards)} 个用例，{len(shards)} 个worker，总耗时 {wall_time:.1f}s")
+    busy_times = []
+    for shard in shards:
+        stats = summary.get(str(shard.worker_id), {"cases": 0, "busy": 0.0})
+        busy_times.append(stats["busy"])
+        utilisation = stats["busy"] / wall_time if wall_time else 0
+        print(f"  worker-{shard.worker_id}: 完成 {stats['cases']} 个用例，执行耗时 {stats['busy']:.1f}s，"
+              f"利用率 {utilisation:.0%}")
+    if busy_times and sum(busy_times):
+        ideal = sum(busy_times) / len(busy_times)
+        print(f"  理想均衡耗时 {ideal:.1f}s，最慢worker {max(busy_times):.1f}s，"
+              f"偏离理想值 {max(busy_times) / ideal - 1:.0%}")
+
+
+def print_browser_summary(shards: list, summary: dict) -> None:
+    """浏览器矩阵：对比各浏览器的用例数、失败数、执行耗时和平均用例耗时"""
+    worker_counts = {}
+    for shard in shards:
+        worker_counts[shard.browser] = worker_counts.get(shard.browser, 0) + 1
+    averages = {browser: stats["busy"] / stats["cases"] for browser, stats in summary.items() if stats["cases"]}
+    fastest = min((value for value in averages.values() if value), default=0)
+    print("  浏览器对比：")
+    for browser, stats in sorted(summary.items(), key=lambda item: averages.get(item[0], 0)):
+        average = averages.get(browser, 0)
+        ratio = f"，为最快的 {average / fastest:.2f}x" if fastest else ""
+        workers = worker_counts.get(browser)
+        workers = f"，{workers} 个worker" if workers else ""
+        print(f"    {browser}: {stats['cases']} 个用例（失败 {stats['failed']}）{workers}，"
+              f"执行耗时 {stats['busy']:.1f}s，平均 {average:.1f}s/用例{ratio}")
+
+
+def print_retry_hotspots(hotspots: list) -> None:
+    """从步骤断点恢复的步骤，按重试次数降序，用于定位不稳定的步骤"""
+    if not hotspots:
+        return
+    print(f"  断点重试 {sum(row['retries'] for row in hotspots)} 次，节省 {sum(row['saved'] for row in hotspots):.1f}s：")
+    for row in hotspots:
+        print(f"    {row['case_id']} 第{row['step_index']}步 {row['step']}: {row['retries']} 次，{row['error']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,346 @@
+import asyncio
+import functools
+import inspect
+import json
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import allure
+from allure_commons.logger import AllureFileLogger
+from allure_commons.model2 import (
+    ATTACHMENT_PATTERN, Attachment, Label, Status, StatusDetails, TestResult, TestStepResult
+)
+from allure_commons.utils import format_exception, format_traceback, md5, now, uuid4
+from greenlet import greenlet
+from playwright.async_api import async_playwright, Browser
+
+from src.auth_cache import AuthStateCache
+from src.browser_server import BrowserServerClient, launch_options
+from src.execution_plan import CompiledStep, bind_case, bind_reset, parse_case_file
+from src.page_objects import PAGE_OBJECT_MAP
+from src.routing import RequestRouter
+from src.sharding import discover_case_ids
+from src.tracing import FailureTracer
+from src.test_case_runner import TestCaseRunner
+from src.utils.config_parser import ConfigParser
+from src.utils.locator_parser import LocatorParser
+from src.utils.artifacts import ArtifactPipeline
+from src.utils.data_generator import DataEngine
+from src.utils.perf import recorder
+
+
+# ---------------------------------------------------------------------------
+# 同步/异步桥接：页面对象和TestCaseRunner保持同步写法，在greenlet中运行，
+# 调用异步Playwright对象时切回事件循环await，等待期间其他用例继续执行
+# ---------------------------------------------------------------------------
+
+def _is_async_api_object(value: Any) -> bool:
+    return type(value).__module__.startswith("playwright.async_api")
+
+
+def _wrap(value: Any) -> Any:
+    if _is_async_api_object(value):
+        return SyncProxy(value)
+    if isinstance(value, list):
+        return [_wrap(item) for item in value]
+    return value
+
+
+def _unwrap(value: Any) -> Any:
+    """参数中的代理（含列表/字典中的，如screenshot的mask）还原为异步Playwright对象"""
+    if isinstance(value, SyncProxy):
+        return value._target
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _unwrap(item) for key, item in value.items()}
+    return value
+
+
+def _call(func: Callable, *args, **kwargs) -> Any:
+    recorder.count_call()
+    result = func(*_unwrap(args), **_unwrap(kwargs))
+    if inspect.isawaitable(result):
+        # 切回事件循环所在的greenlet，由run_sync完成await后把结果送回
+        result = greenlet.getcurrent().parent.switch(result)
+    return _wrap(result)
+
+
+class SyncProxy:
+    """把异步Playwright对象(Page/Locator等)包装为同步调用接口，供现有页面对象直接使用"""
+
+    __slots__ = ("_target",)
+
+    def __init__(self, target: Any):
+        object.__setattr__(self, "_target", target)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if callable(attr):
+            return functools.partial(_call, attr)
+        return _wrap(attr)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._target, name, value)
+
+    def __repr__(self) -> str:
+        return f"SyncProxy({self._target!r})"
+
+
+async def run_sync(func: Callable, *args, **kwargs) -> Any:
+    """在独立greenlet中运行同步函数，把其中产生的异步等待交给事件循环"""
+    child = greenlet(func)
+    value = child.switch(*args, **kwargs)
+    while not child.dead:
+        try:
+            result = await value
+        except BaseException as e:
+            value = child.throw(e)
+        else:
+            value = child.switch(result)
+    return value
+
+
+# ---------------------------------------------------------------------------
+# 用例级Allure报告：多个用例交错执行时，步骤和附件记录在各自的结果对象中
+# ---------------------------------------------------------------------------
+
+class CaseReport:
+    """单个用例的Allure结果，不依赖全局的allure生命周期"""
+
+    def __init__(self, case_id: str, case: Dict[str, Any], logger: AllureFileLogger):
+        self.logger = logger
+        file_id, case_name = case_id.split("::", 1)
+        self.result = TestResult(
+            uuid=uuid4(),
+            name=case_name,
+            fullName=case_id,
+            historyId=md5(case_id),
+            description=case.get("description"),
+            start=now(),
+            labels=[
+                Label(name="suite", value=file_id),
+                Label(name="framework", value="ui-automator-async"),
+                Label(name="thread", value=f"pid-{os.getpid()}-async"),
+            ],
+        )
+        self._stack: List[Any] = [self.result]
+
+    @contextmanager
+    def step(self, name: str):
+        step = TestStepResult(name=name, start=now())
+        self._stack[-1].steps.append(step)
+        self._stack.append(step)
+        try:
+            yield step
+            step.status = Status.PASSED
+        except BaseException as e:
+            step.status = Status.FAILED if isinstance(e, AssertionError) else Status.BROKEN
+            step.statusDetails = StatusDetails(message=format_exception(type(e), e))
+            raise
+        finally:
+            step.stop = now()
+            self._stack.pop()
+
+    def attach_data(self, body: str, name: str, attachment_type) -> None:
+        """把文本/二进制内容作为附件挂到当前步骤下"""
+        file_name = ATTACHMENT_PATTERN.format(prefix=uuid4(), ext=attachment_type.extension)
+        self._stack[-1].attachments.append(Attachment(name=name, source=file_name, type=attachment_type.mime_type))
+        self.logger.report_attached_data(body, file_name)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """写出用例结果"""
+        self.result.stop = now()
+        if error is None:
+            self.result.status = Status.PASSED
+        else:
+            self.result.status = Status.FAILED if isinstance(error, AssertionError) else Status.BROKEN
+            self.result.statusDetails = StatusDetails(
+                message=format_exception(type(error), error),
+                trace=format_traceback(error.__traceback__),
+            )
+        self.logger.report_result(self.result)
+
+
+class AsyncTestCaseRunner(TestCaseRunner):
+    """异步引擎使用的执行器：步骤和失败截图记录到用例自己的CaseReport"""
+
+    def __init__(self, page, config: ConfigParser, page_object, report: CaseReport, artifacts=None, data=None,
+                 trace=None):
+        super().__init__(page, config, page_object, artifacts, data, trace)
+        self.report = report
+
+    def _report_step(self, description: str):
+        return self.report.step(description)
+
+    def _attach(self, body, name: str, attachment_type) -> None:
+        self.report.attach_data(body, name, attachment_type)
+
+
+# ---------------------------------------------------------------------------
+# 异步驱动与执行引擎
+# ---------------------------------------------------------------------------
+
+class AsyncDriver:
+    """基于playwright.async_api的驱动：一个浏览器，每个用例一个独立上下文"""
+
+    def __init__(self, config: ConfigParser):
+        self.config = config
+        self.playwright = None
+        self.browser: Browser = None
+        self.router = RequestRouter(config)
+        self.tracer = FailureTracer(config)
+
+    async def start(self) -> Browser:
+        """启动Playwright和浏览器，优先连接常驻浏览器服务"""
+        self.playwright = await async_playwright().start()
+        browser_type = self.config.get("browser")
+        headless = self.config.get("headless")
+        browser_launcher = getattr(self.playwright, browser_type, None)
+        if not browser_launcher:
+            raise ValueError(f"不支持的浏览器类型: {browser_type}")
+        client = BrowserServerClient.from_config(self.config)
+        if client:
+            self.browser = await client.connect_async(browser_launcher, browser_type, headless)
+        if self.browser is None:
+            self.browser = await browser_launcher.launch(**launch_options(browser_type, headless))
+        return self.browser
+
+    async def new_page(self, storage_state: str = None, case_id: str = None):
+        """创建独立上下文和页面，返回(上下文, 页面, 路由统计, trace缓冲区)"""
+        context_options = {"viewport": None}
+        context_options.update(self.router.context_options(case_id))
+        if storage_state:
+            context_options["storage_state"] = storage_state
+        context = await self.browser.new_context(**context_options)
+        routing_stats = await run_sync(self.router.attach, SyncProxy(context), case_id)
+        trace = await run_sync(self.tracer.attach, SyncProxy(context), case_id)
+        page = await context.new_page()
+        page.set_default_timeout(self.config.get("timeout.element"))
+        return context, page, routing_stats, trace
+
+    async def stop(self) -> None:
+        """关闭浏览器和Playwright"""
+        if self.browser:
+            await self.browser.close()
+        if self.playwright:
+            await self.playwright.stop()
+
+
+class AsyncEngine:
+    """在单个进程内并发执行多个YAML用例，通过信号量限制同时运行的用例数"""
+
+    def __init__(self, config: ConfigParser, concurrency: int = 4, results_dir: str = None):
+        self.config = config
+        self.concurrency = concurrency
+        self.logger = AllureFileLogger(results_dir or config.get("report.allure_results"))
+        self.locator_parser = LocatorParser()
+        self.auth_cache = AuthStateCache(config, self.locator_parser)
+        self.artifacts = ArtifactPipeline.from_config(config)
+        self.data_engine = DataEngine.shared(config)
+        self._auth_locks: Dict[str, asyncio.Lock] = {}
+        self.outcomes: Dict[str, str] = {}
+
+    def load_cases(self, test_dir: str = "tests", keyword: str = None,
+                   case_ids: List[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """加载用例，keyword为用例nodeid子串过滤，case_ids指定时只加载并按其顺序执行"""
+        cases = []
+        for case_id in case_ids if case_ids is not None else discover_case_ids(test_dir):
+            if keyword and keyword not in case_id:
+                continue
+            path, case_name = case_id.split("::", 1)
+            cases.append((case_id, parse_case_file(path)[case_name]))
+        return cases
+
+    async def run(self, cases: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, str]:
+        """并发执行全部用例，返回 nodeid -> passed/failed/broken"""
+        driver = AsyncDriver(self.config)
+        await driver.start()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            await asyncio.gather(*(self._run_case(driver, semaphore, case_id, case) for case_id, case in cases))
+        finally:
+            await driver.stop()
+            self.artifacts.close()
+        return self.outcomes
+
+    async def _storage_state(self, driver: AsyncDriver, profile: str) -> str:
+        """获取登录态；同一进程内同一profile只有一个用例执行登录"""
+        lock = self._auth_locks.setdefault(profile, asyncio.Lock())
+        async with lock:
+            return await run_sync(self.auth_cache.get_storage_state, SyncProxy(driver.browser), profile)
+
+    async def _run_case(self, driver: AsyncDriver, semaphore: asyncio.Semaphore, case_id: str,
+                        case: Dict[str, Any]) -> None:
+        async with semaphore:
+            report = CaseReport(case_id, case, self.logger)
+            case_data = self.data_engine.for_case(case_id)
+            error = None
+            context = None
+            trace = None
+            try:
+                page_class = PAGE_OBJECT_MAP.get(case.get("page_object"))
+                if page_class is None:
+                    raise ValueError(f"无效的页面对象：{case.get('page_object')}")
+                steps = bind_case(case, page_class, self.config)
+                reset_steps = bind_reset(case, page_class, self.config)
+
+                storage_state = await self._storage_state(driver, case["auth"]) if case.get("auth") else None
+                context, page, routing_stats, trace = await driver.new_page(storage_state, case_id)
+                sync_page = SyncProxy(page)
+                page_object = page_class(sync_page, self.locator_parser, self.config)
+                runner = AsyncTestCaseRunner(sync_page, self.config, page_object, report, self.artifacts, case_data,
+                                             trace)
+                await run_sync(self._run_steps, runner, case, steps, reset_steps, case_id)
+            except Exception as e:
+                error = e
+            finally:
+                if trace:
+                    trace.close()
+                if context:
+                    await context.close()
+                    if driver.router.enabled:
+                        report.attach_data(json.dumps(routing_stats.to_dict()), "网络路由统计",
+                                           allure.attachment_type.JSON)
+                case_records = recorder.case_records(case_id)
+                if case_records:
+                    report.attach_data(json.dumps(case_records, ensure_ascii=False, indent=2), "步骤耗时",
+                                       allure.attachment_type.JSON)
+                if error is not None and case_data.generated:
+                    report.attach_data(json.dumps(case_data.describe(), ensure_ascii=False, indent=2), "测试数据",
+                                       allure.attachment_type.JSON)
+                report.finish(error)
+            if error is None:
+                self.outcomes[case_id] = "passed"
+            else:
+                self.outcomes[case_id] = "failed" if isinstance(error, AssertionError) else "broken"
+
+    @staticmethod
+    def _run_steps(runner: AsyncTestCaseRunner, case: Dict[str, Any], steps: List[CompiledStep],
+                   reset_steps: List[CompiledStep], case_id: str) -> None:
+        # 每个greenlet有独立的上下文，耗时记录和调用计数按用例区分
+        with recorder.case(case_id):
+            runner.run_case(case, steps, reset_steps)
+
+
+def run_async_engine(config: ConfigParser, concurrency: int, test_dir: str = "tests", keyword: str = None,
+                     case_ids: List[str] = None) -> int:
+    """执行异步引擎并输出汇总，返回退出码"""
+    recorder.configure(config)
+    engine = AsyncEngine(config, concurrency)
+    cases = engine.load_cases(test_dir, keyword, case_ids)
+    started = time.monotonic()
+    outcomes = asyncio.run(engine.run(cases))
+    wall_time = time.monotonic() - started
+    perf_path = recorder.flush()
+
+    failed = [case_id for case_id, outcome in outcomes.items() if outcome != "passed"]
+    print(f"异步引擎执行完成：{len(outcomes)} 个用例，并发数 {concurrency}，"
+          f"失败 {len(failed)} 个，总耗时 {wall_time:.1f}s")
+    for case_id in failed:
+        print(f"  {outcomes[case_id].upper()} {case_id}")
+    if perf_path:
+        print(f"耗时记录: {perf_path}")
+    return 1 if failed else 0
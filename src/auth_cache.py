@@ -0,0 +1,107 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Dict, Optional
+
+from src.page_objects import PAGE_OBJECT_MAP
+from src.utils.config_parser import ConfigParser
+from src.utils.file_lock import FileLock
+from src.utils.locator_parser import LocatorParser
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Browser
+
+logger = logging.getLogger(__name__)
+
+
+class AuthStateCache:
+    """登录态缓存：每组账号只执行一次登录，并把Playwright storage state保存到磁盘供后续用例复用"""
+
+    def __init__(self, config: ConfigParser, locator_parser: LocatorParser = None):
+        self.config = config
+        self.locator_parser = locator_parser or LocatorParser()
+        self.state_dir = config.get("auth.state_dir")
+        self.ttl = float(config.get("auth.ttl", 3600))
+        self.logins = 0
+        self.hits = 0
+
+    def _get_profile(self, profile_name: str) -> Dict[str, str]:
+        """获取登录配置并解析其中的${...}变量"""
+        profile = self.config.get(f"auth.profiles.{profile_name}")
+        if not isinstance(profile, Mapping):
+            raise KeyError(f"未找到登录配置: auth.profiles.{profile_name}")
+        credentials = {key: self.config.resolve(value) for key, value in profile.items()}
+        for key in ("username", "password"):
+            value = credentials.get(key)
+            if not value or str(value).startswith("${"):
+                raise ValueError(f"登录配置 {profile_name}.{key} 未能解析，请检查环境变量或配置文件")
+        return credentials
+
+    def _state_path(self, profile_name: str, credentials: Dict[str, str]) -> str:
+        """按目标地址和账号计算登录态文件路径，账号或环境变化会使用新文件"""
+        raw = f"{self.config.get('base_url')}|{credentials['username']}|{credentials['password']}"
+        digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.state_dir, f"{profile_name}-{digest}.json")
+
+    def _is_valid(self, state_path: str) -> bool:
+        """登录态文件存在、未过期且内容可解析"""
+        try:
+            if time.time() - os.path.getmtime(state_path) > self.ttl:
+                return False
+            with open(state_path, "r", encoding="utf-8") as f:
+                json.load(f)
+            return True
+        except (OSError, ValueError):
+            return False
+
+    def get_storage_state(self, browser: "Browser", profile_name: str) -> str:
+        """获取可用的登录态文件路径，缓存失效时加锁执行真实登录"""
+        credentials = self._get_profile(profile_name)
+        state_path = self._state_path(profile_name, credentials)
+        if self._is_valid(state_path):
+            self.hits += 1
+            return state_path
+
+        # 并行worker中只有一个执行登录，其余等待后直接复用结果
+        with FileLock(f"{state_path}.lock"):
+            if self._is_valid(state_path):
+                self.hits += 1
+                return state_path
+            self._login(browser, credentials, state_path)
+        return state_path
+
+    def invalidate(self, profile_name: Optional[str] = None) -> None:
+        """删除登录态缓存，不指定profile时清空全部"""
+        if not os.path.isdir(self.state_dir):
+            return
+        for filename in os.listdir(self.state_dir):
+            if not filename.endswith(".json"):
+                continue
+            if profile_name is None or filename.startswith(f"{profile_name}-"):
+                os.remove(os.path.join(self.state_dir, filename))
+
+    def _login(self, browser: "Browser", credentials: Dict[str, str], state_path: str) -> None:
+        """通过LoginPage执行真实登录并保存storage state"""
+        logger.info(f"执行登录并缓存登录态: {credentials['username']}")
+        os.makedirs(self.state_dir, exist_ok=True)
+        context = browser.new_context(viewport=None)
+        try:
+            page = context.new_page()
+            page.set_default_timeout(self.config.get("timeout.element"))
+            login_page = PAGE_OBJECT_MAP["login_page"](page, self.locator_parser, self.config)
+            login_page.load()
+            login_page.input_login_info(credentials["username"], credentials["password"])
+            login_page.click_login_button()
+            if not login_page.is_login_success():
+                raise RuntimeError(f"登录失败，无法缓存登录态: {credentials['username']}")
+
+            # 先写临时文件再替换，避免其他进程读到写了一半的文件
+            tmp_path = f"{state_path}.{os.getpid()}.tmp"
+            context.storage_state(path=tmp_path)
+            os.replace(tmp_path, state_path)
+            self.logins += 1
+        finally:
+            context.close()
@@ -0,0 +1,166 @@
+import logging
+import os
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from src.browser_server import BrowserServerClient, launch_browser
+from src.utils.config_parser import ConfigParser
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Browser
+
+logger = logging.getLogger(__name__)
+
+
+class PooledBrowser:
+    """池中的浏览器实例及其使用记录"""
+
+    def __init__(self, browser: "Browser", key: Tuple[str, bool]):
+        self.browser = browser
+        self.key = key
+        self.uses = 0
+        self.crashed = False
+        browser.on("disconnected", self._on_disconnected)
+
+    def _on_disconnected(self, _browser) -> None:
+        self.crashed = True
+
+    def is_alive(self) -> bool:
+        return not self.crashed and self.browser.is_connected()
+
+
+class BrowserPool:
+    """进程级浏览器池：按(浏览器类型, 是否无头)复用已启动的浏览器，每个测试只新建BrowserContext"""
+
+    def __init__(self, max_uses: int = 0, max_memory_mb: int = 0, server_client: BrowserServerClient = None):
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.server_client = server_client
+        self.playwright = None
+        self._browsers: Dict[Tuple[str, bool], PooledBrowser] = {}
+        self._launches = 0
+        self._connections = 0
+        self._acquisitions = 0
+        self._recycles = {"max_uses": 0, "crash": 0, "memory": 0}
+        self._psutil = self._import_psutil() if max_memory_mb else None
+
+    @classmethod
+    def from_config(cls, config: ConfigParser) -> "BrowserPool":
+        """根据配置创建浏览器池"""
+        return cls(
+            max_uses=int(config.get("browser_pool.max_uses", 0) or 0),
+            max_memory_mb=int(config.get("browser_pool.max_memory_mb", 0) or 0),
+            server_client=BrowserServerClient.from_config(config),
+        )
+
+    @staticmethod
+    def _import_psutil():
+        try:
+            import psutil
+            return psutil
+        except ImportError:
+            logger.warning("未安装psutil，浏览器池的内存回收阈值不生效")
+            return None
+
+    def acquire(self, browser_type: str, headless: bool) -> "Browser":
+        """获取可用浏览器，必要时回收旧实例并重新启动"""
+        key = (browser_type, bool(headless))
+        pooled = self._browsers.get(key)
+        if pooled:
+            reason = self._recycle_reason(pooled)
+            if reason:
+                self._recycle(key, reason)
+                pooled = None
+
+        if pooled is None:
+            pooled = self._launch(key)
+
+        pooled.uses += 1
+        self._acquisitions += 1
+        return pooled.browser
+
+    def release(self, browser: "Browser", crashed: bool = False) -> None:
+        """归还浏览器，页面崩溃时立即回收"""
+        for key, pooled in list(self._browsers.items()):
+            if pooled.browser is browser:
+                if crashed or not pooled.is_alive():
+                    self._recycle(key, "crash")
+                return
+
+    def _recycle_reason(self, pooled: PooledBrowser) -> Optional[str]:
+        """判断浏览器是否需要回收"""
+        if not pooled.is_alive():
+            return "crash"
+        if self.max_uses and pooled.uses >= self.max_uses:
+            return "max_uses"
+        if self.max_memory_mb and self._browser_memory_mb() >= self.max_memory_mb:
+            return "memory"
+        return None
+
+    def _browser_memory_mb(self) -> float:
+        """统计当前进程派生的浏览器进程常驻内存(MB)"""
+        if not self._psutil:
+            return 0
+        total = 0
+        for child in self._psutil.Process(os.getpid()).children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except (self._psutil.NoSuchProcess, self._psutil.AccessDenied):
+                continue
+        return total / (1024 * 1024)
+
+    def _launch(self, key: Tuple[str, bool]) -> PooledBrowser:
+        """启动浏览器（或连接常驻浏览器服务）并放入池中"""
+        browser_type, headless = key
+        if self.playwright is None:
+            # 首次启动浏览器时才导入Playwright，只收集用例或预检查时不加载
+            from playwright.sync_api import sync_playwright
+            self.playwright = sync_playwright().start()
+
+        browser, connected = launch_browser(self.playwright, browser_type, headless, self.server_client)
+        self._launches += 1
+        if connected:
+            self._connections += 1
+        pooled = PooledBrowser(browser, key)
+        self._browsers[key] = pooled
+        return pooled
+
+    def _recycle(self, key: Tuple[str, bool], reason: str) -> None:
+        """关闭并移除浏览器"""
+        pooled = self._browsers.pop(key, None)
+        if not pooled:
+            return
+        self._recycles[reason] += 1
+        logger.info(f"回收浏览器 {key[0]}(headless={key[1]})，原因: {reason}，已服务用例数: {pooled.uses}")
+        from playwright.sync_api import Error as PlaywrightError
+        try:
+            pooled.browser.close()
+        except PlaywrightError:
+            pass
+
+    def metrics(self) -> Dict[str, object]:
+        """浏览器池指标：启动次数（其中连接常驻浏览器的次数）、上下文获取次数、复用率、回收次数"""
+        reuse_ratio = 0.0
+        if self._acquisitions:
+            reuse_ratio = (self._acquisitions - self._launches) / self._acquisitions
+        return {
+            "launches": self._launches,
+            "connections": self._connections,
+            "acquisitions": self._acquisitions,
+            "reuse_ratio": round(reuse_ratio, 4),
+            "recycles": dict(self._recycles),
+        }
+
+    def close(self) -> None:
+        """关闭池中所有浏览器和Playwright"""
+        if not self._browsers and not self.playwright:
+            return
+        from playwright.sync_api import Error as PlaywrightError
+        for pooled in self._browsers.values():
+            try:
+                pooled.browser.close()
+            except PlaywrightError:
+                pass
+        self._browsers.clear()
+        if self.playwright:
+            self.playwright.stop()
+            self.playwright = None
@@ -0,0 +1,463 @@
+import argparse
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from src.utils.config_parser import ConfigParser
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Browser
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = os.path.join(".ui_cache", "browser_server", "daemon.json")
+LOG_FILE = os.path.join("reports", "logs", "browser_server.log")
+
+# 用Playwright Python包自带的node和JS包启动浏览器服务，保证服务端与客户端版本一致；
+# daemon退出导致stdin关闭时浏览器随之关闭，不会残留进程
+_LAUNCH_SERVER_JS = r"""
+const playwright = require(process.argv[1]);
+const browserType = process.argv[2];
+const options = JSON.parse(process.argv[3]);
+playwright[browserType].launchServer(options).then(server => {
+  process.stdout.write(JSON.stringify({wsEndpoint: server.wsEndpoint()}) + "\n");
+  const shutdown = () => server.close().then(() => process.exit(0), () => process.exit(1));
+  process.on("SIGTERM", shutdown);
+  process.on("SIGINT", shutdown);
+  process.stdin.on("end", shutdown);
+  process.stdin.resume();
+}, error => {
+  process.stdout.write(JSON.stringify({error: error.message.split("\n")[0]}) + "\n");
+  process.exit(1);
+});
+"""
+
+
+def _driver_paths() -> Tuple[str, str]:
+    """Playwright自带的node可执行文件和JS包目录"""
+    from playwright._impl._driver import compute_driver_executable
+    driver = compute_driver_executable()
+    if not isinstance(driver, tuple):
+        raise RuntimeError("当前playwright版本不支持常驻浏览器服务，请升级playwright")
+    node, cli = driver
+    return str(node), os.path.dirname(str(cli))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def launch_options(browser_type: str, headless: bool) -> Dict[str, Any]:
+    """浏览器启动参数，本地启动和daemon启动共用"""
+    return {"headless": headless, "args": ["--start-maximized"] if browser_type == "chromium" else []}
+
+
+class BrowserServer:
+    """daemon中的一个浏览器服务进程，按(浏览器类型, 是否无头)区分，记录连接的客户端"""
+
+    def __init__(self, key: Tuple[str, bool]):
+        self.key = key
+        self.process: Optional[subprocess.Popen] = None
+        self.ws_endpoint: Optional[str] = None
+        self.clients: Dict[str, int] = {}  # 租约ID -> 客户端进程号
+        self.launched_at: Optional[float] = None
+        self.restarts = 0
+
+    def launch(self) -> None:
+        node, package = _driver_paths()
+        browser_type, headless = self.key
+        self.process = subprocess.Popen(
+            [node, "-e", _LAUNCH_SERVER_JS, package, browser_type, json.dumps(launch_options(browser_type, headless))],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        line = self.process.stdout.readline()
+        try:
+            result = json.loads(line)
+        except ValueError:
+            result = {"error": f"浏览器服务进程异常退出，返回码: {self.process.poll()}"}
+        if "error" in result:
+            self.close()
+            raise RuntimeError(f"浏览器服务启动失败 {browser_type}(headless={headless}): {result['error']}")
+        self.ws_endpoint = result["wsEndpoint"]
+        self.launched_at = time.time()
+
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def close(self) -> None:
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "browser": self.key[0],
+            "headless": self.key[1],
+            "alive": self.alive(),
+            "ws_endpoint": self.ws_endpoint,
+            "clients": len(self.clients),
+            "client_pids": sorted(set(self.clients.values())),
+            "restarts": self.restarts,
+            "uptime": round(time.time() - self.launched_at, 1) if self.launched_at else 0,
+        }
+
+
+class BrowserServerDaemon:
+    """常驻浏览器服务：按需启动浏览器服务并保持运行，客户端通过本地HTTP接口租用websocket地址"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, idle_timeout: float = 600,
+                 check_interval: float = 5, state_file: str = STATE_FILE):
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self.state_file = state_file
+        self._servers: Dict[Tuple[str, bool], BrowserServer] = {}
+        self._lock = threading.Lock()
+        self._last_active = time.monotonic()
+        self._started_at = time.time()
+        self._stopped = threading.Event()
+        self.httpd = ThreadingHTTPServer((host, port), _DaemonHandler)
+        self.httpd.owner = self
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def acquire(self, browser_type: str, headless: bool, pid: int) -> Dict[str, str]:
+        """租用浏览器服务，服务不存在或已退出时（重新）启动"""
+        key = (browser_type, bool(headless))
+        with self._lock:
+            self._reap_clients()
+            server = self._servers.get(key)
+            if server is None or not server.alive():
+                if server is not None:
+                    logger.warning(f"浏览器服务 {browser_type}(headless={headless}) 已退出，重新启动")
+                    server.close()
+                restarts = server.restarts + 1 if server is not None else 0
+                server = BrowserServer(key)
+                server.restarts = restarts
+                server.launch()
+                self._servers[key] = server
+            lease_id = uuid.uuid4().hex
+            server.clients[lease_id] = pid
+            self._last_active = time.monotonic()
+            return {"lease_id": lease_id, "ws_endpoint": server.ws_endpoint}
+
+    def release(self, lease_id: str) -> None:
+        with self._lock:
+            for server in self._servers.values():
+                server.clients.pop(lease_id, None)
+            self._last_active = time.monotonic()
+
+    def warm(self, browser_types: List[str], headless: bool) -> None:
+        """预先启动浏览器服务"""
+        for browser_type in browser_types:
+            lease = self.acquire(browser_type, headless, os.getpid())
+            self.release(lease["lease_id"])
+
+    def status(self) -> Dict[str, Any]:
+        """健康状态：各浏览器服务是否存活及连接的客户端数"""
+        with self._lock:
+            self._reap_clients()
+            clients = sum(len(server.clients) for server in self._servers.values())
+            return {
+                "status": "ok",
+                "pid": os.getpid(),
+                "url": self.url,
+                "started_at": datetime.fromtimestamp(self._started_at).isoformat(timespec="seconds"),
+                "idle_seconds": 0 if clients else round(time.monotonic() - self._last_active, 1),
+                "idle_timeout": self.idle_timeout,
+                "browsers": [server.to_dict() for server in self._servers.values()],
+            }
+
+    def _reap_clients(self) -> None:
+        """移除进程已退出但未释放的租约"""
+        for server in self._servers.values():
+            for lease_id, pid in list(server.clients.items()):
+                if not _pid_alive(pid):
+                    server.clients.pop(lease_id)
+
+    def _watch(self) -> None:
+        """定期清理租约，无客户端超过idle_timeout时退出"""
+        while not self._stopped.wait(self.check_interval):
+            with self._lock:
+                self._reap_clients()
+                if any(server.clients for server in self._servers.values()):
+                    self._last_active = time.monotonic()
+                idle = time.monotonic() - self._last_active
+            if self.idle_timeout and idle >= self.idle_timeout:
+                logger.info(f"空闲 {idle:.0f}s，常驻浏览器服务退出")
+                self.shutdown()
+                return
+
+    def serve_forever(self) -> None:
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        with open(self.state_file, "w", encoding="utf-8") as f:
+            json.dump({"pid": os.getpid(), "url": self.url}, f)
+        threading.Thread(target=self._watch, name="browser-server-watch", daemon=True).start()
+        logger.info(f"常驻浏览器服务已启动: {self.url}")
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self._stopped.set()
+            with self._lock:
+                for server in self._servers.values():
+                    server.close()
+                self._servers.clear()
+            self.httpd.server_close()
+            if _read_state(self.state_file).get("pid") == os.getpid():
+                os.remove(self.state_file)
+
+    def shutdown(self) -> None:
+        """停止服务；可在信号处理函数和请求处理线程中调用"""
+        threading.Thread(target=self.httpd.shutdown, daemon=True).start()
+
+
+class _DaemonHandler(BaseHTTPRequestHandler):
+    """daemon控制接口：GET /health，POST /acquire、/release、/shutdown"""
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, self.server.owner.status())
+        else:
+            self._reply(404, {"error": f"未知接口: {self.path}"})
+
+    def do_POST(self):
+        daemon: BrowserServerDaemon = self.server.owner
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if self.path == "/acquire":
+                self._reply(200, daemon.acquire(body["browser"], body["headless"], int(body["pid"])))
+            elif self.path == "/release":
+                daemon.release(body["lease_id"])
+                self._reply(200, {})
+            elif self.path == "/shutdown":
+                self._reply(200, {})
+                daemon.shutdown()
+            else:
+                self._reply(404, {"error": f"未知接口: {self.path}"})
+        except (KeyError, ValueError, RuntimeError) as e:
+            self._reply(500, {"error": str(e)})
+
+    def _reply(self, code: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+def _read_state(state_file: str = STATE_FILE) -> Dict[str, Any]:
+    try:
+        with open(state_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def discover_url(state_file: str = STATE_FILE) -> Optional[str]:
+    """从状态文件发现本机运行中的daemon地址"""
+    state = _read_state(state_file)
+    if state.get("url") and _pid_alive(int(state.get("pid", 0))):
+        return state["url"]
+    return None
+
+
+class BrowserServerClient:
+    """daemon客户端：连接常驻浏览器，daemon不存在或不可用时返回None，由调用方本地启动"""
+
+    def __init__(self, url: str, timeout: float = 60):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    @classmethod
+    def from_config(cls, config: ConfigParser) -> Optional["BrowserServerClient"]:
+        """配置启用且能找到daemon时创建客户端"""
+        if not config.get("browser_server.enabled", True):
+            return None
+        url = config.get("browser_server.url") or discover_url()
+        return cls(url) if url else None
+
+    def _request(self, path: str, payload: Dict[str, Any] = None, timeout: float = None) -> Dict[str, Any]:
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(f"{self.url}{path}", data=data,
+                                         headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                return json.loads(response.read() or b"{}")
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(json.loads(e.read() or b"{}").get("error", str(e)))
+
+    def health(self) -> Optional[Dict[str, Any]]:
+        try:
+            return self._request("/health", timeout=2)
+        except (OSError, ValueError, RuntimeError):
+            return None
+
+    def acquire(self, browser_type: str, headless: bool) -> Optional[Dict[str, str]]:
+        try:
+            return self._request("/acquire", {"browser": browser_type, "headless": bool(headless), "pid": os.getpid()})
+        except (OSError, ValueError, RuntimeError) as e:
+            logger.info(f"常驻浏览器服务不可用，改为本地启动: {e}")
+            return None
+
+    def release(self, lease_id: str) -> None:
+        try:
+            self._request("/release", {"lease_id": lease_id}, timeout=2)
+        except (OSError, ValueError, RuntimeError):
+            pass
+
+    def shutdown(self) -> None:
+        self._request("/shutdown", {}, timeout=5)
+
+    def connect(self, launcher, browser_type: str, headless: bool) -> Optional["Browser"]:
+        """租用并连接浏览器，浏览器断开（关闭或崩溃）时释放租约"""
+        from playwright.sync_api import Error as PlaywrightError
+        lease = self.acquire(browser_type, headless)
+        if lease is None:
+            return None
+        try:
+            browser = launcher.connect(lease["ws_endpoint"])
+        except PlaywrightError as e:
+            logger.info(f"连接常驻浏览器失败，改为本地启动: {e}")
+            self.release(lease["lease_id"])
+            return None
+        browser.on("disconnected", lambda _browser: self.release(lease["lease_id"]))
+        return browser
+
+    async def connect_async(self, launcher, browser_type: str, headless: bool):
+        """connect的async_api版本"""
+        from playwright.async_api import Error as PlaywrightError
+        lease = self.acquire(browser_type, headless)
+        if lease is None:
+            return None
+        try:
+            browser = await launcher.connect(lease["ws_endpoint"])
+        except PlaywrightError as e:
+            logger.info(f"连接常驻浏览器失败，改为本地启动: {e}")
+            self.release(lease["lease_id"])
+            return None
+        browser.on("disconnected", lambda _browser: self.release(lease["lease_id"]))
+        return browser
+
+
+def launch_browser(playwright, browser_type: str, headless: bool,
+                   client: Optional[BrowserServerClient] = None) -> Tuple["Browser", bool]:
+    """优先连接常驻浏览器，不可用时本地启动，返回(浏览器, 是否为常驻浏览器)"""
+    browser_launcher = getattr(playwright, browser_type, None)
+    if not browser_launcher:
+        raise ValueError(f"不支持的浏览器类型: {browser_type}")
+    if client:
+        browser = client.connect(browser_launcher, browser_type, headless)
+        if browser is not None:
+            return browser, True
+    return browser_launcher.launch(**launch_options(browser_type, headless)), False
+
+
+def _start_detached(argv: List[str]) -> int:
+    """后台启动daemon并等待其就绪"""
+    os.makedirs(os.path.dirname(LOG_FILE), exist_ok=True)
+    with open(LOG_FILE, "a", encoding="utf-8") as log:
+        process = subprocess.Popen([sys.executable, "-m", "src.browser_server", *argv], stdout=log,
+                                   stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL, start_new_session=True)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        state = _read_state()
+        if state.get("pid") == process.pid:
+            print(f"常驻浏览器服务已在后台启动: {state['url']}（pid {process.pid}，日志: {LOG_FILE}）")
+            return 0
+        if process.poll() is not None:
+            break
+        time.sleep(0.2)
+    print(f"常驻浏览器服务启动失败，详见日志: {LOG_FILE}")
+    return 1
+
+
+def _print_status(status: Dict[str, Any]) -> None:
+    print(f"常驻浏览器服务: {status['url']}（pid {status['pid']}，启动于 {status['started_at']}，"
+          f"空闲 {status['idle_seconds']}s / 超时 {status['idle_timeout']}s）")
+    if not status["browsers"]:
+        print("  尚未启动浏览器")
+    for browser in status["browsers"]:
+        state = "运行中" if browser["alive"] else "已退出"
+        print(f"  {browser['browser']}(headless={browser['headless']}): {state}，客户端 {browser['clients']} 个"
+              f"，重启 {browser['restarts']} 次，已运行 {browser['uptime']}s")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="常驻浏览器服务：多次pytest调用共用已启动的浏览器")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    start = subparsers.add_parser("start", help="启动daemon")
+    start.add_argument("--port", type=int, help="监听端口，默认取配置browser_server.port")
+    start.add_argument("--idle-timeout", type=float, help="无客户端超过该秒数后退出，0表示不退出")
+    start.add_argument("--warm", help="启动后立即预热的浏览器，逗号分隔，如 chromium,firefox")
+    start.add_argument("--detach", action="store_true", help="后台运行")
+    subparsers.add_parser("status", help="查看浏览器服务和客户端数")
+    subparsers.add_parser("stop", help="停止daemon")
+    args = parser.parse_args()
+
+    config = ConfigParser()
+    if args.command == "start":
+        if discover_url():
+            print(f"常驻浏览器服务已在运行: {discover_url()}")
+            return 0
+        if args.detach:
+            return _start_detached([arg for arg in sys.argv[1:] if arg != "--detach"])
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+        daemon = BrowserServerDaemon(
+            port=args.port if args.port is not None else int(config.get("browser_server.port", 0) or 0),
+            idle_timeout=args.idle_timeout if args.idle_timeout is not None
+            else float(config.get("browser_server.idle_timeout", 600) or 0),
+        )
+        signal.signal(signal.SIGTERM, lambda *_: daemon.shutdown())
+        if args.warm:
+            daemon.warm(args.warm.split(","), config.get("headless"))
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    url = config.get("browser_server.url") or discover_url()
+    client = BrowserServerClient(url) if url else None
+    status = client.health() if client else None
+    if status is None:
+        print("常驻浏览器服务未运行")
+        return 1 if args.command == "status" else 0
+    if args.command == "status":
+        _print_status(status)
+    else:
+        client.shutdown()
+        print(f"已停止常驻浏览器服务: {url}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.utils.config_parser import ConfigParser
+
+# 默认可重试的异常：超时、页面/上下文意外关闭（含崩溃）；断言失败说明结果不符合预期，不重试
+DEFAULT_RETRY_ON = ("TimeoutError", "TargetClosedError")
+
+
+class Checkpoint:
+    """步骤断点：上下文的登录态（cookie、localStorage）、当前URL和用例动态数据的状态"""
+
+    def __init__(self, step_index: int, description: str, storage_state: Dict[str, Any], url: str,
+                 data_state: Any, elapsed: float):
+        """
+        :param step_index: 打断点的步骤序号（从0开始），恢复后从下一步继续
+        :param elapsed: 用例开始到断点的耗时，即从断点恢复相对整个用例重跑节省的执行时间
+        """
+        self.step_index = step_index
+        self.description = description
+        self.storage_state = storage_state
+        self.url = url
+        self.data_state = data_state
+        self.elapsed = elapsed
+
+
+class RetryPolicy:
+    """从断点重试的策略：最大重试次数和可重试的异常类型（按类名匹配，含父类）"""
+
+    def __init__(self, max_retries: int = 1, retry_on: Sequence[str] = DEFAULT_RETRY_ON):
+        self.max_retries = max(0, int(max_retries))
+        self.retry_on = set(retry_on)
+
+    @classmethod
+    def from_config(cls, config: ConfigParser, case: Optional[Dict[str, Any]] = None) -> "RetryPolicy":
+        """用例声明retry时覆盖配置中的checkpoint.max_retries"""
+        max_retries = (case or {}).get("retry")
+        if max_retries is None:
+            max_retries = config.get("checkpoint.max_retries", 1) or 0
+        return cls(max_retries, config.get("checkpoint.retry_on", DEFAULT_RETRY_ON) or ())
+
+    def retryable(self, error: BaseException) -> bool:
+        return any(cls.__name__ in self.retry_on for cls in type(error).__mro__)
+
+
+class RetryRecord:
+    """一次从断点恢复的记录，用于统计节省的时间和定位不稳定的步骤"""
+
+    def __init__(self, step_index: int, step: str, error: BaseException, checkpoint: Checkpoint, restore_seconds: float):
+        self.step_index = step_index
+        self.step = step
+        self.error = f"{type(error).__name__}: {str(error).splitlines()[0] if str(error) else ''}"[:200]
+        self.checkpoint_index = checkpoint.step_index
+        self.checkpoint = checkpoint.description
+        self.restore_seconds = restore_seconds
+        # 相对整个用例重跑节省的时间：断点之前的步骤不再执行，扣除恢复断点本身的耗时
+        self.saved_seconds = checkpoint.elapsed - restore_seconds
+        self.recorded_at = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"step_index": self.step_index + 1, "step": self.step, "error": self.error,
+                "checkpoint_index": self.checkpoint_index + 1, "checkpoint": self.checkpoint,
+                "restore_seconds": round(self.restore_seconds, 3), "saved_seconds": round(self.saved_seconds, 3)}
+
+
+def validate_checkpoints(case_name: str, case: Dict[str, Any]) -> List[str]:
+    """校验用例的checkpoint/retry字段"""
+    errors = []
+    if "retry" in case and (isinstance(case["retry"], bool) or not isinstance(case["retry"], int) or case["retry"] < 0):
+        errors.append(f"{case_name}: retry应为非负整数")
+    marked = [index for index, step in enumerate(case.get("steps") or [], start=1)
+              if isinstance(step, dict) and "checkpoint" in step]
+    for index in marked:
+        if not isinstance(case["steps"][index - 1]["checkpoint"], bool):
+            errors.append(f"{case_name} 第{index}步: checkpoint应为布尔值")
+    if marked and case.get("dataset"):
+        errors.append(f"{case_name}: 数据驱动用例不支持checkpoint（行之间已通过reset步骤恢复状态）")
+    return errors
@@ -0,0 +1,615 @@
+import base64
+import hmac
+import ipaddress
+import json
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import pytest
+
+from src.timing_db import TimingDB
+from src.utils.config_parser import CONFIG_SNAPSHOT_ENV, ConfigParser
+
+logger = logging.getLogger(__name__)
+
+DISTRIBUTED_DIR = os.path.join(".ui_cache", "distributed")
+WORKER_LOG_DIR = os.path.join("reports", "logs")
+TOKEN_HEADER = "X-UI-Automator-Token"
+# 队列暂时为空（其余用例仍在其他worker上执行）时worker的轮询间隔(秒)
+POLL_INTERVAL = 1.0
+
+
+class CaseTask:
+    """队列中的用例及其因worker失联被重新分配的次数"""
+
+    __slots__ = ("case_id", "estimated", "attempts")
+
+    def __init__(self, case_id: str, estimated: float):
+        self.case_id = case_id
+        self.estimated = estimated
+        self.attempts = 0
+
+
+class Lease:
+    """worker正在执行的用例，心跳超时后视为worker失联"""
+
+    __slots__ = ("lease_id", "task", "worker_id", "started", "deadline")
+
+    def __init__(self, task: CaseTask, worker_id: str, timeout: float):
+        self.lease_id = uuid.uuid4().hex
+        self.task = task
+        self.worker_id = worker_id
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout
+
+
+class WorkerInfo:
+    """已接入的worker"""
+
+    def __init__(self, worker_id: str, host: str, pid: int):
+        self.worker_id = worker_id
+        self.host = host
+        self.pid = pid
+        self.last_seen = time.monotonic()
+        self.cases = 0
+        self.busy = 0.0
+        self.left = False
+
+
+class Coordinator:
+    """分布式执行的协调者：按预估耗时从长到短排队，worker通过HTTP逐个领取用例并回传结果、耗时和Allure结果文件
+
+    worker心跳超时后其执行中的用例重新入队，超过max_retries次后记为broken；结果文件合并到同一个Allure结果目录
+    """
+
+    def __init__(self, case_ids: List[str], config: ConfigParser, host: str = "127.0.0.1", port: int = 0,
+                 lease_timeout: float = 60, max_retries: int = 2, max_workers: int = 32, token: str = None,
+                 allure_dir: str = "reports/allure-results", timing_db: TimingDB = None):
+        if not token and not _is_loopback(host):
+            raise ValueError(f"协调者监听非本机地址 {host} 时必须配置distributed.token"
+                             f"（或环境变量UI_AUTOMATION_DISTRIBUTED_TOKEN）")
+        self.config = config
+        self.lease_timeout = lease_timeout
+        self.max_retries = max_retries
+        self.max_workers = max_workers
+        self.token = str(token) if token else None
+        self.allure_dir = allure_dir
+        self.timing_db = timing_db or TimingDB()
+        self.run_id = uuid.uuid4().hex[:12]
+        self.data_seed = os.getenv("UI_AUTOMATOR_DATA_SEED") or config.get("data.seed") \
+            or str(uuid.uuid4().int % 10 ** 9)
+        # 下发给worker的配置快照，worker不读取本地配置文件；来自环境变量的账号密码等不下发，由worker从自身环境变量读取
+        snapshot_path = os.path.join(DISTRIBUTED_DIR, f"{self.run_id}-config.json")
+        config.dump_snapshot(snapshot_path, redact_env=True)
+        with open(snapshot_path, "r", encoding="utf-8") as f:
+            self.config_snapshot = f.read()
+
+        durations = self.timing_db.average_durations(case_ids, browser=config.get("browser"))
+        # 结束时在run()所在线程重新打开
+        self.timing_db.close()
+        fallback = max(durations.values()) if durations else 0.0
+        # 耗时长的用例先分配，减少最后单个长用例拖尾
+        tasks = sorted((CaseTask(case_id, durations.get(case_id, fallback)) for case_id in case_ids),
+                       key=lambda task: -task.estimated)
+        self._queue: Deque[CaseTask] = deque(tasks)
+        self._total = len(tasks)
+        self._leases: Dict[str, Lease] = {}
+        self._workers: Dict[str, WorkerInfo] = {}
+        self.outcomes: Dict[str, str] = {}
+        # (用例, 耗时, 结果, worker)，结束时在主线程写入耗时数据库
+        self._timings: List[Tuple[str, float, str, str]] = []
+        self.requeued = 0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._stopped = threading.Event()
+        self.started_at = time.monotonic()
+        os.makedirs(allure_dir, exist_ok=True)
+        self.httpd = ThreadingHTTPServer((host, port), _CoordinatorHandler)
+        self.httpd.owner = self
+        if not tasks:
+            self._done.set()
+
+    @classmethod
+    def from_config(cls, case_ids: List[str], config: ConfigParser, port: int = None,
+                    allure_dir: str = "reports/allure-results") -> "Coordinator":
+        """根据配置创建协调者"""
+        return cls(
+            case_ids, config,
+            host=config.get("distributed.host", "127.0.0.1"),
+            port=int(config.get("distributed.port", 8765) if port is None else port),
+            lease_timeout=float(config.get("distributed.lease_timeout", 60)),
+            max_retries=int(config.get("distributed.max_retries", 2)),
+            max_workers=int(config.get("distributed.max_workers", 32)),
+            token=config.get("distributed.token"),
+            allure_dir=allure_dir,
+        )
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        if host in ("0.0.0.0", ""):
+            host = socket.gethostname()
+        return f"http://{host}:{port}"
+
+    @property
+    def local_url(self) -> str:
+        """本机worker使用的地址"""
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def register(self, host: str, pid: int) -> Dict[str, Any]:
+        """接入worker，分配worker ID并下发运行参数；运行中途接入的worker同样可以领取剩余用例"""
+        with self._lock:
+            if len(self._workers) >= self.max_workers:
+                raise ValueError(f"worker数量已达上限 {self.max_workers}（distributed.max_workers）")
+            worker_id = str(len(self._workers))
+            self._workers[worker_id] = WorkerInfo(worker_id, host, pid)
+        logger.info(f"worker-{worker_id} 接入: {host} pid={pid}")
+        return {
+            "worker_id": worker_id,
+            "run_id": self.run_id,
+            "data_seed": str(self.data_seed),
+            "worker_count": self.max_workers,
+            "env": self.config.snapshot.meta.get("env"),
+            "config_snapshot": self.config_snapshot,
+            "lease_timeout": self.lease_timeout,
+        }
+
+    def lease(self, worker_id: str) -> Dict[str, Any]:
+        """领取下一个用例；队列为空但仍有用例在执行时让worker稍后再试，全部完成时返回done"""
+        with self._lock:
+            self._worker(worker_id)
+            self._expire_leases()
+            if self._queue:
+                task = self._queue.popleft()
+                lease = Lease(task, worker_id, self.lease_timeout)
+                self._leases[lease.lease_id] = lease
+                return {"lease_id": lease.lease_id, "case_id": task.case_id, "attempt": task.attempts + 1}
+            if self._done.is_set():
+                return {"done": True}
+            return {"wait": POLL_INTERVAL}
+
+    def heartbeat(self, worker_id: str) -> None:
+        """延长worker全部租约的有效期"""
+        with self._lock:
+            self._worker(worker_id)
+            deadline = time.monotonic() + self.lease_timeout
+            for lease in self._leases.values():
+                if lease.worker_id == worker_id:
+                    lease.deadline = deadline
+
+    def complete(self, worker_id: str, lease_id: str, result: Dict[str, Any]) -> bool:
+        """接收用例结果；租约已过期（用例已重新入队）时丢弃，返回是否接受"""
+        with self._lock:
+            self._worker(worker_id)
+            lease = self._leases.pop(lease_id, None)
+            if lease is None:
+                logger.warning(f"worker-{worker_id} 回传了已失效租约的结果，丢弃")
+                return False
+        case_id = lease.task.case_id
+        self._write_files(result.get("files", []))
+        if result.get("error"):
+            self._write_broken_result(case_id, result["error"])
+        duration = float(result.get("duration", 0.0))
+        outcome = result.get("outcome", "broken")
+        with self._lock:
+            worker = self._workers[worker_id]
+            worker.cases += 1
+            worker.busy += duration
+            self.outcomes[case_id] = outcome
+            self._timings.append((case_id, duration, outcome, worker_id))
+            self._check_done()
+        return True
+
+    def upload(self, worker_id: str, files: List[Dict[str, str]]) -> None:
+        """接收不属于单个用例的结果文件（如会话级fixture的容器文件）"""
+        with self._lock:
+            self._worker(worker_id)
+        self._write_files(files)
+
+    def leave(self, worker_id: str) -> None:
+        """worker正常退出，其未回传的租约立即重新入队"""
+        with self._lock:
+            worker = self._worker(worker_id)
+            worker.left = True
+            for lease in [lease for lease in self._leases.values() if lease.worker_id == worker_id]:
+                self._requeue(lease, "worker已退出")
+        logger.info(f"worker-{worker_id} 退出，执行用例 {worker.cases} 个")
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "status": "done" if self._done.is_set() else "running",
+                "run_id": self.run_id,
+                "total": self._total,
+                "queued": len(self._queue),
+                "running": {lease.task.case_id: f"worker-{lease.worker_id}" for lease in self._leases.values()},
+                "finished": len(self.outcomes),
+                "requeued": self.requeued,
+                "workers": {worker_id: {"host": worker.host, "cases": worker.cases, "left": worker.left}
+                            for worker_id, worker in self._workers.items()},
+            }
+
+    def _worker(self, worker_id: str) -> WorkerInfo:
+        worker = self._workers.get(worker_id)
+        if worker is None:
+            raise KeyError(f"未注册的worker: {worker_id}")
+        worker.last_seen = time.monotonic()
+        return worker
+
+    def _expire_leases(self) -> None:
+        """心跳超时的租约重新入队（需持有锁）"""
+        now = time.monotonic()
+        for lease in [lease for lease in self._leases.values() if lease.deadline < now]:
+            self._requeue(lease, f"worker-{lease.worker_id} 心跳超时")
+
+    def _requeue(self, lease: Lease, reason: str) -> None:
+        """把租约的用例放回队首；重新分配次数超过上限时记为broken（需持有锁）"""
+        self._leases.pop(lease.lease_id, None)
+        task = lease.task
+        task.attempts += 1
+        if task.attempts > self.max_retries:
+            logger.warning(f"{task.case_id}: {reason}，已重新分配 {self.max_retries} 次，记为broken")
+            self.outcomes[task.case_id] = "broken"
+            self._write_broken_result(task.case_id, f"{reason}，重新分配 {self.max_retries} 次后仍未完成")
+            self._check_done()
+            return
+        logger.warning(f"{task.case_id}: {reason}，重新入队（第{task.attempts}次）")
+        self.requeued += 1
+        self._queue.appendleft(task)
+
+    def _check_done(self) -> None:
+        if len(self.outcomes) >= self._total:
+            self._done.set()
+
+    def _write_files(self, files: List[Dict[str, str]]) -> None:
+        """写入worker回传的Allure结果文件；文件名为uuid，各worker的结果可直接合并"""
+        for item in files:
+            name = os.path.basename(item["name"])
+            with open(os.path.join(self.allure_dir, name), "wb") as f:
+                f.write(base64.b64decode(item["data"]))
+
+    def _write_broken_result(self, case_id: str, message: str) -> None:
+        """没有worker结果的用例（worker失联或未收集到）写一条broken结果，报告中不会缺失"""
+        now = int(time.time() * 1000)
+        result = {
+            "uuid": str(uuid.uuid4()),
+            "name": case_id.split("::")[-1],
+            "fullName": case_id,
+            "status": "broken",
+            "statusDetails": {"message": message},
+            "stage": "finished",
+            "start": now,
+            "stop": now,
+            "labels": [{"name": "suite", "value": case_id.split("::")[0]}],
+        }
+        with open(os.path.join(self.allure_dir, f"{result['uuid']}-result.json"), "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+
+    def _watch(self) -> None:
+        """定期回收心跳超时的租约，worker全部失联时用例同样能结束"""
+        while not self._stopped.wait(min(5.0, self.lease_timeout / 3)):
+            with self._lock:
+                self._expire_leases()
+
+    def run(self, timeout: float = None) -> int:
+        """启动HTTP服务，等待全部用例完成、worker退出，返回退出码"""
+        thread = threading.Thread(target=self.httpd.serve_forever, name="coordinator", daemon=True)
+        thread.start()
+        threading.Thread(target=self._watch, name="coordinator-watch", daemon=True).start()
+        try:
+            self._done.wait(timeout)
+            # 给worker时间领取done并上传会话结束时写出的结果文件
+            deadline = time.monotonic() + self.lease_timeout
+            while time.monotonic() < deadline and not self._workers_finished():
+                time.sleep(0.2)
+        finally:
+            self._stopped.set()
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            browser = self.config.get("browser")
+            for case_id, duration, outcome, worker_id in self._timings:
+                self.timing_db.record(case_id, duration, outcome, browser=browser, run_id=self.run_id,
+                                      worker_id=worker_id)
+            self.timing_db.close()
+        if not self._done.is_set():
+            return 1
+        return 1 if any(outcome not in ("passed", "skipped") for outcome in self.outcomes.values()) else 0
+
+    def _workers_finished(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            return all(worker.left or now - worker.last_seen > self.lease_timeout
+                       for worker in self._workers.values())
+
+    def print_summary(self) -> None:
+        wall_time = time.monotonic() - self.started_at
+        failed = [case_id for case_id, outcome in self.outcomes.items() if outcome not in ("passed", "skipped")]
+        print(f"\n分布式执行完成：{len(self.outcomes)}/{self._total} 个用例，{len(self._workers)} 个worker，"
+              f"失败 {len(failed)} 个，重新入队 {self.requeued} 次，总耗时 {wall_time:.1f}s")
+        for worker_id, worker in self._workers.items():
+            utilization = worker.busy / wall_time if wall_time else 0.0
+            print(f"  worker-{worker_id} ({worker.host}): {worker.cases} 个用例，执行 {worker.busy:.1f}s，"
+                  f"利用率 {utilization:.0%}")
+        for case_id in failed:
+            print(f"  {self.outcomes[case_id].upper()} {case_id}")
+        print(f"  数据种子: {self.data_seed}（复现: UI_AUTOMATOR_DATA_SEED={self.data_seed}）")
+
+
+class _CoordinatorHandler(BaseHTTPRequestHandler):
+    """协调者接口：GET /status，POST /register、/lease、/heartbeat、/complete、/upload、/leave"""
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == "/status":
+            self._reply(200, self.server.owner.status())
+        else:
+            self._reply(404, {"error": f"未知接口: {self.path}"})
+
+    def do_POST(self):
+        coordinator: Coordinator = self.server.owner
+        if not self._authorized():
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if self.path == "/register":
+                self._reply(200, coordinator.register(body.get("host", ""), int(body.get("pid", 0))))
+            elif self.path == "/lease":
+                self._reply(200, coordinator.lease(body["worker_id"]))
+            elif self.path == "/heartbeat":
+                coordinator.heartbeat(body["worker_id"])
+                self._reply(200, {})
+            elif self.path == "/complete":
+                accepted = coordinator.complete(body["worker_id"], body["lease_id"], body["result"])
+                self._reply(200, {"accepted": accepted})
+            elif self.path == "/upload":
+                coordinator.upload(body["worker_id"], body.get("files", []))
+                self._reply(200, {})
+            elif self.path == "/leave":
+                coordinator.leave(body["worker_id"])
+                self._reply(200, {})
+            else:
+                self._reply(404, {"error": f"未知接口: {self.path}"})
+        except (KeyError, ValueError) as e:
+            self._reply(400, {"error": str(e)})
+
+    def _authorized(self) -> bool:
+        """配置了token时校验请求头，不匹配时返回403"""
+        token = self.server.owner.token
+        if token and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, "").encode("utf-8"), token.encode("utf-8")):
+            self._reply(403, {"error": "token不匹配"})
+            return False
+        return True
+
+    def _reply(self, code: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class CoordinatorClient:
+    """worker端的协调者客户端"""
+
+    def __init__(self, url: str, token: str = None, timeout: float = 60):
+        self.url = url.rstrip("/")
+        self.token = token or None
+        self.timeout = timeout
+        self.worker_id: Optional[str] = None
+
+    def _request(self, path: str, payload: Dict[str, Any] = None) -> Dict[str, Any]:
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers[TOKEN_HEADER] = self.token
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(f"{self.url}{path}", data=data, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read() or b"{}")
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(json.loads(e.read() or b"{}").get("error", str(e)))
+
+    def register(self) -> Dict[str, Any]:
+        info = self._request("/register", {"host": socket.gethostname(), "pid": os.getpid()})
+        self.worker_id = info["worker_id"]
+        return info
+
+    def lease(self) -> Dict[str, Any]:
+        return self._request("/lease", {"worker_id": self.worker_id})
+
+    def heartbeat(self) -> None:
+        self._request("/heartbeat", {"worker_id": self.worker_id})
+
+    def complete(self, lease_id: str, result: Dict[str, Any]) -> bool:
+        response = self._request("/complete", {"worker_id": self.worker_id, "lease_id": lease_id, "result": result})
+        return bool(response.get("accepted"))
+
+    def upload(self, files: List[Dict[str, str]]) -> None:
+        self._request("/upload", {"worker_id": self.worker_id, "files": files})
+
+    def leave(self) -> None:
+        self._request("/leave", {"worker_id": self.worker_id})
+
+
+class WorkerSession:
+    """worker端pytest插件：替换默认执行循环，逐个向协调者领取用例并在同一会话中执行，会话级fixture（浏览器池等）保持复用"""
+
+    def __init__(self, client: CoordinatorClient, allure_dir: str, heartbeat_interval: float):
+        self.client = client
+        self.allure_dir = allure_dir
+        self.heartbeat_interval = heartbeat_interval
+        self._sent: set = set()
+        self._result: Dict[str, Any] = {}
+        self._stopped = threading.Event()
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtestloop(self, session) -> bool:
+        items = {item.nodeid: item for item in session.items}
+        threading.Thread(target=self._heartbeat, name="worker-heartbeat", daemon=True).start()
+        try:
+            while not session.shouldstop:
+                lease = self._lease()
+                if lease is None:
+                    break
+                self._run_case(session, items, lease)
+        finally:
+            self._stopped.set()
+        return True
+
+    def _lease(self) -> Optional[Dict[str, Any]]:
+        """领取用例，全部完成或协调者已退出时返回None"""
+        while True:
+            try:
+                lease = self.client.lease()
+            except (OSError, RuntimeError) as e:
+                logger.warning(f"无法连接协调者，worker退出: {e}")
+                return None
+            if lease.get("done"):
+                return None
+            if "case_id" in lease:
+                return lease
+            time.sleep(lease.get("wait", POLL_INTERVAL))
+
+    def _run_case(self, session, items: Dict[str, Any], lease: Dict[str, Any]) -> None:
+        item = items.get(lease["case_id"])
+        self._result = {"outcome": "passed", "duration": 0.0}
+        if item is None:
+            self._result.update(outcome="broken", error=f"worker中未收集到用例，请确认代码版本与协调者一致: {lease['case_id']}")
+        else:
+            item.config.hook.pytest_runtest_protocol(item=item, nextitem=_neighbour(item, session.items))
+        self._result["files"] = self._new_files()
+        try:
+            self.client.complete(lease["lease_id"], self._result)
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"回传用例结果失败: {lease['case_id']}, {e}")
+
+    def pytest_runtest_logreport(self, report) -> None:
+        self._result["duration"] = self._result.get("duration", 0.0) + report.duration
+        if report.failed:
+            self._result["outcome"] = "failed" if report.when == "call" else "broken"
+        elif report.skipped and self._result.get("outcome") == "passed":
+            self._result["outcome"] = "skipped"
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session) -> None:
+        """会话级fixture清理后上传剩余结果文件，并通知协调者退出"""
+        try:
+            files = self._new_files()
+            if files:
+                self.client.upload(files)
+            self.client.leave()
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"通知协调者退出失败: {e}")
+
+    def _new_files(self) -> List[Dict[str, str]]:
+        """本地Allure结果目录中尚未回传的文件，读取后删除"""
+        files = []
+        if not os.path.isdir(self.allure_dir):
+            return files
+        for name in sorted(os.listdir(self.allure_dir)):
+            path = os.path.join(self.allure_dir, name)
+            if name in self._sent or not os.path.isfile(path):
+                continue
+            with open(path, "rb") as f:
+                files.append({"name": name, "data": base64.b64encode(f.read()).decode("ascii")})
+            self._sent.add(name)
+            os.remove(path)
+        return files
+
+    def _heartbeat(self) -> None:
+        while not self._stopped.wait(self.heartbeat_interval):
+            try:
+                self.client.heartbeat()
+            except (OSError, RuntimeError) as e:
+                logger.debug(f"心跳失败: {e}")
+
+
+def _is_loopback(host: str) -> bool:
+    """监听地址是否只允许本机访问"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _neighbour(item, items: List[Any]):
+    """传给pytest的nextitem：只决定清理到哪一层，取同一文件中的其他用例，使会话级fixture不被提前清理"""
+    fallback = None
+    for other in items:
+        if other is item:
+            continue
+        if other.parent is item.parent:
+            return other
+        fallback = fallback or other
+    return fallback
+
+
+def run_worker(url: str, test_dir: str = "tests", pytest_args: List[str] = None, token: str = None) -> int:
+    """以worker身份接入协调者，在一个pytest会话中逐个执行领取到的用例，返回pytest退出码"""
+    client = CoordinatorClient(url, token or os.getenv("UI_AUTOMATION_DISTRIBUTED_TOKEN"))
+    info = client.register()
+    worker_id = info["worker_id"]
+    print(f"已接入协调者 {url}：worker-{worker_id}，运行ID {info['run_id']}")
+
+    work_dir = tempfile.mkdtemp(prefix=f"ui-worker-{worker_id}-")
+    snapshot_path = os.path.join(work_dir, "config.json")
+    with open(snapshot_path, "w", encoding="utf-8") as f:
+        f.write(info["config_snapshot"])
+    os.environ.update({
+        "UI_AUTOMATOR_RUN_ID": info["run_id"],
+        "UI_AUTOMATOR_WORKER_ID": worker_id,
+        "UI_AUTOMATOR_WORKER_COUNT": str(info["worker_count"]),
+        "UI_AUTOMATOR_DATA_SEED": info["data_seed"],
+        CONFIG_SNAPSHOT_ENV: snapshot_path,
+    })
+
+    allure_dir = os.path.join(work_dir, "allure-results")
+    session = WorkerSession(client, allure_dir, heartbeat_interval=max(1.0, float(info["lease_timeout"]) / 3))
+    args = [
+        f"{test_dir}/",
+        f"--alluredir={allure_dir}",
+        "--skip-preflight",
+        # 耗时由协调者统一记录
+        "-p", "no:timing_recorder",
+    ]
+    if info.get("env"):
+        args.append(f"--env={info['env']}")
+    try:
+        return pytest.main(args + list(pytest_args or []), plugins=[session])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def spawn_local_workers(count: int, url: str, test_dir: str = "tests") -> List[subprocess.Popen]:
+    """在本机启动count个worker进程，便于单机验证分布式执行"""
+    os.makedirs(WORKER_LOG_DIR, exist_ok=True)
+    processes = []
+    for index in range(count):
+        log_path = os.path.join(WORKER_LOG_DIR, f"distributed-worker-{index}.log")
+        with open(log_path, "w", encoding="utf-8") as log_file:
+            processes.append(subprocess.Popen(
+                [sys.executable, "pytest_runner.py", "--worker", url, "--test-dir", test_dir],
+                stdout=log_file, stderr=subprocess.STDOUT,
+            ))
+        print(f"本地worker {index}: 日志 {log_path}")
+    return processes
@@ -1,47 +1,128 @@
-from playwright.sync_api import sync_playwright, Browser, Page, BrowserContext
+from typing import TYPE_CHECKING, Any, Dict
+
+from src.auth_cache import AuthStateCache
+from src.browser_pool import BrowserPool
+from src.browser_server import BrowserServerClient, launch_browser
+from src.routing import RequestRouter, RoutingStats
+from src.tracing import CaseTrace, FailureTracer
 from src.utils.config_parser import ConfigParser
+from src.utils.perf import CountingProxy, recorder
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Browser, BrowserContext, Page
 
 
 class Driver:
-    def __init__(self, config: ConfigParser):
+    def __init__(self, config: ConfigParser, pool: BrowserPool = None, auth_cache: AuthStateCache = None):
         self.config = config
+        self.pool = pool
+        self.auth_cache = auth_cache
         self.playwright = None
-        self.browser: Browser = None
-        self.context: BrowserContext = None
-        self.page: Page = None
+        self.browser: "Browser" = None
+        self.context: "BrowserContext" = None
+        self.page: "Page" = None
+        self.router = RequestRouter(config)
+        self.routing_stats = RoutingStats()
+        self.tracer = FailureTracer(config)
+        self.trace: CaseTrace = None
+        self._crashed = False
+        self._case_id = None
+        self._context_options: Dict[str, Any] = {}
 
-    def start(self) -> Page:
-        """启动浏览器并创建页面"""
-        self.playwright = sync_playwright().start()
+    def start(self, auth: str = None, case_id: str = None, browser: str = None) -> "Page":
+        """启动浏览器并创建页面，指定auth时使用缓存的登录态创建上下文，case_id用于HAR录制/回放；
+        browser用于浏览器矩阵，覆盖配置中的浏览器类型"""
+        with recorder.span("driver.start", kind="driver"):
+            return self._start(auth, case_id, browser)
 
-        # 根据配置选择浏览器
-        browser_type = self.config.get("browser")
-        browser_launcher = getattr(self.playwright, browser_type, None)
-        if not browser_launcher:
-            raise ValueError(f"不支持的浏览器类型: {browser_type}")
+    def _start(self, auth: str = None, case_id: str = None, browser: str = None) -> "Page":
+        browser_type = browser or self.config.get("browser")
+        headless = self.config.get("headless")
 
-        # 启动浏览器
-        self.browser = browser_launcher.launch(
-            headless=self.config.get("headless"),
-            args=["--start-maximized"] if browser_type == "chromium" else []
-        )
+        if self.pool:
+            # 从浏览器池获取已启动的浏览器，只新建上下文
+            self.browser = self.pool.acquire(browser_type, headless)
+        else:
+            self.browser = self._launch_browser(browser_type, headless)
 
         # 创建上下文和页面
-        self.context = self.browser.new_context(viewport=None)  # 最大化窗口
+        context_options = {"viewport": None}  # 最大化窗口
+        context_options.update(self.router.context_options(case_id))
+        self._case_id = case_id
+        self._context_options = dict(context_options)
+        if auth:
+            if not self.auth_cache:
+                raise ValueError(f"用例声明了auth: {auth}，但未配置登录态缓存")
+            context_options["storage_state"] = self.auth_cache.get_storage_state(self.browser, auth)
+        self.routing_stats = self.router.attach(self._open_context(context_options), case_id)
+        return self.page
+
+    def restart_context(self, storage_state: Dict[str, Any]) -> "Page":
+        """关闭当前上下文，用保存的storage state新建上下文和页面（从步骤断点恢复时使用），路由统计累计到原用例"""
+        with recorder.span("driver.restart_context", kind="driver"):
+            self._close_context()
+            stats = self.router.attach(self._open_context(dict(self._context_options, storage_state=storage_state)),
+                                       self._case_id)
+            stats.blocked += self.routing_stats.blocked
+            stats.replayed += self.routing_stats.replayed
+            stats.bytes_saved += self.routing_stats.bytes_saved
+            self.routing_stats = stats
+            return self.page
+
+    def _open_context(self, context_options: Dict[str, Any]):
+        self.context = self.browser.new_context(**context_options)
+        # 失败时才保留的trace，未启用时为None
+        self.trace = self.tracer.attach(self.context, self._case_id)
         self.page = self.context.new_page()
         self.page.set_default_timeout(self.config.get("timeout.element"))
+        self.page.on("crash", self._on_crash)
+        if recorder.enabled:
+            # 统计页面及其Locator上的Playwright调用次数
+            self.page = CountingProxy(self.page)
+        return self.context
 
-        return self.page
+    def _launch_browser(self, browser_type: str, headless: bool) -> "Browser":
+        """不使用浏览器池时，单独启动Playwright，优先连接常驻浏览器服务，不可用时本地启动浏览器"""
+        from playwright.sync_api import sync_playwright
+        self.playwright = sync_playwright().start()
+        browser, _connected = launch_browser(self.playwright, browser_type, headless,
+                                             BrowserServerClient.from_config(self.config))
+        return browser
+
+    def _on_crash(self, _page) -> None:
+        self._crashed = True
 
     def stop(self) -> None:
-        """关闭浏览器和Playwright"""
+        """关闭上下文；浏览器归还给浏览器池，或直接关闭浏览器和Playwright"""
+        with recorder.span("driver.stop", kind="driver"):
+            self._stop()
+
+    def _close_context(self) -> None:
+        if self.trace:
+            self.trace.close()
+            self.trace = None
         if self.context:
-            self.context.close()
-        if self.browser:
-            self.browser.close()
-        if self.playwright:
-            self.playwright.stop()
+            from playwright.sync_api import Error as PlaywrightError
+            try:
+                self.context.close()
+            except PlaywrightError:
+                self._crashed = True
+        self.context = None
+        self.page = None
+
+    def _stop(self) -> None:
+        self._close_context()
+        if self.pool:
+            if self.browser:
+                self.pool.release(self.browser, crashed=self._crashed)
+        else:
+            if self.browser:
+                self.browser.close()
+            if self.playwright:
+                self.playwright.stop()
+        self.context = None
+        self.page = None
 
-    def get_page(self) -> Page:
+    def get_page(self) -> "Page":
         """获取当前页面对象"""
         return self.page
@@ -0,0 +1,260 @@
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+from src.checkpoint import validate_checkpoints
+from src.utils.config_parser import ConfigParser
+from src.utils.dataset import validate_dataset
+
+# 执行计划格式版本，修改编译结果结构时递增，使旧的磁盘缓存失效
+PLAN_VERSION = 4
+PLAN_CACHE_DIR = os.path.join(".ui_cache", "plans")
+
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class ActionSpec:
+    """YAML动作定义：处理函数及其需要的字段"""
+
+    def __init__(self, name: str, handler: Callable, method_source: Optional[str] = None,
+                 required: Tuple[str, ...] = (), validate: Optional[Callable[[Dict[str, Any]], List[str]]] = None):
+        """
+        :param name: 动作名称
+        :param handler: 处理函数，签名为 handler(runner, step, args)
+        :param method_source: 页面对象方法名来源，"args"表示args[0]，"method"表示method字段，None表示不调用页面对象方法
+        :param required: 步骤中必须提供的字段
+        :param validate: 动作特有的步骤校验函数，返回错误列表
+        """
+        self.name = name
+        self.handler = handler
+        self.method_source = method_source
+        self.required = required
+        self.validate = validate
+
+
+# 动作注册表：动作名 -> ActionSpec
+ACTIONS: Dict[str, ActionSpec] = {}
+
+
+def register_action(name: str, method_source: Optional[str] = None, required: Tuple[str, ...] = (),
+                    validate: Optional[Callable[[Dict[str, Any]], List[str]]] = None):
+    """注册YAML动作处理函数的装饰器"""
+    def decorator(func: Callable) -> Callable:
+        ACTIONS[name] = ActionSpec(name, func, method_source, tuple(required), validate)
+        return func
+    return decorator
+
+
+def is_dynamic(value: Any) -> bool:
+    """是否为运行时才生成的动态变量（${RANDOM_*}随机数据、${ROW.*}数据集当前行）"""
+    return isinstance(value, str) and value.startswith(("${RANDOM_", "${ROW.")) and value.endswith("}")
+
+
+class CompiledStep:
+    """预编译步骤：动作处理函数、页面对象方法和静态参数在编译时确定，运行时只解析动态变量"""
+
+    __slots__ = ("action", "description", "handler", "method_name", "method",
+                 "args", "dynamic_args", "expected", "expected_dynamic", "checkpoint", "raw")
+
+    def __init__(self, action: str, description: str, handler: Callable, method_name: Optional[str],
+                 method: Optional[Callable], args: List[Any], expected: Any, raw: Dict[str, Any]):
+        self.action = action
+        self.description = description
+        self.handler = handler
+        self.method_name = method_name
+        self.method = method
+        self.args = args
+        self.dynamic_args = [(index, arg) for index, arg in enumerate(args) if is_dynamic(arg)]
+        self.expected = expected
+        self.expected_dynamic = is_dynamic(expected)
+        # 步骤成功后保存断点，后续步骤失败时可从这里恢复
+        self.checkpoint = bool(raw.get("checkpoint"))
+        self.raw = raw
+
+    def resolve_args(self, resolver: Callable[[str], Any]) -> List[Any]:
+        """填充动态参数，无动态参数时直接复用静态参数"""
+        if not self.dynamic_args:
+            return self.args
+        args = list(self.args)
+        for index, placeholder in self.dynamic_args:
+            args[index] = resolver(placeholder)
+        return args
+
+    def resolve_expected(self, resolver: Callable[[str], Any]) -> Any:
+        """获取预期值"""
+        return resolver(self.expected) if self.expected_dynamic else self.expected
+
+
+def validate_step(step: Any) -> List[str]:
+    """校验单个步骤结构，返回错误列表"""
+    if not isinstance(step, dict):
+        return ["步骤应为字典类型"]
+    action = step.get("action")
+    spec = ACTIONS.get(action)
+    if not spec:
+        return [f"不支持的动作类型: {action}"]
+
+    errors = []
+    args = step.get("args", [])
+    if not isinstance(args, list):
+        errors.append("args应为列表")
+    elif spec.method_source == "args" and (not args or not isinstance(args[0], str)):
+        errors.append(f"{action}动作需要至少一个方法名参数")
+    if spec.method_source == "method" and not isinstance(step.get("method"), str):
+        errors.append(f"{action}动作缺少method字段")
+    for field in spec.required:
+        if field not in step:
+            errors.append(f"{action}动作缺少{field}字段")
+    if not errors and spec.validate:
+        errors.extend(spec.validate(step))
+    return errors
+
+
+def validate_cases(cases: Any) -> List[str]:
+    """校验用例文件结构，返回全部错误"""
+    if not isinstance(cases, dict):
+        return ["用例文件格式错误，应为字典类型"]
+
+    errors = []
+    for case_name, case in cases.items():
+        if not isinstance(case, dict):
+            errors.append(f"{case_name}: 用例应为字典类型")
+            continue
+        if not isinstance(case.get("page_object"), str):
+            errors.append(f"{case_name}: 缺少page_object")
+        if "cache" in case and not isinstance(case["cache"], bool):
+            errors.append(f"{case_name}: cache应为布尔值")
+        errors.extend(validate_checkpoints(case_name, case))
+        steps = case.get("steps")
+        if not isinstance(steps, list) or not steps:
+            errors.append(f"{case_name}: steps应为非空列表")
+            continue
+        for index, step in enumerate(steps, start=1):
+            errors.extend(f"{case_name} 第{index}步: {error}" for error in validate_step(step))
+        if "dataset" in case:
+            dataset_errors = validate_dataset(case["dataset"])
+            errors.extend(f"{case_name}: {error}" for error in dataset_errors)
+            if not dataset_errors:
+                for index, step in enumerate(case["dataset"].get("reset", []), start=1):
+                    errors.extend(f"{case_name} 重置第{index}步: {error}" for error in validate_step(step))
+    return errors
+
+
+def _normalize_step(step: Dict[str, Any]) -> Dict[str, Any]:
+    """拆出方法名和参数，生成可缓存的步骤结构"""
+    spec = ACTIONS[step["action"]]
+    args = list(step.get("args", []))
+    normalized = dict(step)
+    normalized["method_name"] = None
+    if spec.method_source == "args":
+        normalized["method_name"] = args.pop(0)
+    elif spec.method_source == "method":
+        normalized["method_name"] = step["method"]
+    normalized["args"] = args
+    normalized.setdefault("description", f"执行动作: {step['action']}")
+    return normalized
+
+
+def parse_case_file(path: str) -> Dict[str, Dict[str, Any]]:
+    """解析并校验YAML用例文件，结果按文件内容哈希缓存到磁盘"""
+    with open(path, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256(content + f"|v{PLAN_VERSION}".encode()).hexdigest()
+
+    cached = _memory_cache.get(digest)
+    if cached is not None:
+        return cached
+
+    cache_file = os.path.join(PLAN_CACHE_DIR, f"{digest}.json")
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cases = json.load(f)
+    except (OSError, ValueError):
+        cases = _parse_content(path, content)
+        _write_cache(cache_file, cases)
+
+    _memory_cache[digest] = cases
+    return cases
+
+
+# 进程内缓存：内容哈希 -> 解析结果
+_memory_cache: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+
+def _parse_content(path: str, content: bytes) -> Dict[str, Dict[str, Any]]:
+    if not ACTIONS:
+        import src.test_case_runner  # noqa: F401  注册内置动作，供校验使用
+
+    try:
+        cases = yaml.load(content, Loader=_YamlLoader) or {}
+    except yaml.YAMLError as e:
+        raise ValueError(f"用例文件解析错误: {path}, 错误: {e}")
+
+    errors = validate_cases(cases)
+    if errors:
+        raise ValueError(f"用例文件校验失败: {path}\n" + "\n".join(errors))
+
+    return {case_name: _normalize_case(case) for case_name, case in cases.items()}
+
+
+def _normalize_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    normalized = dict(case, steps=[_normalize_step(step) for step in case["steps"]])
+    if case.get("dataset"):
+        dataset = dict(case["dataset"])
+        dataset["reset"] = [_normalize_step(step) for step in dataset.get("reset", [])]
+        normalized["dataset"] = dataset
+    return normalized
+
+
+def _write_cache(cache_file: str, cases: Dict[str, Dict[str, Any]]) -> None:
+    """原子写入缓存文件，写入失败不影响执行"""
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(cases, f, ensure_ascii=False, default=str)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass
+
+
+def bind_step(step: Dict[str, Any], page_class: type, config: ConfigParser) -> CompiledStep:
+    """把规范化步骤绑定到动作处理函数和页面对象方法，并解析静态变量"""
+    spec = ACTIONS.get(step["action"])
+    if not spec:
+        raise ValueError(f"不支持的动作类型: {step['action']}")
+
+    method_name = step.get("method_name")
+    method = None
+    if method_name:
+        method = getattr(page_class, method_name, None)
+        if not callable(method):
+            raise AttributeError(f"页面对象{page_class.__name__}中未找到方法: {method_name}")
+
+    args = [arg if is_dynamic(arg) else config.resolve(arg) for arg in step.get("args", [])]
+    expected = step.get("expected")
+    if not is_dynamic(expected):
+        expected = config.resolve(expected)
+    return CompiledStep(step["action"], step["description"], spec.handler, method_name, method, args, expected, step)
+
+
+def compile_step(step: Dict[str, Any], page_class: type, config: ConfigParser) -> CompiledStep:
+    """校验并编译单个原始YAML步骤"""
+    errors = validate_step(step)
+    if errors:
+        raise ValueError("; ".join(errors))
+    return bind_step(_normalize_step(step), page_class, config)
+
+
+def bind_case(case: Dict[str, Any], page_class: type, config: ConfigParser) -> List[CompiledStep]:
+    """编译整个用例的步骤"""
+    return [bind_step(step, page_class, config) for step in case["steps"]]
+
+
+def bind_reset(case: Dict[str, Any], page_class: type, config: ConfigParser) -> List[CompiledStep]:
+    """编译数据驱动用例在两行之间执行的重置步骤"""
+    dataset = case.get("dataset") or {}
+    return [bind_step(step, page_class, config) for step in dataset.get("reset", [])]
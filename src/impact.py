@@ -0,0 +1,371 @@
+import ast
+import hashlib
+import inspect
+import json
+import os
+import subprocess
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import yaml
+
+from src.execution_plan import parse_case_file
+from src.page_objects import PAGE_OBJECT_MAP
+from src.page_objects.base_page import BasePage
+from src.sharding import discover_case_ids
+from src.utils.dataset import DATASET_FORMATS
+from src.utils.locator_parser import LocatorParser
+
+IMPACT_STATE_PATH = os.path.join(".ui_cache", "impact", "last_run.json")
+PAGE_OBJECT_DIR = "src/page_objects"
+# 参与影响分析的文件：定位器、页面对象、用例之外的变更视为框架变更，影响全部用例
+TRACKED_ROOTS = ("src", "config", "conftest.py", "requirements.txt")
+# 参与影响分析的文件类型，数据集文件按引用它的用例细化
+TRACKED_SUFFIXES = (".py", ".yaml", ".yml", ".txt") + tuple(DATASET_FORMATS)
+# 用例目录下框架自身单元测试所在的子目录
+UNIT_TEST_DIR = "unit"
+# 声明auth的用例会通过AuthStateCache._login走登录页面的这些方法
+AUTH_LOGIN_PAGE = "login_page"
+AUTH_LOGIN_METHODS = ("load", "input_login_info", "click_login_button", "is_login_success")
+
+
+def _is_locator_file(path: str) -> bool:
+    return path == "config/locators.yaml" or (path.startswith("config/locators/") and path.endswith((".yaml", ".yml")))
+
+
+def _normalize_path(path: str) -> str:
+    """相对路径，/分隔，与git输出的路径一致"""
+    return os.path.relpath(os.path.normpath(path)).replace(os.sep, "/")
+
+
+def _is_case_path(path: str, test_dir: str) -> bool:
+    name = os.path.basename(path)
+    return path.startswith(f"{test_dir.rstrip('/')}/") and name.startswith("test") and name.endswith((".yaml", ".yml"))
+
+
+class MethodInfo:
+    """页面对象方法的静态分析结果：引用的字符串常量和调用的self方法"""
+
+    def __init__(self, owner: str, constants: Set[str], calls: Set[str], uses_page_url: bool):
+        self.owner = owner
+        self.constants = constants
+        self.calls = calls
+        self.uses_page_url = uses_page_url
+
+
+def _analyze_function(owner: str, node: ast.FunctionDef) -> MethodInfo:
+    constants, calls, uses_page_url = set(), set(), False
+    for child in ast.walk(node):
+        if isinstance(child, ast.Constant) and isinstance(child.value, str):
+            constants.add(child.value)
+        elif isinstance(child, ast.Attribute):
+            if isinstance(child.value, ast.Name) and child.value.id == "self":
+                calls.add(child.attr)
+            if child.attr == "get_page_url":
+                uses_page_url = True
+    return MethodInfo(owner, constants, calls, uses_page_url)
+
+
+def _class_methods(page_class: type) -> Dict[str, MethodInfo]:
+    """按MRO收集页面对象类（含BasePage）的方法分析结果，子类方法覆盖父类"""
+    methods: Dict[str, MethodInfo] = {}
+    for cls in reversed(page_class.__mro__):
+        if not (isinstance(cls, type) and issubclass(cls, BasePage)):
+            continue
+        tree = ast.parse(inspect.getsource(inspect.getmodule(cls)))
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ClassDef) and node.name == cls.__name__:
+                for item in node.body:
+                    if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        methods[item.name] = _analyze_function(cls.__name__, item)
+    return methods
+
+
+class CaseDependencies:
+    """单个用例依赖的页面对象方法（类名.方法名）、定位器键（页面.元素）和数据文件"""
+
+    def __init__(self, case_id: str, page_object: str):
+        self.case_id = case_id
+        self.page_object = page_object
+        self.methods: Set[str] = set()
+        self.locators: Set[str] = set()
+        self.files: Set[str] = set()
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"case_id": self.case_id, "page_object": self.page_object,
+                "methods": sorted(self.methods), "locators": sorted(self.locators), "files": sorted(self.files)}
+
+
+class ImpactIndex:
+    """用例依赖索引：静态分析YAML步骤和BasePage子类方法，得到每个用例可能用到的方法和定位器"""
+
+    def __init__(self, test_dir: str = "tests", locator_parser: LocatorParser = None):
+        self.test_dir = test_dir
+        self.locator_parser = locator_parser or LocatorParser()
+        self._class_cache: Dict[type, Dict[str, MethodInfo]] = {}
+        self.cases: Dict[str, CaseDependencies] = {}
+
+    def build(self) -> "ImpactIndex":
+        for case_id in discover_case_ids(self.test_dir):
+            path, case_name = case_id.split("::", 1)
+            self.cases[case_id] = self.case_dependencies(case_id, parse_case_file(path)[case_name])
+        return self
+
+    def _methods(self, page_class: type) -> Dict[str, MethodInfo]:
+        if page_class not in self._class_cache:
+            self._class_cache[page_class] = _class_methods(page_class)
+        return self._class_cache[page_class]
+
+    def case_dependencies(self, case_id: str, case: Dict) -> CaseDependencies:
+        """分析单个规范化用例的依赖"""
+        deps = CaseDependencies(case_id, case.get("page_object"))
+        dataset = case.get("dataset") or {}
+        if isinstance(dataset.get("file"), str):
+            deps.files.add(_normalize_path(dataset["file"]))
+        page_name = case.get("page_object")
+        page_class = PAGE_OBJECT_MAP.get(page_name)
+        if page_class is None:
+            return deps
+
+        entry_methods = []
+        reset_steps = dataset.get("reset", [])
+        for step in case["steps"] + reset_steps:
+            if step["action"] == "load":
+                entry_methods.append("load")
+            elif step["action"] == "assert_snapshot":
+                entry_methods.append("wait_for_snapshot")
+                deps.locators.update(f"{page_name}.{element}" for element in step.get("expected") or {})
+            elif step["action"] == "assert_visual":
+                entry_methods.append("capture_visual")
+                elements = [step.get("element")] + list(step.get("mask") or [])
+                deps.locators.update(f"{page_name}.{element}" for element in elements if isinstance(element, str))
+            if step.get("method_name"):
+                entry_methods.append(step["method_name"])
+        self._reach(page_class, page_name, entry_methods, deps)
+
+        if case.get("auth") and AUTH_LOGIN_PAGE in PAGE_OBJECT_MAP:
+            self._reach(PAGE_OBJECT_MAP[AUTH_LOGIN_PAGE], AUTH_LOGIN_PAGE, AUTH_LOGIN_METHODS, deps)
+        return deps
+
+    def _reach(self, page_class: type, page_name: str, entry_methods: Iterable[str], deps: CaseDependencies) -> None:
+        """从入口方法出发，沿self方法调用收集可达的方法和定位器"""
+        methods = self._methods(page_class)
+        page_config = self.locator_parser.locators.get(page_name, {})
+        ready_events = page_config.get("ready") or {}
+        if "strategy" in ready_events:
+            ready_events = {"load": ready_events}
+
+        pending, seen = list(entry_methods), set()
+        while pending:
+            name = pending.pop()
+            if name in seen or name not in methods:
+                continue
+            seen.add(name)
+            info = methods[name]
+            deps.methods.add(f"{info.owner}.{name}")
+            for constant in info.constants:
+                if constant in page_config and constant != "ready":
+                    deps.locators.add(f"{page_name}.{constant}")
+                if constant in ready_events:
+                    deps.locators.add(f"{page_name}.ready")
+                    targets = (ready_events[constant] or {}).get("target") or []
+                    for target in [targets] if isinstance(targets, str) else targets:
+                        deps.locators.add(f"{page_name}.{target}")
+            if info.uses_page_url:
+                deps.locators.add(f"{page_name}.url")
+            pending.extend(call for call in info.calls if call in methods)
+
+
+class ChangeSet:
+    """变更内容：框架文件、用例、定位器键、页面对象方法、数据文件"""
+
+    def __init__(self):
+        self.framework_files: List[str] = []
+        self.cases: Dict[str, str] = {}
+        self.locators: Set[str] = set()
+        self.methods: Set[str] = set()
+        self.classes: Set[str] = set()
+        self.files: Set[str] = set()
+
+    @property
+    def empty(self) -> bool:
+        return not (self.framework_files or self.cases or self.locators or self.methods or self.classes or self.files)
+
+
+def _load_yaml(content: Optional[str]) -> Dict:
+    if not content:
+        return {}
+    try:
+        data = yaml.safe_load(content)
+    except yaml.YAMLError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _python_members(content: Optional[str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """返回(类名.方法名 -> 源码, 类名 -> 去掉方法后的类源码)，模块级代码归入"<module>\""""
+    methods, residues = {}, {}
+    if not content:
+        return methods, residues
+    try:
+        tree = ast.parse(content)
+    except SyntaxError:
+        return methods, {"<module>": content}
+    module_residue = []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            residue = [ast.get_source_segment(content, base) or "" for base in node.bases]
+            for item in node.body:
+                if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    methods[f"{node.name}.{item.name}"] = ast.get_source_segment(content, item) or ""
+                else:
+                    residue.append(ast.get_source_segment(content, item) or "")
+            residues[node.name] = "\n".join(residue)
+        else:
+            module_residue.append(ast.get_source_segment(content, node) or "")
+    residues["<module>"] = "\n".join(module_residue)
+    return methods, residues
+
+
+def diff_contents(old: Dict[str, Optional[str]], new: Dict[str, Optional[str]], test_dir: str) -> ChangeSet:
+    """对比变更前后的文件内容，细化到用例、定位器键和页面对象方法"""
+    changes = ChangeSet()
+    for path in sorted(set(old) | set(new)):
+        before, after = old.get(path), new.get(path)
+        if before == after:
+            continue
+        if _is_locator_file(path):
+            old_pages, new_pages = _load_yaml(before), _load_yaml(after)
+            for page in set(old_pages) | set(new_pages):
+                old_page, new_page = old_pages.get(page) or {}, new_pages.get(page) or {}
+                changes.locators.update(f"{page}.{key}" for key in set(old_page) | set(new_page)
+                                        if old_page.get(key) != new_page.get(key))
+        elif _is_case_path(path, test_dir):
+            old_cases, new_cases = _load_yaml(before), _load_yaml(after)
+            for case_name in new_cases:
+                if old_cases.get(case_name) != new_cases[case_name]:
+                    changes.cases[f"{path}::{case_name}"] = "用例新增" if case_name not in old_cases else "用例变更"
+        elif path.startswith(f"{PAGE_OBJECT_DIR}/") and not path.endswith("__init__.py"):
+            old_methods, old_residues = _python_members(before)
+            new_methods, new_residues = _python_members(after)
+            changes.methods.update(name for name in set(old_methods) | set(new_methods)
+                                   if old_methods.get(name) != new_methods.get(name))
+            changed_residues = {name for name in set(old_residues) | set(new_residues)
+                                if old_residues.get(name) != new_residues.get(name)}
+            if "<module>" in changed_residues:
+                # 导入、模块级常量等变更影响文件中的全部类
+                changed_residues |= set(old_residues) | set(new_residues)
+            changes.classes.update(name for name in changed_residues if name != "<module>")
+        elif path.startswith(f"{test_dir.rstrip('/')}/{UNIT_TEST_DIR}/"):
+            # 框架自身的单元测试不影响UI用例
+            continue
+        elif path.endswith(tuple(DATASET_FORMATS)):
+            # 数据集只影响引用它的用例
+            changes.files.add(path)
+        elif path.endswith((".py", ".yaml", ".yml", ".txt")):
+            changes.framework_files.append(path)
+    return changes
+
+
+def tracked_files(test_dir: str) -> List[str]:
+    """参与影响分析的文件（相对路径，/分隔）"""
+    files = []
+    for root in (*TRACKED_ROOTS, test_dir):
+        if os.path.isfile(root):
+            files.append(root)
+            continue
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [name for name in dirnames if name != "__pycache__"]
+            files.extend(os.path.relpath(os.path.join(dirpath, name)).replace(os.sep, "/")
+                         for name in filenames if name.endswith(TRACKED_SUFFIXES))
+    return sorted(set(files))
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _state_content(path: str) -> Optional[str]:
+    """上次运行记录中保存的文件内容；数据集可能很大，只保存内容哈希（只用于判断是否变化）"""
+    if not path.endswith(tuple(DATASET_FORMATS)):
+        return _read(path)
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return f"sha256:{digest.hexdigest()}"
+
+
+def _git(*args: str) -> str:
+    result = subprocess.run(["git", *args], capture_output=True, text=True, encoding="utf-8")
+    if result.returncode != 0:
+        raise ValueError(f"git {' '.join(args)} 执行失败: {result.stderr.strip()}")
+    return result.stdout
+
+
+def changes_since_revision(revision: str, test_dir: str = "tests") -> ChangeSet:
+    """与指定git版本相比的变更（含工作区未提交和未跟踪的文件）"""
+    changed = set(_git("diff", "--name-only", revision, "--").split())
+    changed |= set(_git("ls-files", "--others", "--exclude-standard").split())
+    tracked = set(tracked_files(test_dir))
+    changed = {path for path in changed if path in tracked or path.startswith(TRACKED_ROOTS + (test_dir,))}
+
+    old, new = {}, {}
+    for path in changed:
+        result = subprocess.run(["git", "show", f"{revision}:{path}"], capture_output=True, text=True, encoding="utf-8")
+        old[path] = result.stdout if result.returncode == 0 else None
+        new[path] = _read(path)
+    return diff_contents(old, new, test_dir)
+
+
+def changes_since_last_run(test_dir: str = "tests", state_path: str = IMPACT_STATE_PATH) -> Optional[ChangeSet]:
+    """与上次运行时的文件内容相比的变更，没有上次运行记录时返回None"""
+    try:
+        with open(state_path, "r", encoding="utf-8") as f:
+            old = json.load(f)["files"]
+    except (OSError, ValueError, KeyError):
+        return None
+    new = {path: _state_content(path) for path in tracked_files(test_dir)}
+    return diff_contents(old, new, test_dir)
+
+
+def save_run_state(test_dir: str = "tests", state_path: str = IMPACT_STATE_PATH) -> None:
+    """记录本次运行时的文件内容，供下次--since-last-run对比"""
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    tmp_path = f"{state_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"files": {path: _state_content(path) for path in tracked_files(test_dir)}}, f, ensure_ascii=False)
+    os.replace(tmp_path, state_path)
+
+
+def select_cases(index: ImpactIndex, changes: Optional[ChangeSet],
+                 last_outcomes: Dict[str, str] = None) -> List[Tuple[str, List[str]]]:
+    """选出受变更影响的用例及原因，上次失败的用例排在前面"""
+    selected = []
+    for case_id, deps in index.cases.items():
+        if changes is None:
+            reasons = ["没有上次运行记录"]
+        elif changes.framework_files:
+            reasons = [f"框架代码变更: {', '.join(changes.framework_files[:3])}"]
+        else:
+            reasons = []
+            if case_id in changes.cases:
+                reasons.append(changes.cases[case_id])
+            if deps.page_object not in PAGE_OBJECT_MAP:
+                reasons.append(f"页面对象无法解析: {deps.page_object}")
+            reasons.extend(f"定位器变更: {key}" for key in sorted(deps.locators & changes.locators))
+            reasons.extend(f"页面对象方法变更: {name}" for name in sorted(deps.methods & changes.methods))
+            owners = {name.split(".", 1)[0] for name in deps.methods}
+            reasons.extend(f"页面对象类变更: {name}" for name in sorted(owners & changes.classes))
+            reasons.extend(f"数据集变更: {path}" for path in sorted(deps.files & changes.files))
+        if reasons:
+            selected.append((case_id, reasons))
+
+    last_outcomes = last_outcomes or {}
+    return sorted(selected, key=lambda item: last_outcomes.get(item[0]) != "failed")
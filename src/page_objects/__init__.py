@@ -0,0 +1,76 @@
+import importlib
+import os
+import pkgutil
+from typing import Callable, Dict, Iterator, Mapping, Type
+
+# 页面对象模块所在包，用例中的page_object名称与模块名一致（如login_page -> login_page.py）
+PAGE_OBJECT_PACKAGE = __name__
+# 不定义页面对象的模块
+_NON_PAGE_MODULES = ("base_page",)
+
+
+class PageObjectRegistry(Mapping):
+    """页面对象注册表：页面类通过@page_object(名称)注册，模块在首次按名称查找时才导入，
+    收集用例时只加载用到的页面对象"""
+
+    def __init__(self, package: str = PAGE_OBJECT_PACKAGE):
+        self.package = package
+        self._classes: Dict[str, Type] = {}
+        self._discovered = False
+
+    def register(self, name: str, page_class: Type) -> None:
+        existing = self._classes.get(name)
+        if existing is not None and existing is not page_class:
+            raise ValueError(f"页面对象名称重复：{name}（{existing.__name__} / {page_class.__name__}）")
+        self._classes[name] = page_class
+
+    def _module_names(self) -> list:
+        path = os.path.dirname(importlib.import_module(self.package).__file__)
+        return [info.name for info in pkgutil.iter_modules([path])
+                if not info.ispkg and info.name not in _NON_PAGE_MODULES]
+
+    def _discover(self) -> None:
+        """导入包内全部页面对象模块（列出全部名称时使用）"""
+        if not self._discovered:
+            for module_name in self._module_names():
+                importlib.import_module(f"{self.package}.{module_name}")
+            self._discovered = True
+
+    def __getitem__(self, name: str) -> Type:
+        if name not in self._classes and isinstance(name, str) and name.isidentifier():
+            # 按约定导入同名模块，模块中的@page_object完成注册；名称与模块名不一致时扫描整个包
+            try:
+                importlib.import_module(f"{self.package}.{name}")
+            except ModuleNotFoundError as e:
+                if e.name != f"{self.package}.{name}":
+                    raise
+            if name not in self._classes:
+                self._discover()
+        return self._classes[name]
+
+    def __contains__(self, name: object) -> bool:
+        try:
+            self[name]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        self._discover()
+        return iter(list(self._classes))
+
+    def __len__(self) -> int:
+        self._discover()
+        return len(self._classes)
+
+
+# 页面类映射，根据测试用例yaml文件中的page_object参数创建实例
+PAGE_OBJECT_MAP = PageObjectRegistry()
+
+
+def page_object(name: str) -> Callable[[Type], Type]:
+    """注册页面对象类的装饰器，name为用例中page_object的取值"""
+    def decorator(page_class: Type) -> Type:
+        PAGE_OBJECT_MAP.register(name, page_class)
+        return page_class
+    return decorator
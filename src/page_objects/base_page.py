@@ -1,31 +1,85 @@
-from playwright.sync_api import Page, Locator
-from selenium.common import NoSuchElementException
+import re
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Tuple
 
+from src.readiness import wait_until_ready
 from src.utils.locator_parser import LocatorParser
 from src.utils.config_parser import ConfigParser
+from src.utils.perf import timed
+from src.utils.snapshot import diff_snapshot, required_attributes
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Locator, Page
+
+# 一次页面内求值查询多个元素的状态，可见性判断与Playwright一致：有非空包围盒且visibility不为hidden
+_QUERY_ELEMENTS_JS = """
+([specs, attributes]) => specs.map(([selector, isXPath]) => {
+  let nodes = [];
+  if (isXPath) {
+    const result = document.evaluate(selector, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (let i = 0; i < result.snapshotLength; i++) nodes.push(result.snapshotItem(i));
+  } else {
+    nodes = Array.from(document.querySelectorAll(selector));
+  }
+  const first = nodes[0];
+  if (!first) return {count: 0, visible: false, text: null, attributes: {}};
+  const rect = first.getBoundingClientRect();
+  const style = getComputedStyle(first);
+  return {
+    count: nodes.length,
+    visible: rect.width > 0 && rect.height > 0 && style.visibility !== "hidden",
+    text: (first.textContent || "").trim(),
+    attributes: Object.fromEntries(attributes.map(name => [name, first.getAttribute(name)])),
+  };
+})
+"""
+# 页面导航类事件：就绪等待包含页面加载本身，超时使用timeout.page_load而不是timeout.element
+NAVIGATION_EVENTS = ("load",)
+# Playwright专用选择器引擎前缀（text=、role=等），无法在页面内直接查询
+_ENGINE_PREFIX = re.compile(r"^[a-z][\w-]*=")
 
 class BasePage:
-    def __init__(self, page: Page, locator_parser: LocatorParser, config: ConfigParser, page_name: str):
+    def __init__(self, page: "Page", locator_parser: LocatorParser, config: ConfigParser, page_name: str):
         self.page = page
         self.locator_parser = locator_parser
         self.config = config
         self.page_name = page_name
         self.timeout = config.get("timeout.element")
         self.base_url = config.get("base_url")
+        self.last_element = None  # 最后操作的元素，失败时用于元素截图
+        # 元素名 -> Locator缓存，定位器文件重新加载后失效
+        self._locators: Dict[str, "Locator"] = {}
+        self._locators_version = None
+
+    def bind_page(self, page: "Page") -> None:
+        """切换到新页面（如从步骤断点恢复后的新上下文），旧页面上的Locator缓存失效"""
+        self.page = page
+        self.last_element = None
+        self._locators.clear()
 
-    def get_locator(self, element_name: str) -> Locator:
+    def get_locator(self, element_name: str) -> "Locator":
         """获取页面元素"""
-        locator_expr = self.locator_parser.get_locator(self.page_name, element_name)
-        return self.page.locator(locator_expr)
+        version = self.locator_parser.version
+        if version != self._locators_version:
+            self._locators.clear()
+            self._locators_version = version
+        locator = self._locators.get(element_name)
+        if locator is None:
+            locator_expr = self.locator_parser.get_locator(self.page_name, element_name)
+            locator = self._locators[element_name] = self.page.locator(locator_expr)
+        self.last_element = element_name
+        return locator
 
+    @timed("load")
     def load(self, url: str = None) -> None:
         """加载页面"""
         # 优先使用传入的URL，其次使用定位器中配置的URL，最后使用base_url
         target_url = url or self._get_page_url() or self.base_url
         if not target_url.startswith(("http", "https")):
             target_url = f"{self.base_url}{target_url}"
-        self.page.goto(target_url, timeout=self.config.get("timeout.page_load"))
-        self.wait_for_page_ready()
+        # goto只等到导航提交（收到响应），之后由就绪策略等待，不额外等待load事件
+        with self.wait_until_ready("load"):
+            self.page.goto(target_url, timeout=self.config.get("timeout.page_load"), wait_until="commit")
 
     def _get_page_url(self) -> str:
         """获取定位器中配置的页面URL"""
@@ -34,25 +88,118 @@ class BasePage:
         except KeyError:
             return None
 
-    def wait_for_page_ready(self) -> None:
+    def wait_for_page_ready(self, event: str = "load") -> None:
         """等待页面就绪"""
-        self.page.wait_for_load_state("networkidle", timeout=self.timeout)
+        with self.wait_until_ready(event):
+            pass
+
+    def wait_until_ready(self, event: str = "load"):
+        """包裹触发动作（如goto、click），动作完成后按配置的策略等待页面就绪
+
+        策略优先取locators.yaml中页面的ready.<event>，其次取config.yaml中的readiness.default；
+        策略未配置timeout时，导航事件使用timeout.page_load，其余使用timeout.element
+        """
+        spec = self._get_ready_spec(event)
+        timeout = self.config.get("timeout.page_load") if event in NAVIGATION_EVENTS else self.timeout
+        return wait_until_ready(self, event, spec, timeout)
+
+    def _get_ready_spec(self, event: str) -> dict:
+        """获取页面事件对应的就绪策略配置"""
+        ready = self.locator_parser.get_page_option(self.page_name, "ready") or {}
+        # ready直接写策略时视为页面加载(load)的策略
+        if "strategy" in ready:
+            ready = {"load": ready}
+        spec = ready.get(event) or self.config.get("readiness.default")
+        if isinstance(spec, str):
+            spec = {"strategy": spec}
+        return spec
+
+    @staticmethod
+    def _in_page_selector(locator_expr: str):
+        """转换为页面内可直接查询的(选择器, 是否XPath)，Playwright专用语法返回None"""
+        if locator_expr.startswith("css="):
+            return locator_expr[4:], False
+        if locator_expr.startswith("xpath="):
+            return locator_expr[6:], True
+        if locator_expr.startswith(("//", "(//", "..")):
+            return locator_expr, True
+        if ">>" in locator_expr or _ENGINE_PREFIX.match(locator_expr) or ":has-text(" in locator_expr \
+                or ":text(" in locator_expr or ":visible" in locator_expr:
+            return None
+        return locator_expr, False
+
+    @timed("query_elements")
+    def query_elements(self, element_names: Iterable[str], attributes: Iterable[str] = ()) -> Dict[str, Dict[str, Any]]:
+        """一次页面内求值获取多个元素的状态：visible、首个元素的text和attributes、匹配数量count，不做自动等待
+
+        Playwright专用语法的定位器无法在页面内查询，逐个通过Locator获取
+        """
+        element_names, attributes = list(element_names), list(attributes)
+        batched: List[Tuple[str, Tuple[str, bool]]] = []
+        snapshot: Dict[str, Dict[str, Any]] = {}
+        for name in element_names:
+            selector = self._in_page_selector(self.locator_parser.get_locator(self.page_name, name))
+            if selector is None:
+                snapshot[name] = self._query_element(name, attributes)
+            else:
+                batched.append((name, selector))
+
+        if batched:
+            states = self.page.evaluate(_QUERY_ELEMENTS_JS, [[list(s) for _, s in batched], attributes])
+            snapshot.update({name: state for (name, _), state in zip(batched, states)})
+        return {name: snapshot[name] for name in element_names}
 
+    def _query_element(self, element_name: str, attributes: List[str]) -> Dict[str, Any]:
+        locator = self.get_locator(element_name)
+        count = locator.count()
+        if not count:
+            return {"count": 0, "visible": False, "text": None, "attributes": {}}
+        first = locator.first
+        return {
+            "count": count,
+            "visible": first.is_visible(),
+            "text": (first.text_content() or "").strip(),
+            "attributes": {name: first.get_attribute(name) for name in attributes},
+        }
+
+    def wait_for_snapshot(self, expected: Dict[str, Dict[str, Any]], timeout: float = None,
+                          poll_interval: float = 0.1) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """轮询批量查询直到全部预期满足或超时，返回最后一次快照和不一致项"""
+        deadline = time.monotonic() + (timeout if timeout is not None else self.timeout) / 1000
+        attributes = required_attributes(expected)
+        while True:
+            snapshot = self.query_elements(expected, attributes)
+            mismatches = diff_snapshot(snapshot, expected)
+            if not mismatches or time.monotonic() >= deadline:
+                return snapshot, mismatches
+            time.sleep(poll_interval)
+
+    @timed("capture_visual", locator_arg=0)
+    def capture_visual(self, element_name: str = None, full_page: bool = False,
+                       mask_elements: Iterable[str] = ()) -> bytes:
+        """视觉对比用的PNG截图：关闭动画、隐藏光标，mask_elements中的元素以纯色块遮盖"""
+        options = {"type": "png", "animations": "disabled", "caret": "hide",
+                   "mask": [self.get_locator(name) for name in mask_elements]}
+        if element_name:
+            return self.get_locator(element_name).screenshot(timeout=self.timeout, **options)
+        return self.page.screenshot(full_page=full_page, timeout=self.timeout, **options)
+
+    @timed("click", locator_arg=0)
     def click(self, element_name: str) -> None:
         """点击元素"""
         self.get_locator(element_name).click(timeout=self.timeout)
 
+    @timed("fill", locator_arg=1)
     def fill(self, value: str, element_name: str) -> None:
         """输入文本"""
         self.get_locator(element_name).fill(value, timeout=self.timeout)
 
+    @timed("get_text", locator_arg=0)
     def get_text(self, element_name: str) -> str:
         """获取元素文本"""
         return self.get_locator(element_name).text_content(timeout=self.timeout).strip()
 
+    @timed("is_visible", locator_arg=0)
     def is_visible(self, element_name: str) -> bool:
-        """判断元素是否可见"""
-        try:
-            return self.get_locator(element_name).is_visible(timeout=self.timeout)
-        except NoSuchElementException:
-            return False
\ No newline at end of file
+        """判断元素是否可见，元素不存在时Playwright直接返回False"""
+        return self.get_locator(element_name).is_visible(timeout=self.timeout)
\ No newline at end of file
@@ -1,16 +1,22 @@
+from typing import TYPE_CHECKING
+
+from src.page_objects import page_object
 from src.page_objects.base_page import BasePage
-from playwright.sync_api import Page
 from src.utils.config_parser import ConfigParser
 from src.utils.locator_parser import LocatorParser
 
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
+
+@page_object("login_page")
 class LoginPage(BasePage):
-    def __init__(self, page: Page, config: ConfigParser, locator_parser: LocatorParser):
+    def __init__(self, page: "Page", locator_parser: LocatorParser, config: ConfigParser):
         super().__init__(page, locator_parser, config, "login_page")
 
     def input_login_info(self, username: str, password: str):
         """输入登录信息"""
-        self.fill("username_input", username)
-        self.fill("password_input", password)
+        self.fill(username, "username_input")
+        self.fill(password, "password_input")
 
     def click_login_button(self) -> None:
         """点击登录按钮"""
@@ -1,24 +1,31 @@
+from typing import TYPE_CHECKING
+
+from src.page_objects import page_object
 from src.page_objects.base_page import BasePage
-from playwright.sync_api import Page
 from src.utils.config_parser import ConfigParser
 from src.utils.locator_parser import LocatorParser
 
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
+
+@page_object("search_page")
 class SearchPage(BasePage):
-    def __init__(self, page: Page, locator_parser: LocatorParser, config_parser: ConfigParser):
+    def __init__(self, page: "Page", locator_parser: LocatorParser, config_parser: ConfigParser):
         super().__init__(page, locator_parser, config_parser, "search_page")
 
 
     def perform_search(self, keyword: str) -> None:
         """执行搜索操作"""
-        self.fill("search_input", keyword)
-        self.click("search_button")
-        self.page.wait_for_load_state("networkidle")
+        self.fill(keyword, "search_input")
+        with self.wait_until_ready("search"):
+            self.click("search_button")
 
     def get_search_result_count(self) -> int:
         """获取搜索结果数量"""
-        if not self.is_visible("results_container"):
+        state = self.query_elements(["results_container", "result_item"])
+        if not state["results_container"]["visible"]:
             return 0
-        return self.get_locator("result_item").count()
+        return state["result_item"]["count"]
 
     def is_no_results_message_displayed(self) -> bool:
         """无结果提示是是否显示"""
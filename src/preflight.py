@@ -0,0 +1,379 @@
+import argparse
+import ast
+import csv
+import difflib
+import inspect
+import json
+import os
+import re
+import sys
+import textwrap
+import time
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.execution_plan import ACTIONS, parse_case_file
+from src.page_objects import PAGE_OBJECT_MAP
+from src.page_objects.base_page import BasePage
+from src.sharding import discover_case_ids
+import src.test_case_runner  # noqa: F401  导入时注册全部动作
+from src.utils.config_parser import ConfigParser
+from src.utils.data_generator import GENERATORS
+from src.utils.dataset import DATASET_FORMATS
+from src.utils.locator_parser import LocatorParser
+from src.utils.locator_registry import PAGE_OPTION_KEYS
+
+# 步骤中可能包含${...}变量的字段
+VARIABLE_FIELDS = ("args", "expected")
+# 就绪策略中引用元素名的策略
+ELEMENT_READY_STRATEGIES = ("element",)
+
+_VARIABLE = re.compile(r"^\$\{(.+)\}$")
+_MISSING = object()
+
+
+class PreflightIssue:
+    """预检查发现的问题：所在用例（或页面对象源码位置）和问题描述"""
+
+    __slots__ = ("where", "message")
+
+    def __init__(self, where: str, message: str):
+        self.where = where
+        self.message = message
+
+    def __str__(self) -> str:
+        return f"{self.where}: {self.message}"
+
+
+class Preflight:
+    """启动浏览器前的静态校验：动作、页面对象方法及参数、定位器、${...}变量、数据集、登录配置"""
+
+    def __init__(self, config: ConfigParser, locator_parser: LocatorParser):
+        self.config = config
+        self.locator_parser = locator_parser
+        self._methods: Dict[Tuple[type, str, int], List[str]] = {}
+        self._dataset_columns: Dict[str, Optional[List[str]]] = {}
+        self._checked_pages: Dict[type, List[PreflightIssue]] = {}
+
+    def check_files(self, test_dir: str = "tests", case_ids: List[str] = None) -> List[PreflightIssue]:
+        """校验目录下（或指定nodeid）的全部用例，用例文件本身解析失败也作为问题返回"""
+        issues = []
+        if case_ids is None:
+            try:
+                case_ids = discover_case_ids(test_dir)
+            except ValueError as e:
+                return [PreflightIssue(test_dir, str(e))]
+        cases = []
+        files: Dict[str, Optional[Dict[str, Any]]] = {}
+        for case_id in case_ids:
+            path, case_name = case_id.split("::", 1)
+            if path not in files:
+                # 每个文件只解析一次，解析失败只报告一次
+                try:
+                    files[path] = parse_case_file(path)
+                except ValueError as e:
+                    files[path] = None
+                    issues.append(PreflightIssue(path, str(e)))
+                except OSError:
+                    files[path] = {}
+            if files[path] is None:
+                continue
+            if case_name not in files[path]:
+                issues.append(PreflightIssue(case_id, "用例不存在"))
+                continue
+            cases.append((case_id, files[path][case_name]))
+        return issues + self.check_cases(cases)
+
+    def check_cases(self, cases: Iterable[Tuple[str, Dict[str, Any]]]) -> List[PreflightIssue]:
+        """校验已解析的用例 (nodeid, 用例)，返回全部问题；用到的页面对象源码各检查一次"""
+        issues = []
+        pages = []
+        for case_id, case in cases:
+            issues.extend(PreflightIssue(case_id, message) for message in self.check_case(case))
+            page_class = PAGE_OBJECT_MAP.get(case.get("page_object"))
+            if page_class is not None and page_class not in pages:
+                pages.append(page_class)
+        for page_class in pages:
+            issues.extend(self.check_page(page_class))
+        return issues
+
+    def check_case(self, case: Dict[str, Any]) -> List[str]:
+        """校验单个规范化用例，返回问题描述列表"""
+        problems = []
+        page_object = case.get("page_object")
+        page_class = PAGE_OBJECT_MAP.get(page_object)
+        if page_class is None:
+            closest = _closest(_snake_case(str(page_object)), PAGE_OBJECT_MAP)
+            problems.append(f"无效的页面对象: {page_object}" + (f"，是否为: {closest}" if closest else ""))
+            # 按最接近的页面对象继续检查步骤，一次报出全部问题
+            page_class = PAGE_OBJECT_MAP.get(closest)
+
+        auth = case.get("auth")
+        if auth and not isinstance(self.config.get(f"auth.profiles.{auth}"), Mapping):
+            profiles = self.config.get("auth.profiles") or {}
+            problems.append(f"未找到登录配置: auth.profiles.{auth}{_suggest(auth, profiles)}")
+
+        columns = None
+        dataset = case.get("dataset")
+        if dataset:
+            columns = self._columns(dataset["file"], dataset.get("encoding"))
+            if columns is None:
+                problems.append(f"数据集文件不存在: {dataset['file']}")
+
+        steps = [("第{}步", case["steps"])]
+        if dataset:
+            steps.append(("重置第{}步", dataset.get("reset", [])))
+        for label, step_list in steps:
+            for index, step in enumerate(step_list, start=1):
+                prefix = label.format(index)
+                problems.extend(f"{prefix}: {problem}"
+                                for problem in self._check_step(step, page_class, dataset is not None, columns))
+        return problems
+
+    def _check_step(self, step: Dict[str, Any], page_class: Optional[type], has_dataset: bool,
+                    columns: Optional[List[str]]) -> List[str]:
+        spec = ACTIONS.get(step["action"])
+        if spec is None:
+            return [f"不支持的动作类型: {step['action']}{_suggest(step['action'], ACTIONS)}"]
+
+        problems = []
+        args = step.get("args", [])
+        if page_class is not None:
+            page_name = self._page_name(page_class)
+            method_name = step.get("method_name")
+            if method_name:
+                problems.extend(self._check_method(page_class, method_name, args))
+            elif step["action"] == "load":
+                problems.extend(self._check_method(page_class, "load", args))
+            for element_name in _step_elements(step):
+                if not self._has_locator(page_name, element_name):
+                    problems.append(self._locator_problem(page_name, element_name))
+
+        for field in VARIABLE_FIELDS:
+            for value in _strings(step.get(field)):
+                problem = self._check_variable(value, has_dataset, columns)
+                if problem:
+                    problems.append(problem)
+        return problems
+
+    def _check_method(self, page_class: type, method_name: str, args: List[Any]) -> List[str]:
+        """方法存在且参数个数与签名匹配；YAML只传位置参数，结果按参数个数缓存"""
+        key = (page_class, method_name, len(args))
+        if key not in self._methods:
+            self._methods[key] = self._method_problems(page_class, method_name, len(args))
+        return self._methods[key]
+
+    @staticmethod
+    def _method_problems(page_class: type, method_name: str, arg_count: int) -> List[str]:
+        method = getattr(page_class, method_name, None)
+        if not callable(method):
+            methods = [name for name in dir(page_class) if not name.startswith("_")]
+            return [f"页面对象{page_class.__name__}中未找到方法: {method_name}{_suggest(method_name, methods)}"]
+        signature = inspect.signature(method)
+        try:
+            signature.bind(None, *range(arg_count))
+        except TypeError as e:
+            return [f"{page_class.__name__}.{method_name}{_display_signature(signature)} 参数不匹配"
+                    f"（传入{arg_count}个参数）: {e}"]
+        return []
+
+    def _check_variable(self, value: str, has_dataset: bool, columns: Optional[List[str]]) -> Optional[str]:
+        """${RANDOM_*}须为已注册的生成器，${ROW.*}须为数据集的列，其余须能从配置解析"""
+        match = _VARIABLE.match(value)
+        if not match:
+            return None
+        name = match.group(1)
+        if name.startswith("RANDOM_"):
+            data_type = name.split(":", 1)[0]
+            if data_type not in GENERATORS:
+                return f"不支持的数据类型: {value}{_suggest(data_type, GENERATORS)}"
+            return None
+        if name.startswith("ROW."):
+            column = name[4:]
+            if not has_dataset:
+                return f"{value} 只能在声明了dataset的用例中使用"
+            if columns is not None and column not in columns:
+                return f"数据集中不存在列: {column}，可用列: {columns}"
+            return None
+        if self.config.get(name.lower(), _MISSING) in (_MISSING, None, ""):
+            env_name = "UI_AUTOMATION_" + name.upper().replace(".", "_")
+            return f"变量无法解析: {value}（请在配置文件中添加 {name.lower()}，或设置环境变量 {env_name}）"
+        return None
+
+    def _columns(self, file: str, encoding: Optional[str]) -> Optional[List[str]]:
+        """数据集的列名（CSV表头或JSONL首行的键），文件不存在时返回None；只读文件开头"""
+        if file not in self._dataset_columns:
+            columns = None
+            try:
+                with open(file, "r", encoding=encoding or "utf-8-sig", newline="") as f:
+                    if DATASET_FORMATS[os.path.splitext(file)[1].lower()] == "csv":
+                        columns = next(csv.reader(f), [])
+                    else:
+                        first = next((line for line in f if line.strip()), "{}")
+                        row = json.loads(first)
+                        columns = list(row) if isinstance(row, dict) else []
+            except OSError:
+                columns = None
+            except ValueError:
+                columns = []
+            self._dataset_columns[file] = columns
+        return self._dataset_columns[file]
+
+    def check_page(self, page_class: type) -> List[PreflightIssue]:
+        """静态检查页面对象源码中以常量传入的元素名，以及ready策略引用的元素名，每个页面类只检查一次"""
+        if page_class in self._checked_pages:
+            return []
+        page_name = self._page_name(page_class)
+        issues = []
+        if page_name not in self.locator_parser.locators:
+            issues.append(PreflightIssue(page_class.__name__, f"定位器文件中未找到页面配置: {page_name}"))
+        else:
+            issues.extend(self._check_ready(page_class, page_name))
+            for cls in page_class.__mro__:
+                if cls is BasePage or not issubclass(cls, BasePage):
+                    continue
+                issues.extend(self._check_source(cls, page_class, page_name))
+        self._checked_pages[page_class] = issues
+        return issues
+
+    def _check_ready(self, page_class: type, page_name: str) -> List[PreflightIssue]:
+        ready = self.locator_parser.get_page_option(page_name, "ready") or {}
+        if "strategy" in ready:
+            ready = {"load": ready}
+        issues = []
+        for event, spec in ready.items():
+            if not isinstance(spec, dict) or spec.get("strategy") not in ELEMENT_READY_STRATEGIES:
+                continue
+            targets = spec.get("target")
+            for element_name in [targets] if isinstance(targets, str) else targets or []:
+                if not self._has_locator(page_name, element_name):
+                    issues.append(PreflightIssue(f"{page_class.__name__} ready.{event}",
+                                                 self._locator_problem(page_name, element_name)))
+        return issues
+
+    def _check_source(self, cls: type, page_class: type, page_name: str) -> List[PreflightIssue]:
+        """检查self.<方法>("元素名")形式的调用，方法的元素名参数位置取自@timed的locator_arg"""
+        try:
+            source_file = inspect.getsourcefile(cls)
+            lines, first_line = inspect.getsourcelines(cls)
+        except (OSError, TypeError):
+            return []
+        tree = ast.parse(textwrap.dedent("".join(lines)))
+        issues = []
+        for node in ast.walk(tree):
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and isinstance(node.func.value, ast.Name) and node.func.value.id == "self"):
+                continue
+            for element_name in _call_elements(node, getattr(page_class, node.func.attr, None)):
+                if not self._has_locator(page_name, element_name):
+                    where = f"{os.path.relpath(source_file)}:{first_line + node.lineno - 1}"
+                    issues.append(PreflightIssue(where, self._locator_problem(page_name, element_name)))
+        return issues
+
+    def _has_locator(self, page_name: str, element_name: str) -> bool:
+        return self.locator_parser.registry.has(page_name, element_name)
+
+    def _locator_problem(self, page_name: str, element_name: str) -> str:
+        elements = [name for name in self.locator_parser.locators.get(page_name, {}) if name not in PAGE_OPTION_KEYS]
+        return f"页面 {page_name} 中未找到元素: {element_name}{_suggest(element_name, elements)}"
+
+    @staticmethod
+    def _page_name(page_class: type) -> Optional[str]:
+        """页面类在PAGE_OBJECT_MAP中的键，即定位器文件中的页面名"""
+        for name, cls in PAGE_OBJECT_MAP.items():
+            if cls is page_class:
+                return name
+        return None
+
+
+def _step_elements(step: Dict[str, Any]) -> List[str]:
+    """步骤直接引用的元素名：assert_snapshot的expected键，assert_visual的element和mask"""
+    if step["action"] == "assert_snapshot":
+        return list(step.get("expected") or {})
+    if step["action"] == "assert_visual":
+        names = [step["element"]] if step.get("element") else []
+        return names + [mask for mask in step.get("mask", []) if isinstance(mask, str)]
+    return []
+
+
+def _call_elements(node: ast.Call, method: Any) -> List[str]:
+    """调用中以字符串常量传入的元素名"""
+    if node.func.attr == "get_locator":
+        position = 0
+    elif node.func.attr == "query_elements":
+        names = node.args[0] if node.args else None
+        if isinstance(names, (ast.List, ast.Tuple)):
+            return [item.value for item in names.elts if isinstance(item, ast.Constant) and isinstance(item.value, str)]
+        return []
+    else:
+        position = getattr(method, "locator_arg", None)
+        if position is None:
+            return []
+    values = [keyword.value for keyword in node.keywords if keyword.arg == "element_name"]
+    if len(node.args) > position:
+        values.append(node.args[position])
+    return [value.value for value in values if isinstance(value, ast.Constant) and isinstance(value.value, str)]
+
+
+def _strings(value: Any) -> Iterable[str]:
+    """递归取出参数/预期值中的字符串"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+def _snake_case(name: str) -> str:
+    """LoginPage -> login_page"""
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+def _closest(name: str, candidates: Iterable[str]) -> Optional[str]:
+    matches = difflib.get_close_matches(name, list(candidates), n=1, cutoff=0.6)
+    return matches[0] if matches else None
+
+
+def _suggest(name: str, candidates: Iterable[str]) -> str:
+    closest = _closest(name, candidates)
+    return f"，是否为: {closest}" if closest else ""
+
+
+def _display_signature(signature: inspect.Signature) -> str:
+    """去掉self的签名"""
+    params = list(signature.parameters.values())[1:]
+    return str(signature.replace(parameters=params))
+
+
+def format_issues(issues: List[PreflightIssue], elapsed: float) -> str:
+    """按位置汇总输出全部问题"""
+    lines = [f"用例预检查发现 {len(issues)} 个问题（耗时 {elapsed * 1000:.0f}ms），未启动浏览器："]
+    lines.extend(f"  {issue}" for issue in issues)
+    return "\n".join(lines)
+
+
+def run_preflight(config: ConfigParser, test_dir: str = "tests", case_ids: List[str] = None) -> int:
+    """执行预检查并输出结果，返回退出码（有问题时为1）"""
+    started = time.perf_counter()
+    issues = Preflight(config, LocatorParser()).check_files(test_dir, case_ids)
+    elapsed = time.perf_counter() - started
+    if issues:
+        print(format_issues(issues, elapsed))
+        return 1
+    print(f"用例预检查通过（耗时 {elapsed * 1000:.0f}ms）")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="启动浏览器前静态校验YAML用例")
+    parser.add_argument("test_dir", nargs="?", default="tests", help="YAML用例目录，默认：tests")
+    parser.add_argument("--env", help="测试环境选择, dev, test, prod")
+    args = parser.parse_args()
+    sys.exit(run_preflight(ConfigParser(env=args.env), args.test_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import logging
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+from src.utils.perf import recorder
+
+logger = logging.getLogger(__name__)
+
+# 就绪策略注册表：策略名 -> 上下文管理器工厂(page_object, spec, timeout)
+# 策略包裹触发动作（goto/click等）执行：需要提前监听的策略（如response）在动作前注册，其余在动作后等待
+READINESS_STRATEGIES: Dict[str, Callable] = {}
+
+
+def register_strategy(name: str):
+    """注册页面就绪策略的装饰器"""
+    def decorator(func: Callable) -> Callable:
+        READINESS_STRATEGIES[name] = contextmanager(func)
+        return func
+    return decorator
+
+
+@register_strategy("domcontentloaded")
+def _dom_content_loaded(page_object, spec: Dict[str, Any], timeout: float):
+    yield
+    page_object.page.wait_for_load_state("domcontentloaded", timeout=timeout)
+
+
+@register_strategy("load")
+def _load(page_object, spec: Dict[str, Any], timeout: float):
+    yield
+    page_object.page.wait_for_load_state("load", timeout=timeout)
+
+
+@register_strategy("networkidle")
+def _network_idle(page_object, spec: Dict[str, Any], timeout: float):
+    yield
+    page_object.page.wait_for_load_state("networkidle", timeout=timeout)
+
+
+@register_strategy("element")
+def _element_visible(page_object, spec: Dict[str, Any], timeout: float):
+    """target为元素名或元素名列表，任意一个可见即就绪"""
+    yield
+    targets = spec.get("target")
+    if not targets:
+        raise ValueError("element就绪策略缺少target")
+    if isinstance(targets, str):
+        targets = [targets]
+    locator = page_object.get_locator(targets[0])
+    for target in targets[1:]:
+        locator = locator.or_(page_object.get_locator(target))
+    locator.first.wait_for(state="visible", timeout=timeout)
+
+
+@register_strategy("js")
+def _js_predicate(page_object, spec: Dict[str, Any], timeout: float):
+    """expression为返回真值即就绪的JS表达式"""
+    yield
+    expression = spec.get("expression")
+    if not expression:
+        raise ValueError("js就绪策略缺少expression")
+    page_object.page.wait_for_function(expression, timeout=timeout)
+
+
+@register_strategy("response")
+def _network_response(page_object, spec: Dict[str, Any], timeout: float):
+    """url为glob或正则，触发动作前开始监听，收到匹配的响应即就绪"""
+    url = spec.get("url")
+    if not url:
+        raise ValueError("response就绪策略缺少url")
+    with page_object.page.expect_response(url, timeout=timeout) as response_info:
+        yield
+    response_info.value
+
+
+class ReadinessStats:
+    """记录每次就绪等待的耗时，用于找出等待时间最多的页面"""
+
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+
+    def record(self, page_name: str, event: str, strategy: str, duration: float) -> None:
+        self.records.append({"page": page_name, "event": event, "strategy": strategy, "duration": duration})
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """按页面和事件汇总，总等待时间降序"""
+        grouped = defaultdict(list)
+        for record in self.records:
+            grouped[(record["page"], record["event"], record["strategy"])].append(record["duration"])
+        rows = [
+            {"page": page, "event": event, "strategy": strategy, "count": len(durations),
+             "total": sum(durations), "max": max(durations)}
+            for (page, event, strategy), durations in grouped.items()
+        ]
+        return sorted(rows, key=lambda row: row["total"], reverse=True)
+
+
+# 进程级统计
+readiness_stats = ReadinessStats()
+
+
+@contextmanager
+def wait_until_ready(page_object, event: str, spec: Dict[str, Any], timeout: float):
+    """包裹触发动作执行，并按策略等待页面就绪，记录等待耗时"""
+    strategy = spec.get("strategy")
+    factory = READINESS_STRATEGIES.get(strategy)
+    if not factory:
+        raise ValueError(f"不支持的就绪策略: {strategy}, 支持: {list(READINESS_STRATEGIES)}")
+
+    timeout = spec.get("timeout", timeout)
+    with factory(page_object, spec, timeout):
+        yield
+        # 动作执行完毕，开始计时等待就绪
+        started = time.perf_counter()
+    duration = time.perf_counter() - started
+    readiness_stats.record(page_object.page_name, event, strategy, duration)
+    recorder.record(f"ready.{strategy}", duration, kind="ready", page=page_object.page_name, locator=event)
+    logger.info(f"页面就绪 {page_object.page_name}.{event} [{strategy}] 等待 {duration * 1000:.0f}ms")
@@ -0,0 +1,289 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+
+from src.impact import PAGE_OBJECT_DIR, ImpactIndex, tracked_files
+from src.page_objects import PAGE_OBJECT_MAP
+from src.utils.config_parser import ConfigParser
+from src.utils.file_lock import FileLock
+from src.utils.locator_parser import LocatorParser
+
+# 缓存键格式版本，修改键的组成时递增，使旧的缓存结果失效
+CACHE_VERSION = 1
+BUILD_ID_ENV = "UI_AUTOMATOR_BUILD_ID"
+# 不影响用例结果的配置，不参与缓存键
+NON_SEMANTIC_CONFIG = ("result_cache", "perf", "report", "artifacts", "tracing", "browser_server", "distributed",
+                       "checkpoint")
+# 随机数据每次运行不同，使用了这些变量的用例默认不缓存
+NON_DETERMINISTIC_PREFIXES = ("${RANDOM_",)
+
+
+def _digest(value: Any) -> str:
+    data = value if isinstance(value, bytes) else json.dumps(value, sort_keys=True, ensure_ascii=False,
+                                                              default=str).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _file_digest(path: str) -> Optional[str]:
+    """文件内容哈希，文件不存在时返回None"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def _uses_prefix(value: Any, prefixes: Tuple[str, ...]) -> bool:
+    if isinstance(value, str):
+        return value.startswith(prefixes)
+    if isinstance(value, dict):
+        return any(_uses_prefix(item, prefixes) for item in value.values())
+    if isinstance(value, list):
+        return any(_uses_prefix(item, prefixes) for item in value)
+    return False
+
+
+class CaseFingerprint:
+    """用例依赖内容的哈希：YAML用例、可达的页面对象类源码、用到的定位器、当前环境的配置、框架代码和被测构建标识"""
+
+    def __init__(self, config: ConfigParser, build_id: str, test_dir: str = "tests",
+                 locator_parser: LocatorParser = None):
+        self.build_id = build_id
+        self.locator_parser = locator_parser or LocatorParser()
+        self.index = ImpactIndex(test_dir, self.locator_parser)
+        resolved = {key: value for key, value in config.get_all().items() if key not in NON_SEMANTIC_CONFIG}
+        self.config_digest = _digest(resolved)
+        self.framework_digest = self._framework_digest(test_dir)
+        self._class_digests: Dict[str, str] = {}
+        self._dataset_digests: Dict[str, Optional[str]] = {}
+
+    @staticmethod
+    def _framework_digest(test_dir: str) -> str:
+        """页面对象、定位器、用例和配置文件之外的框架代码（执行器、驱动、conftest等），变化时全部缓存失效"""
+        digests = {}
+        for path in tracked_files(test_dir):
+            if path.startswith(("config/", f"{PAGE_OBJECT_DIR}/", f"{test_dir.rstrip('/')}/")):
+                continue
+            digests[path] = _file_digest(path)
+        return _digest(digests)
+
+    @staticmethod
+    def cacheable(case: Dict[str, Any]) -> Tuple[bool, str]:
+        """用例能否使用缓存结果：cache: false显式关闭；使用了随机数据时默认关闭，可用cache: true开启（如已固定数据种子）"""
+        if case.get("cache") is False:
+            return False, "用例声明cache: false"
+        if case.get("page_object") not in PAGE_OBJECT_MAP:
+            return False, "页面对象无效"
+        if case.get("cache") is not True:
+            steps = case["steps"] + (case.get("dataset") or {}).get("reset", [])
+            if any(_uses_prefix([step.get("args"), step.get("expected")], NON_DETERMINISTIC_PREFIXES) for step in steps):
+                return False, "使用了${RANDOM_*}随机数据"
+        return True, ""
+
+    def key(self, case_id: str, case: Dict[str, Any]) -> str:
+        """计算用例的缓存键"""
+        deps = self.index.case_dependencies(case_id, case)
+        owners = sorted({name.split(".", 1)[0] for name in deps.methods})
+        locators = {}
+        for name in sorted(deps.locators):
+            page_name, element_name = name.split(".", 1)
+            locators[name] = self.locator_parser.locators.get(page_name, {}).get(element_name)
+        dataset = case.get("dataset") or {}
+        return _digest({
+            "version": CACHE_VERSION,
+            "build_id": self.build_id,
+            "framework": self.framework_digest,
+            "config": self.config_digest,
+            "case_id": case_id,
+            "case": case,
+            "classes": {owner: self._class_digest(owner) for owner in owners},
+            "locators": locators,
+            "dataset": self._dataset_digest(dataset["file"]) if dataset else None,
+        })
+
+    def _class_digest(self, owner: str) -> str:
+        """页面对象类所在模块的源码哈希（含模块级常量和导入）"""
+        if owner not in self._class_digests:
+            cls = next(cls for page_class in PAGE_OBJECT_MAP.values() for cls in page_class.__mro__
+                       if cls.__name__ == owner)
+            self._class_digests[owner] = _digest(inspect.getsource(inspect.getmodule(cls)).encode("utf-8"))
+        return self._class_digests[owner]
+
+    def _dataset_digest(self, path: str) -> Optional[str]:
+        if path not in self._dataset_digests:
+            self._dataset_digests[path] = _file_digest(path)
+        return self._dataset_digests[path]
+
+
+class ResultCache:
+    """按内容寻址的用例结果缓存：每个缓存键一个JSON文件，原子写入，多进程并发写安全；超过条数上限时按最近使用时间淘汰"""
+
+    def __init__(self, cache_dir: str = ".ui_cache/results", max_entries: int = 5000):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+
+    @classmethod
+    def from_config(cls, config: ConfigParser) -> "ResultCache":
+        return cls(config.get("result_cache.dir", ".ui_cache/results"),
+                   int(config.get("result_cache.max_entries", 5000) or 0))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的通过结果，命中时更新文件时间供淘汰使用"""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                record = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return record if record.get("outcome") == "passed" else None
+
+    def put(self, key: str, record: Dict[str, Any]) -> None:
+        """原子写入，同一键的并发写入内容相同，后写覆盖即可；写入失败不影响执行"""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def evict(self) -> int:
+        """条数超过上限时删除最久未使用的结果，返回删除数；加锁避免多个进程同时淘汰"""
+        if not self.max_entries or not os.path.isdir(self.cache_dir):
+            return 0
+        try:
+            with FileLock(os.path.join(self.cache_dir, ".evict.lock"), timeout=0):
+                return self._evict()
+        except TimeoutError:
+            # 其他进程正在淘汰
+            return 0
+
+    def _evict(self) -> int:
+        entries = []
+        for dirpath, _dirnames, filenames in os.walk(self.cache_dir):
+            for name in filenames:
+                if name.endswith(".json"):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        entries.append((os.path.getmtime(path), path))
+                    except OSError:
+                        continue
+        excess = len(entries) - self.max_entries
+        if excess <= 0:
+            return 0
+        removed = 0
+        for _mtime, path in sorted(entries)[:excess]:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                continue
+        return removed
+
+
+class CachedCaseItem(pytest.Item):
+    """缓存命中的用例：不请求任何fixture、不启动浏览器，直接报告为通过（cached）"""
+
+    def __init__(self, *, record: Dict[str, Any], **kwargs):
+        super().__init__(**kwargs)
+        self.record = record
+
+    def runtest(self) -> None:
+        # allure只在执行用例时用到，导入本模块（收集阶段）时不加载
+        import allure
+        allure.dynamic.tag("cached")
+        allure.dynamic.description(f"结果缓存命中：{self.record.get('recorded_at')} 在构建 "
+                                   f"{self.record.get('build_id')} 上通过，依赖内容未变化，本次未执行")
+
+    def reportinfo(self):
+        return self.path, 0, f"yaml: {self.name} (cached)"
+
+
+class ResultCachePlugin:
+    """pytest插件（--incremental启用）：收集后把依赖未变化且上次通过的用例替换为CachedCaseItem，通过的用例写入缓存"""
+
+    def __init__(self, cache: ResultCache, fingerprint: CaseFingerprint):
+        self.cache = cache
+        self.fingerprint = fingerprint
+        self._keys: Dict[str, str] = {}
+        self._outcomes: Dict[str, str] = {}
+        self.hits = 0
+        self.stored = 0
+        self.evicted = 0
+        self.uncacheable: Dict[str, List[str]] = {}
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, items: List[pytest.Item]) -> None:
+        from src.yaml_collector import YamlItem
+
+        for index, item in enumerate(items):
+            if not isinstance(item, YamlItem) or item.bind_error:
+                continue
+            cacheable, reason = self.fingerprint.cacheable(item.params)
+            if not cacheable:
+                self.uncacheable.setdefault(reason, []).append(item.nodeid)
+                continue
+            key = self.fingerprint.key(item.nodeid, item.params)
+            record = self.cache.get(key)
+            if record is None:
+                self._keys[item.nodeid] = key
+                continue
+            self.hits += 1
+            items[index] = CachedCaseItem.from_parent(item.parent, name=item.name, record=record)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        outcome = yield
+        if isinstance(item, CachedCaseItem):
+            outcome.get_result().cached = True
+
+    def pytest_report_teststatus(self, report):
+        if getattr(report, "cached", False) and report.when == "call":
+            return "cached", "c", "CACHED"
+        return None
+
+    def pytest_runtest_logreport(self, report) -> None:
+        key = self._keys.get(report.nodeid)
+        if key is None:
+            return
+        if report.failed or report.skipped:
+            self._outcomes[report.nodeid] = report.outcome
+        else:
+            self._outcomes.setdefault(report.nodeid, "passed")
+        if report.when == "teardown" and self._outcomes.pop(report.nodeid, None) == "passed":
+            self.cache.put(key, {
+                "case_id": report.nodeid,
+                "outcome": "passed",
+                "build_id": self.fingerprint.build_id,
+                "recorded_at": datetime.now().isoformat(timespec="seconds"),
+                "recorded_ts": time.time(),
+            })
+            self.stored += 1
+
+    def pytest_sessionfinish(self) -> None:
+        self.evicted = self.cache.evict()
+
+    def pytest_terminal_summary(self, terminalreporter) -> None:
+        terminalreporter.write_sep("-", "结果缓存")
+        skipped = sum(len(case_ids) for case_ids in self.uncacheable.values())
+        terminalreporter.write_line(
+            f"构建 {self.fingerprint.build_id}：命中 {self.hits}，执行 {len(self._keys)}，写入 {self.stored}，"
+            f"不可缓存 {skipped}，淘汰 {self.evicted}"
+        )
+        for reason, case_ids in self.uncacheable.items():
+            terminalreporter.write_line(f"  {reason}: {len(case_ids)} 个用例")
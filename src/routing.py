@@ -0,0 +1,112 @@
+import fnmatch
+import json
+import os
+import re
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+from src.utils.config_parser import ConfigParser
+
+HAR_MODES = ("off", "record", "replay")
+
+
+class RoutingStats:
+    """单个用例的请求路由统计"""
+
+    def __init__(self):
+        self.blocked = 0
+        self.replayed = 0
+        self.bytes_saved = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        return {"blocked": self.blocked, "replayed": self.replayed, "bytes_saved": self.bytes_saved}
+
+
+class RequestRouter:
+    """BrowserContext请求路由：按资源类型/URL屏蔽请求，按用例录制或回放HAR"""
+
+    def __init__(self, config: ConfigParser):
+        self.block_resource_types = set(config.get("network.block_resource_types") or [])
+        self.block_url_patterns = [self._compile_pattern(p) for p in config.get("network.block_url_patterns") or []]
+        self.har_mode = config.get("network.har.mode", "off") or "off"
+        if self.har_mode not in HAR_MODES:
+            raise ValueError(f"不支持的HAR模式: {self.har_mode}, 支持: {list(HAR_MODES)}")
+        self.har_dir = config.get("network.har.dir", "hars")
+        self.har_not_found = config.get("network.har.not_found", "fallback")
+        # HAR路径 -> {(method, url): 响应体字节数}
+        self._har_index_cache: Dict[str, Dict[Tuple[str, str], int]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.block_resource_types or self.block_url_patterns or self.har_mode != "off")
+
+    @staticmethod
+    def _compile_pattern(pattern: str) -> Pattern:
+        """re:开头按正则处理，其余按glob处理"""
+        if pattern.startswith("re:"):
+            return re.compile(pattern[3:])
+        return re.compile(fnmatch.translate(pattern))
+
+    def har_path(self, case_id: str) -> str:
+        """用例对应的HAR文件：<har_dir>/<用例文件>/<用例名>.har"""
+        file_id, _, case_name = case_id.partition("::")
+        safe_file = re.sub(r"[^\w.-]", "_", os.path.splitext(file_id)[0])
+        safe_case = re.sub(r"[^\w.-]", "_", case_name or "default")
+        return os.path.join(self.har_dir, safe_file, f"{safe_case}.har")
+
+    def context_options(self, case_id: Optional[str]) -> Dict[str, Any]:
+        """创建上下文时的额外参数，录制模式下由Playwright在上下文关闭时写出HAR"""
+        if self.har_mode != "record" or not case_id:
+            return {}
+        har_path = self.har_path(case_id)
+        os.makedirs(os.path.dirname(har_path), exist_ok=True)
+        return {"record_har_path": har_path, "record_har_content": "embed"}
+
+    def attach(self, context, case_id: Optional[str]) -> RoutingStats:
+        """在上下文上注册路由，返回该用例的统计对象"""
+        stats = RoutingStats()
+        if not self.enabled:
+            return stats
+
+        har_index = {}
+        if case_id and os.path.exists(self.har_path(case_id)):
+            har_index = self._load_har_index(self.har_path(case_id))
+        if self.har_mode == "replay":
+            if not har_index:
+                raise FileNotFoundError(f"回放模式下未找到HAR文件: {self.har_path(case_id)}，请先以record模式运行")
+            context.route_from_har(self.har_path(case_id), not_found=self.har_not_found)
+
+        # 后注册的路由先匹配：先在这里统计/屏蔽，其余请求交给HAR回放或真实网络
+        def handle(route):
+            request = route.request
+            size = har_index.get((request.method, request.url))
+            if self._should_block(request.resource_type, request.url):
+                stats.blocked += 1
+                stats.bytes_saved += size or 0
+                return route.abort()
+            if self.har_mode == "replay" and size is not None:
+                stats.replayed += 1
+                stats.bytes_saved += size
+            return route.fallback()
+
+        context.route("**/*", handle)
+        return stats
+
+    def _should_block(self, resource_type: str, url: str) -> bool:
+        if resource_type in self.block_resource_types:
+            return True
+        return any(pattern.match(url) for pattern in self.block_url_patterns)
+
+    def _load_har_index(self, har_path: str) -> Dict[Tuple[str, str], int]:
+        """读取HAR中每个请求的响应体大小，用于统计回放/屏蔽节省的流量"""
+        if har_path not in self._har_index_cache:
+            with open(har_path, "r", encoding="utf-8") as f:
+                entries: List[Dict[str, Any]] = json.load(f).get("log", {}).get("entries", [])
+            index = {}
+            for entry in entries:
+                response = entry.get("response", {})
+                size = response.get("bodySize", -1)
+                if size is None or size < 0:
+                    size = response.get("content", {}).get("size", 0) or 0
+                index[(entry["request"]["method"], entry["request"]["url"])] = size
+            self._har_index_cache[har_path] = index
+        return self._har_index_cache[har_path]
@@ -0,0 +1,95 @@
+import heapq
+import os
+from statistics import median
+from typing import Dict, List, Optional
+
+from src.execution_plan import parse_case_file
+
+# 没有历史耗时记录时使用的默认估计值(秒)
+DEFAULT_CASE_DURATION = 10.0
+
+
+class Shard:
+    """分配给单个worker的用例集合"""
+
+    def __init__(self, worker_id: int):
+        self.worker_id = worker_id
+        self.cases: List[str] = []
+        self.estimated = 0.0
+        # 浏览器矩阵中该worker负责的浏览器，混合分配时为None
+        self.browser: Optional[str] = None
+
+    def add(self, case_id: str, duration: float) -> None:
+        self.cases.append(case_id)
+        self.estimated += duration
+
+
+def discover_case_ids(test_dir: str = "tests") -> List[str]:
+    """扫描YAML用例文件，返回与pytest一致的用例nodeid（相对当前目录）"""
+    case_ids = []
+    for root, _dirs, files in os.walk(test_dir):
+        for filename in sorted(files):
+            if not filename.startswith("test") or not filename.endswith((".yaml", ".yml")):
+                continue
+            path = os.path.join(root, filename)
+            file_id = os.path.relpath(path).replace(os.sep, "/")
+            case_ids.extend(f"{file_id}::{case_name}" for case_name in parse_case_file(path))
+    return case_ids
+
+
+def matrix_case_ids(case_ids: List[str], browsers: List[str]) -> List[str]:
+    """浏览器矩阵的用例nodeid，与pytest收集结果一致，如 tests/test_login.yaml::test_login[firefox]"""
+    return [f"{case_id}[{browser}]" for browser in browsers for case_id in case_ids]
+
+
+def case_browser(case_id: str) -> Optional[str]:
+    """矩阵用例nodeid中的浏览器，普通用例返回None"""
+    if case_id.endswith("]") and "[" in case_id:
+        return case_id[case_id.rindex("[") + 1:-1]
+    return None
+
+
+def estimate_durations(case_ids: List[str], history: Dict[str, float]) -> Dict[str, float]:
+    """用历史耗时估计每个用例的耗时，缺失记录的用例取已知耗时的中位数"""
+    known = [history[case_id] for case_id in case_ids if case_id in history]
+    fallback = median(known) if known else DEFAULT_CASE_DURATION
+    return {case_id: history.get(case_id, fallback) for case_id in case_ids}
+
+
+def assign_lpt(durations: Dict[str, float], workers: int) -> List[Shard]:
+    """最长处理时间优先(LPT)：按耗时从大到小，把用例依次分配给当前负载最小的worker"""
+    shards = [Shard(worker_id) for worker_id in range(workers)]
+    heap = [(0.0, shard.worker_id) for shard in shards]
+    for case_id, duration in sorted(durations.items(), key=lambda item: item[1], reverse=True):
+        load, worker_id = heapq.heappop(heap)
+        shards[worker_id].add(case_id, duration)
+        heapq.heappush(heap, (load + duration, worker_id))
+    return [shard for shard in shards if shard.cases]
+
+
+def assign_matrix(durations: Dict[str, float], workers: int) -> List[Shard]:
+    """浏览器矩阵分片：按各浏览器的预估总耗时分配worker数（每个浏览器至少一个），浏览器内再按LPT分配，
+    每个worker只启动一种浏览器；worker数少于浏览器数时退回混合LPT"""
+    by_browser: Dict[Optional[str], Dict[str, float]] = {}
+    for case_id, duration in durations.items():
+        by_browser.setdefault(case_browser(case_id), {})[case_id] = duration
+    if workers < len(by_browser):
+        return assign_lpt(durations, workers)
+
+    # 剩余worker依次分给平均负载最高的浏览器，不超过该浏览器的用例数
+    allocation = {browser: 1 for browser in by_browser}
+    loads = {browser: sum(cases.values()) for browser, cases in by_browser.items()}
+    for _ in range(workers - len(by_browser)):
+        candidates = [browser for browser in by_browser if allocation[browser] < len(by_browser[browser])]
+        if not candidates:
+            break
+        busiest = max(candidates, key=lambda browser: loads[browser] / allocation[browser])
+        allocation[busiest] += 1
+
+    shards = []
+    for browser, cases in by_browser.items():
+        for shard in assign_lpt(cases, allocation[browser]):
+            shard.worker_id = len(shards)
+            shard.browser = browser
+            shards.append(shard)
+    return shards
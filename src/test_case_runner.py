@@ -1,17 +1,50 @@
-import allure
+import json
+import logging
+import time
+from contextlib import nullcontext
+from typing import List
+
+from src.checkpoint import Checkpoint, RetryPolicy, RetryRecord
+from src.execution_plan import CompiledStep, compile_step, register_action
 from src.page_objects.base_page import BasePage
-from src.utils.screenshot import take_screenshot
+from src.utils.artifacts import ArtifactPipeline
 from src.utils.config_parser import ConfigParser
-from src.utils.data_generator import DataGenerator
+from src.utils.data_generator import CaseData, DataEngine
+from src.utils.dataset import Dataset, DatasetResult
+from src.utils.perf import recorder
+from src.tracing import CaseTrace, TRACE_ATTACHMENT
+from src.utils.snapshot import resolve_expectations, validate_expectations
+from src.utils.visual import VisualEngine, validate_visual_step
+
+logger = logging.getLogger(__name__)
+
+
+def _allure():
+    """报告只在执行用例时用到，allure首次使用时才导入，导入本模块注册动作（预检查、编译执行计划）时不加载"""
+    import allure
+    return allure
 
 
 class TestCaseRunner:
-    def __init__(self, page, config: ConfigParser, page_object: BasePage):
+    __test__ = False  # 避免被pytest当作测试类收集
+
+    def __init__(self, page, config: ConfigParser, page_object: BasePage, artifacts: ArtifactPipeline = None,
+                 data: CaseData = None, trace: CaseTrace = None, driver=None):
         self.page = page
         self.config = config
         self.page_object = page_object
-        self.screenshot_dir = config.get("report.screenshots")
-        self.data_generator = DataGenerator()
+        self.artifacts = artifacts or ArtifactPipeline.shared(config)
+        self.data = data or DataEngine.shared(config).for_case(None)
+        self.trace = trace
+        # 从步骤断点恢复时用于新建上下文，为None时不保存断点
+        self.driver = driver
+        # 本用例从断点恢复的记录
+        self.retries: List[RetryRecord] = []
+        # 数据驱动用例的当前行，供${ROW.列名}引用
+        self.row = None
+        # 数据驱动用例只报告行级步骤，失败截图数量受限
+        self.report_steps = True
+        self.capture_on_failure = True
 
     def resolve_variable(self, value):
         """解析变量占位符（如${BASE_URL}）"""
@@ -19,111 +52,252 @@ class TestCaseRunner:
             return value
         var_name = value[2:-1]
         if var_name.startswith("RANDOM_"):
-            return self._generate_dynamic_data(var_name)
-        return self.config.get(var_name.lower()) or value
+            return self.data.generate(var_name)
+        if var_name.startswith("ROW."):
+            return self._row_value(var_name[4:])
+        return self.config.resolve(value)
+
+    def _row_value(self, column: str):
+        if self.row is None:
+            raise KeyError(f"${{ROW.{column}}} 只能在声明了dataset的用例中使用")
+        if column not in self.row:
+            raise KeyError(f"数据集中不存在列: {column}，可用列: {list(self.row)}")
+        return self.row[column]
 
     def run_step(self, step):
-        """执行单个测试步骤"""
-        action = step.get("action")
-        args = [self.resolve_variable(arg) for arg in step.get("args", [])]
-        description = step.get("description", f"执行动作: {action}")
+        """执行单个测试步骤，支持原始YAML步骤字典或预编译步骤"""
+        if not isinstance(step, CompiledStep):
+            step = compile_step(step, type(self.page_object), self.config)
+        args = step.resolve_args(self.resolve_variable)
 
-        with allure.step(description):
+        report = self._report_step(step.description) if self.report_steps else nullcontext()
+        with report, recorder.span(
+                step.action, kind="step", page=getattr(self.page_object, "page_name", None),
+                locator=step.method_name, description=step.description):
+            if self.trace:
+                self.trace.begin_step(step.description)
             try:
-                # 页面加载动作
-                if action == "load":
-                    self.page_object.load(*args)
-
-                # 调用页面对象方法
-                elif action == "call_method":
-                    if not args:
-                        raise ValueError("call_method动作需要至少一个方法名参数")
-                    method_name = args[0]
-                    method_args = args[1:]
-                    method = getattr(self.page_object, method_name, None)
-                    if not method:
-                        raise AttributeError(f"页面对象中未找到方法: {method_name}")
-                    method(*method_args)
-
-                # 断言：等于
-                elif action == "assert_equal":
-                    method_name = step.get("method")
-                    expected = self.resolve_variable(step.get("expected"))
-                    method = getattr(self.page_object, method_name, None)
-                    if not method:
-                        raise AttributeError(f"页面对象中未找到断言方法: {method_name}")
-                    actual = method()
-                    assert actual == expected, f"断言失败: 实际值[{actual}] != 预期值[{expected}]"
-
-                # 断言：大于
-                elif action == "assert_greater_than":
-                    method_name = step.get("method")
-                    expected = self.resolve_variable(step.get("expected"))
-                    method = getattr(self.page_object, method_name, None)
-                    if not method:
-                        raise AttributeError(f"页面对象中未找到断言方法: {method_name}")
-                    actual = method()
-                    assert actual > expected, f"断言失败: 实际值[{actual}] 不大于 预期值[{expected}]"
-
-                # 断言：为True
-                elif action == "assert_true":
-                    method_name = step.get("method")
-                    method = getattr(self.page_object, method_name, None)
-                    if not method:
-                        raise AttributeError(f"页面对象中未找到断言方法: {method_name}")
-                    result = method()
-                    assert result is True, f"断言失败: 预期为True，实际为[{result}]"
-
-                else:
-                    raise ValueError(f"不支持的动作类型: {action}")
-
+                step.handler(self, step, args)
             except Exception as e:
                 # 失败时截图并附加到报告
-                screenshot_path = take_screenshot(
-                    self.page,
-                    self.screenshot_dir,
-                    step_description=description
-                )
-                allure.attach.file(
-                    screenshot_path,
-                    name="失败截图",
-                    attachment_type=allure.attachment_type.PNG
-                )
+                if self.capture_on_failure:
+                    try:
+                        self._attach_failure_screenshot(step.description)
+                    except Exception as capture_error:
+                        logger.warning(f"步骤失败后截图失败: {step.description}, {capture_error}")
+                if self.trace:
+                    # 页面或上下文崩溃后停止trace同样会失败，不能覆盖步骤本身的异常（报告原因和断点重试都依赖它）
+                    try:
+                        self._attach_failure_trace()
+                    except Exception as trace_error:
+                        logger.warning(f"步骤失败后保存trace失败: {step.description}, {trace_error}")
                 raise  # 重新抛出异常，标记测试失败
+            if self.trace:
+                self.trace.end_step()
+
+    def run_case(self, case, steps: List[CompiledStep], reset_steps: List[CompiledStep] = ()) -> None:
+        """执行整个用例，声明了dataset时按数据行逐行执行"""
+        dataset = Dataset.from_case(case)
+        if dataset is None:
+            self.run_steps(steps, RetryPolicy.from_config(self.config, case))
+            return
+        spec = case["dataset"]
+        self.run_dataset(steps, reset_steps, dataset, spec.get("max_failures"), spec.get("max_screenshots", 5))
 
-    def _generate_dynamic_data(self, var_name:str):
-        """根据动态类型生成动态数据"""
-        # 拆分类型和参数（如RANDOM_STRING:10 -> 类型=RANDOM_STRING，参数=10）
-        parts = var_name.split(":", 1)
-        data_type = parts[0]
-        params = parts[1:] if len(parts) > 1 else ""
-
-        # 映射数据类型到生成方法
-        data_methods = {
-            "RANDOM_STRING": self._handle_random_string,
-            "RANDOM_EMAIL": lambda: self.data_generator.random_email(),
-            "RANDOM_PHONE": lambda: self.data_generator.random_phone(),
-            "RANDOM_INT": self._handle_random_int,
-            "RANDOM_NAME": lambda: self.data_generator.random_name()
-        }
-
-        if data_type not in data_methods:
-            raise ValueError(f"不支持的数据类型：{data_type}")
-
-        return data_methods[data_type]()
-
-    def _handle_random_string(self, params: str = "8"):
-        """处理RANDOM_STRING"""
+    def run_steps(self, steps: List[CompiledStep], policy: RetryPolicy = None) -> None:
+        """
+        顺序执行步骤；标记了checkpoint的步骤成功后保存断点，之后的步骤出现可重试的失败时，
+        在新上下文中恢复最近的断点并从断点的下一步继续，不再重跑断点之前的步骤
+        """
+        policy = policy or RetryPolicy(0)
+        checkpoint = None
+        # 当前执行路径上已通过步骤的耗时，即整个用例重跑到这里所需的时间
+        elapsed = 0.0
+        index = 0
+        while index < len(steps):
+            step = steps[index]
+            started = time.perf_counter()
+            try:
+                self.run_step(step)
+            except Exception as e:
+                if checkpoint is None or len(self.retries) >= policy.max_retries or not policy.retryable(e):
+                    raise
+                self._resume(checkpoint, index, step, e)
+                index, elapsed = checkpoint.step_index + 1, checkpoint.elapsed
+                continue
+            elapsed += time.perf_counter() - started
+            if step.checkpoint and self.driver is not None and policy.max_retries:
+                checkpoint = self._save_checkpoint(index, step, elapsed)
+            index += 1
+
+    def _save_checkpoint(self, index: int, step: CompiledStep, elapsed: float) -> Checkpoint:
+        """保存上下文的storage state、当前URL和动态数据状态"""
+        with recorder.span("checkpoint.save", kind="checkpoint", page=getattr(self.page_object, "page_name", None),
+                           description=step.description):
+            return Checkpoint(index, step.description, self.page.context.storage_state(), self.page.url,
+                              self.data.snapshot(), elapsed)
+
+    def _resume(self, checkpoint: Checkpoint, index: int, step: CompiledStep, error: Exception) -> None:
+        """关闭失败的上下文，在新上下文中恢复断点：登录态、页面URL（按就绪策略等待）和动态数据"""
+        started = time.perf_counter()
+        description = f"从断点恢复：第{index + 1}步失败，回到第{checkpoint.step_index + 1}步 {checkpoint.description}"
+        with self._report_step(description), recorder.span(
+                "checkpoint.restore", kind="checkpoint", page=getattr(self.page_object, "page_name", None),
+                description=step.description):
+            try:
+                self.page = self.driver.restart_context(checkpoint.storage_state)
+                self.trace = self.driver.trace
+                self.page_object.bind_page(self.page)
+                self.data.restore(checkpoint.data_state)
+                self.page_object.load(checkpoint.url)
+            except Exception as restore_error:
+                raise RuntimeError(f"第{index + 1}步失败（{error}），从断点恢复失败: {restore_error}") from restore_error
+        self.retries.append(RetryRecord(index, step.description, error, checkpoint, time.perf_counter() - started))
+
+    def run_dataset(self, steps: List[CompiledStep], reset_steps: List[CompiledStep], dataset: Dataset,
+                    max_failures: int = None, max_screenshots: int = 5) -> DatasetResult:
+        """
+        对数据集的每一行执行同一组步骤，行之间复用页面，只执行重置步骤恢复状态
+        :param max_failures: 失败行数达到该值时停止，None表示执行全部行
+        :param max_screenshots: 最多为前几个失败行截图，控制报告体积
+        """
+        result = DatasetResult(dataset.file)
+        screenshots_left = max_screenshots
+        self.report_steps = False
         try:
-            length = int(params)
-            return self.data_generator.random_string(length)
-        except ValueError:
-            raise ValueError(f"RANDOM_STRING参数格式错误，应为整数（如RANDOM_STRING:10），实际为: {params}")
+            for index, row in dataset:
+                if result.total and reset_steps:
+                    self._reset_between_rows(reset_steps, index)
+                name = dataset.row_name(index, row)
+                self.row = row
+                self.capture_on_failure = screenshots_left > 0
+                failed_step, error = "", None
+                started = time.perf_counter()
+                try:
+                    # 每行在报告中只有一个步骤，行内步骤仅在失败时体现在错误信息中
+                    with self._report_step(f"[{index}] {name}"), recorder.span(
+                            "row", kind="row", page=getattr(self.page_object, "page_name", None), description=name):
+                        for step in steps:
+                            failed_step = step.description
+                            self.run_step(step)
+                except Exception as e:
+                    error = e
+                    if self.capture_on_failure:
+                        screenshots_left -= 1
+                result.add(index, name, time.perf_counter() - started, failed_step if error else "", error)
+                if error is not None and max_failures and result.failed >= max_failures:
+                    break
+        finally:
+            self.row = None
+            self.report_steps = True
+            self.capture_on_failure = True
+            if result.total:
+                self._attach(result.to_csv(), "数据行结果", _allure().attachment_type.CSV)
+        assert not result.failed, result.summary()
+        return result
 
-    def _handle_random_int(self, params: str = "1-100"):
-        """处理RANDOM_INT"""
+    def _reset_between_rows(self, reset_steps: List[CompiledStep], index: int) -> None:
+        """执行重置步骤，重置失败时后续行的结果不可信，直接中止"""
         try:
-            start, end = map(int, params.split("-"))
-            return self.data_generator.random_int(start, end)
-        except ValueError:
-            raise ValueError(f"RANDOM_INT参数格式错误，应为start-end（如RANDOM_INT:1-10），实际为: {params}")
\ No newline at end of file
+            for step in reset_steps:
+                self.run_step(step)
+        except Exception as e:
+            raise RuntimeError(f"第{index}行执行前重置失败: {e}") from e
+
+    def _report_step(self, description: str):
+        """步骤报告上下文，子类可替换报告方式"""
+        return _allure().step(description)
+
+    def _attach(self, body, name: str, attachment_type) -> None:
+        """附件写入报告，子类可替换报告方式"""
+        _allure().attach(body, name=name, attachment_type=attachment_type.mime_type,
+                      extension=attachment_type.extension)
+
+    def _attach_failure_trace(self) -> None:
+        """失败步骤及其之前若干步骤的trace写入报告，可用 playwright show-trace 打开"""
+        for name, data in self.trace.failure_traces():
+            self._attach(data, name, TRACE_ATTACHMENT)
+
+    def _attach_failure_screenshot(self, description: str) -> None:
+        """失败截图并附加到报告，截图字节直接写入报告，本地副本由后台线程写盘"""
+        artifact = self._capture_failure(description)
+        self._attach(artifact.data, "失败截图", self._attachment_type(artifact))
+
+    def _capture_failure(self, description: str):
+        """截取失败现场，element模式下截取最后操作的元素"""
+        locator = None
+        last_element = getattr(self.page_object, "last_element", None)
+        if last_element:
+            locator = self.page_object.get_locator(last_element)
+        return self.artifacts.capture(self.page, description, locator=locator)
+
+    @staticmethod
+    def _attachment_type(artifact):
+        return _allure().attachment_type.PNG if artifact.extension == "png" else _allure().attachment_type.JPG
+
+    # 页面加载动作
+    @register_action("load")
+    def _action_load(self, step: CompiledStep, args):
+        self.page_object.load(*args)
+
+    # 调用页面对象方法
+    @register_action("call_method", method_source="args")
+    def _action_call_method(self, step: CompiledStep, args):
+        step.method(self.page_object, *args)
+
+    # 断言：等于
+    @register_action("assert_equal", method_source="method", required=("expected",))
+    def _action_assert_equal(self, step: CompiledStep, args):
+        expected = step.resolve_expected(self.resolve_variable)
+        actual = step.method(self.page_object)
+        assert actual == expected, f"断言失败: 实际值[{actual}] != 预期值[{expected}]"
+
+    # 断言：大于
+    @register_action("assert_greater_than", method_source="method", required=("expected",))
+    def _action_assert_greater_than(self, step: CompiledStep, args):
+        expected = step.resolve_expected(self.resolve_variable)
+        actual = step.method(self.page_object)
+        assert actual > expected, f"断言失败: 实际值[{actual}] 不大于 预期值[{expected}]"
+
+    # 断言：为True
+    @register_action("assert_true", method_source="method")
+    def _action_assert_true(self, step: CompiledStep, args):
+        result = step.method(self.page_object)
+        assert result is True, f"断言失败: 预期为True，实际为[{result}]"
+
+    # 断言：批量检查多个元素的状态，一次页面内查询，失败时列出全部不一致项
+    @register_action("assert_snapshot", required=("expected",), validate=validate_expectations)
+    def _action_assert_snapshot(self, step: CompiledStep, args):
+        expected = resolve_expectations(step.expected, self.resolve_variable)
+        _snapshot, mismatches = self.page_object.wait_for_snapshot(expected)
+        assert not mismatches, "快照断言失败:\n" + "\n".join(mismatches)
+
+    # 断言：截图与基线的视觉对比，差异图和差异占比写入报告
+    @register_action("assert_visual", required=("name",), validate=validate_visual_step)
+    def _action_assert_visual(self, step: CompiledStep, args):
+        spec = step.raw
+        masks = spec.get("mask", [])
+        data = self.page_object.capture_visual(spec.get("element"), bool(spec.get("full_page")),
+                                               [mask for mask in masks if isinstance(mask, str)])
+        page_name = self.page_object.page_name
+        with recorder.span("visual.compare", kind="visual", page=page_name, locator=spec["name"]):
+            result = VisualEngine.shared(self.config).check(
+                page_name, spec["name"], data, [mask for mask in masks if isinstance(mask, dict)],
+                spec.get("tolerance"), spec.get("threshold"))
+        self._attach(json.dumps(result.to_dict(), ensure_ascii=False, indent=2), f"视觉对比: {spec['name']}",
+                     _allure().attachment_type.JSON)
+        if result.diff_png:
+            self._attach(result.diff_png, f"视觉差异: {spec['name']}", _allure().attachment_type.PNG)
+            self._attach(data, f"实际截图: {spec['name']}", _allure().attachment_type.PNG)
+        assert result.passed, result.message
+
+    # 清空cookie和本地存储，用于数据驱动用例的行间重置
+    @register_action("clear_storage")
+    def _action_clear_storage(self, step: CompiledStep, args):
+        self.page.context.clear_cookies()
+        self.page.evaluate("() => { window.localStorage.clear(); window.sessionStorage.clear(); }")
+
+    # 浏览器后退
+    @register_action("go_back")
+    def _action_go_back(self, step: CompiledStep, args):
+        self.page.go_back()
@@ -0,0 +1,179 @@
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import pytest
+
+TIMING_DB_PATH = os.path.join(".ui_cache", "timings.db")
+# 每个用例（按浏览器）保留的最近执行次数，即平均耗时的统计窗口
+HISTORY_WINDOW = 5
+
+
+class TimingDB:
+    """用例耗时数据库（SQLite），记录每次执行的耗时和结果，供并行分片等功能使用"""
+
+    def __init__(self, path: str = TIMING_DB_PATH, history: int = HISTORY_WINDOW):
+        self.path = path
+        self.history = history
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # 多个worker进程并发写入，等待锁而不是立即报错
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS case_runs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, case_id TEXT NOT NULL, browser TEXT, "
+                "duration REAL NOT NULL, outcome TEXT NOT NULL, run_id TEXT, worker_id TEXT, "
+                "finished_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_case_runs_case ON case_runs(case_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_case_runs_run ON case_runs(run_id)")
+            # 从步骤断点恢复的记录，用于定位不稳定的步骤
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS step_retries ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, case_id TEXT NOT NULL, step_index INTEGER NOT NULL, "
+                "step TEXT, error TEXT, checkpoint_index INTEGER, saved REAL NOT NULL, run_id TEXT, "
+                "worker_id TEXT, finished_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def record(self, case_id: str, duration: float, outcome: str, browser: str = None,
+               run_id: str = None, worker_id: str = None) -> None:
+        """记录一次用例执行，并删除该用例在同一浏览器下超出history次的旧记录及其之前的断点重试记录"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO case_runs (case_id, browser, duration, outcome, run_id, worker_id, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (case_id, browser, duration, outcome, run_id, worker_id, time.time())
+            )
+            self.conn.execute(
+                "DELETE FROM case_runs WHERE case_id = ? AND browser IS ? AND id NOT IN ("
+                "  SELECT id FROM case_runs WHERE case_id = ? AND browser IS ? ORDER BY id DESC LIMIT ?)",
+                (case_id, browser, case_id, browser, self.history)
+            )
+            self.conn.execute(
+                "DELETE FROM step_retries WHERE case_id = ? AND finished_at < ("
+                "  SELECT MIN(finished_at) FROM case_runs WHERE case_id = ?)",
+                (case_id, case_id)
+            )
+
+    def record_retries(self, case_id: str, retries: List[Dict[str, Any]], run_id: str = None,
+                       worker_id: str = None) -> None:
+        """记录用例从步骤断点恢复的情况（RetryRecord.to_dict()）"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO step_retries (case_id, step_index, step, error, checkpoint_index, saved, run_id, "
+                "worker_id, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(case_id, retry["step_index"], retry["step"], retry["error"], retry["checkpoint_index"],
+                  retry["saved_seconds"], run_id, worker_id, time.time()) for retry in retries]
+            )
+
+    def retry_hotspots(self, run_id: str = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """按重试次数降序列出触发断点重试的步骤，不指定run_id时统计全部历史"""
+        rows = self.conn.execute(
+            "SELECT case_id, step_index, step, COUNT(*), SUM(saved), MAX(error) FROM step_retries "
+            "WHERE ? IS NULL OR run_id = ? GROUP BY case_id, step_index, step ORDER BY COUNT(*) DESC, SUM(saved) DESC "
+            "LIMIT ?",
+            (run_id, run_id, limit)
+        ).fetchall()
+        return [{"case_id": case_id, "step_index": step_index, "step": step, "retries": count, "saved": saved or 0.0,
+                 "error": error} for case_id, step_index, step, count, saved, error in rows]
+
+    def average_durations(self, case_ids: Iterable[str] = None, browser: str = None,
+                          window: int = HISTORY_WINDOW) -> Dict[str, float]:
+        """每个用例最近window次执行（不含跳过）的平均耗时，数据库只保留最近history次"""
+        sql = (
+            "SELECT case_id, AVG(duration) FROM ("
+            "  SELECT case_id, duration, ROW_NUMBER() OVER (PARTITION BY case_id ORDER BY id DESC) AS rn"
+            "  FROM case_runs WHERE outcome != 'skipped' AND (? IS NULL OR browser = ?)"
+            ") WHERE rn <= ? GROUP BY case_id"
+        )
+        rows = self.conn.execute(sql, (browser, browser, window)).fetchall()
+        durations = dict(rows)
+        if case_ids is not None:
+            wanted = set(case_ids)
+            durations = {case_id: value for case_id, value in durations.items() if case_id in wanted}
+        return durations
+
+    def last_outcomes(self, case_ids: Iterable[str] = None) -> Dict[str, str]:
+        """每个用例最近一次执行的结果"""
+        rows = self.conn.execute(
+            "SELECT case_id, outcome FROM case_runs WHERE id IN (SELECT MAX(id) FROM case_runs GROUP BY case_id)"
+        ).fetchall()
+        outcomes = dict(rows)
+        if case_ids is not None:
+            wanted = set(case_ids)
+            outcomes = {case_id: value for case_id, value in outcomes.items() if case_id in wanted}
+        return outcomes
+
+    def run_summary(self, run_id: str) -> Dict[str, Dict[str, float]]:
+        """按worker汇总一次运行的用例数和执行耗时"""
+        rows = self.conn.execute(
+            "SELECT worker_id, COUNT(*), SUM(duration) FROM case_runs WHERE run_id = ? GROUP BY worker_id",
+            (run_id,)
+        ).fetchall()
+        return {worker_id: {"cases": count, "busy": busy or 0.0} for worker_id, count, busy in rows}
+
+    def browser_summary(self, run_id: str) -> Dict[str, Dict[str, float]]:
+        """按浏览器汇总一次运行的用例数、失败数和执行耗时"""
+        rows = self.conn.execute(
+            "SELECT browser, COUNT(*), SUM(outcome = 'failed'), SUM(duration) FROM case_runs WHERE run_id = ? "
+            "GROUP BY browser",
+            (run_id,)
+        ).fetchall()
+        return {browser: {"cases": count, "failed": failed or 0, "busy": busy or 0.0}
+                for browser, count, failed, busy in rows}
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class TimingRecorder:
+    """pytest插件：累计每个YAML用例各阶段耗时，teardown后写入耗时数据库"""
+
+    def __init__(self, db: TimingDB, browser: str = None, run_id: str = None, worker_id: str = None):
+        self.db = db
+        self.browser = browser
+        self.run_id = run_id
+        self.worker_id = worker_id
+        self._pending: Dict[str, Dict[str, object]] = {}
+        self._case_ids: Set[str] = set()
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, items: List[pytest.Item]) -> None:
+        from src.yaml_collector import YamlItem
+
+        # 单元测试等非YAML用例不参与分片，不记录耗时
+        self._case_ids = {item.nodeid for item in items if isinstance(item, YamlItem)}
+
+    def pytest_runtest_logreport(self, report) -> None:
+        # 结果缓存命中的用例未执行，不记录耗时
+        if report.nodeid not in self._case_ids or getattr(report, "cached", False):
+            return
+        record = self._pending.setdefault(report.nodeid, {"duration": 0.0, "outcome": "passed"})
+        record["duration"] += report.duration
+        if report.failed:
+            record["outcome"] = "failed"
+        elif report.skipped and record["outcome"] == "passed":
+            record["outcome"] = "skipped"
+
+        if report.when == "teardown":
+            record = self._pending.pop(report.nodeid)
+            # 浏览器矩阵中的用例带有自己的浏览器
+            properties = dict(report.user_properties)
+            self.db.record(report.nodeid, record["duration"], record["outcome"],
+                           browser=properties.get("browser", self.browser), run_id=self.run_id,
+                           worker_id=self.worker_id)
+            if properties.get("checkpoint_retries"):
+                self.db.record_retries(report.nodeid, properties["checkpoint_retries"], run_id=self.run_id,
+                                       worker_id=self.worker_id)
+
+    def pytest_unconfigure(self, config) -> None:
+        self.db.close()
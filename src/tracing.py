@@ -0,0 +1,112 @@
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+from typing import Deque, List, Optional, Tuple
+
+from src.utils.config_parser import ConfigParser
+from src.utils.perf import recorder
+
+# 报告附件类型，与allure.attachment_type一样提供mime_type和extension
+AttachmentSpec = namedtuple("AttachmentSpec", ["mime_type", "extension"])
+TRACE_ATTACHMENT = AttachmentSpec("application/zip", "zip")
+
+
+class FailureTracer:
+    """失败时才保留的Playwright trace：每个步骤一个trace chunk，只在临时目录保留最近window个步骤"""
+
+    def __init__(self, config: ConfigParser):
+        self.enabled = bool(config.get("tracing.enabled", False))
+        self.window = max(1, int(config.get("tracing.window", 1) or 1))
+        self.screenshots = bool(config.get("tracing.screenshots", True))
+        self.snapshots = bool(config.get("tracing.snapshots", True))
+        self.max_saved = int(config.get("tracing.max_saved", 20) or 0)
+        run_id = os.getenv("UI_AUTOMATOR_RUN_ID") or datetime.now().strftime("%Y%m%d_%H%M%S")
+        worker_id = os.getenv("UI_AUTOMATOR_WORKER_ID")
+        self.save_dir = os.path.join(config.get("tracing.dir", "reports/traces"), run_id)
+        if worker_id is not None:
+            self.save_dir = os.path.join(self.save_dir, f"worker-{worker_id}")
+
+    def attach(self, context, case_id: Optional[str]) -> Optional["CaseTrace"]:
+        """在上下文上开始记录trace，未启用时返回None"""
+        if not self.enabled:
+            return None
+        started = time.perf_counter()
+        context.tracing.start(screenshots=self.screenshots, snapshots=self.snapshots, sources=False)
+        recorder.record("tracing.start", time.perf_counter() - started, kind="tracing")
+        return CaseTrace(self, context, case_id)
+
+
+class CaseTrace:
+    """单个用例的trace环形缓冲区"""
+
+    # 进程内已保存到本地的trace数量，超过max_saved后只附加到报告
+    _saved = 0
+    _saved_lock = threading.Lock()
+
+    def __init__(self, tracer: FailureTracer, context, case_id: Optional[str]):
+        self.tracer = tracer
+        self.context = context
+        self.case_id = case_id or "case"
+        self._temp_dir = tempfile.mkdtemp(prefix="ui-trace-")
+        self._chunks: Deque[Tuple[str, str]] = deque()  # (步骤描述, chunk文件)
+        self._sequence = 0
+        self._step: Optional[str] = None
+
+    def begin_step(self, description: str) -> None:
+        """开始新的chunk，上一个未结束的chunk由Playwright丢弃"""
+        started = time.perf_counter()
+        self.context.tracing.start_chunk(title=description)
+        self._step = description
+        recorder.record("tracing.chunk", time.perf_counter() - started, kind="tracing")
+
+    def end_step(self, failed: bool = False) -> None:
+        """结束当前chunk：window为1时通过的步骤直接丢弃，否则写入临时目录并淘汰最旧的chunk"""
+        if self._step is None:
+            return
+        started = time.perf_counter()
+        if failed or self.tracer.window > 1:
+            self._sequence += 1
+            path = os.path.join(self._temp_dir, f"{self._sequence:05d}.zip")
+            self.context.tracing.stop_chunk(path=path)
+            self._chunks.append((self._step, path))
+            while len(self._chunks) > self.tracer.window:
+                _step, stale = self._chunks.popleft()
+                os.remove(stale)
+        else:
+            self.context.tracing.stop_chunk()
+        self._step = None
+        recorder.record("tracing.chunk", time.perf_counter() - started, kind="tracing")
+
+    def failure_traces(self) -> List[Tuple[str, bytes]]:
+        """结束失败步骤的chunk，返回(附件名, 内容)，按时间顺序，最后一个为失败步骤"""
+        self.end_step(failed=True)
+        traces = []
+        for offset, (step, path) in enumerate(reversed(self._chunks)):
+            with open(path, "rb") as f:
+                data = f.read()
+            name = "Playwright Trace" if offset == 0 else f"Playwright Trace (失败前第{offset}步: {step})"
+            traces.append((name, data))
+            self._save(path, step, offset)
+        self._chunks.clear()
+        return list(reversed(traces))
+
+    def _save(self, path: str, step: str, offset: int) -> None:
+        """在数量上限内复制到本地，供 playwright show-trace 查看"""
+        with CaseTrace._saved_lock:
+            if CaseTrace._saved >= self.tracer.max_saved:
+                return
+            CaseTrace._saved += 1
+        safe_case = re.sub(r"[^\w.-]", "_", self.case_id)[-80:]
+        safe_step = re.sub(r"[^\w.-]", "_", step)[:40]
+        os.makedirs(self.tracer.save_dir, exist_ok=True)
+        shutil.copyfile(path, os.path.join(self.tracer.save_dir, f"{safe_case}-{self._sequence}-{offset}-{safe_step}.zip"))
+
+    def close(self) -> None:
+        """清理临时目录；trace随上下文关闭一起丢弃，无需单独停止"""
+        shutil.rmtree(self._temp_dir, ignore_errors=True)
+        self._chunks.clear()
@@ -0,0 +1,191 @@
+import hashlib
+import io
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from src.utils.config_parser import ConfigParser
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_MODES = ("viewport", "full_page", "element")
+IMAGE_FORMATS = ("png", "jpeg", "webp")
+
+
+class CapturedArtifact:
+    """一次截图的结果：原始字节用于直接附加到报告，落盘由后台线程完成"""
+
+    def __init__(self, data: bytes, extension: str, mime_type: str, description: str):
+        self.data = data
+        self.extension = extension
+        self.mime_type = mime_type
+        self.description = description
+
+
+class ArtifactPipeline:
+    """截图流水线：测试线程只负责截图，编码、按内容哈希去重和写盘在后台写线程完成，并限制单次运行的体积"""
+
+    _shared: Optional["ArtifactPipeline"] = None
+
+    def __init__(self, save_dir: str, capture_mode: str = "viewport", image_format: str = "jpeg",
+                 quality: int = 70, queue_size: int = 32, max_run_mb: float = 200, max_files: int = 500,
+                 keep_runs: int = 5, run_id: str = None, worker_id: str = None):
+        if capture_mode not in CAPTURE_MODES:
+            raise ValueError(f"不支持的截图模式: {capture_mode}, 支持: {list(CAPTURE_MODES)}")
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"不支持的截图格式: {image_format}, 支持: {list(IMAGE_FORMATS)}")
+
+        self.capture_mode = capture_mode
+        self.image_format = image_format
+        self.quality = quality
+        self.max_run_bytes = int(max_run_mb * 1024 * 1024)
+        self.max_files = max_files
+        # 同一次运行的各worker写入同一运行目录下的独立子目录
+        self.run_dir = os.path.join(save_dir, run_id or datetime.now().strftime("%Y%m%d_%H%M%S"))
+        if worker_id is None:
+            self.cleanup_old_runs(save_dir, keep_runs)
+        else:
+            self.run_dir = os.path.join(self.run_dir, f"worker-{worker_id}")
+
+        self._queue: "queue.Queue[Optional[CapturedArtifact]]" = queue.Queue(maxsize=queue_size)
+        self._hashes: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stats = {"captures": 0, "capture_seconds": 0.0, "bytes_written": 0, "files_written": 0,
+                       "deduplicated": 0, "dropped_over_budget": 0, "dropped_queue_full": 0}
+        self._writer = threading.Thread(target=self._write_loop, name="artifact-writer", daemon=True)
+        self._writer.start()
+
+    @classmethod
+    def from_config(cls, config: ConfigParser, save_dir: str = None) -> "ArtifactPipeline":
+        return cls(
+            save_dir=save_dir or config.get("report.screenshots"),
+            capture_mode=config.get("artifacts.capture_mode", "viewport"),
+            image_format=config.get("artifacts.format", "jpeg"),
+            quality=int(config.get("artifacts.quality", 70)),
+            queue_size=int(config.get("artifacts.queue_size", 32)),
+            max_run_mb=float(config.get("artifacts.max_run_mb", 200)),
+            max_files=int(config.get("artifacts.max_files", 500)),
+            keep_runs=int(config.get("artifacts.keep_runs", 5)),
+            run_id=os.getenv("UI_AUTOMATOR_RUN_ID"),
+            worker_id=os.getenv("UI_AUTOMATOR_WORKER_ID"),
+        )
+
+    @classmethod
+    def shared(cls, config: ConfigParser) -> "ArtifactPipeline":
+        """进程内共用的流水线（只启动一个写线程）"""
+        if cls._shared is None:
+            cls._shared = cls.from_config(config)
+        return cls._shared
+
+    @staticmethod
+    def cleanup_old_runs(save_dir: str, keep_runs: int) -> None:
+        """只保留最近keep_runs次运行的截图目录（含即将创建的本次运行）"""
+        if keep_runs <= 0 or not os.path.isdir(save_dir):
+            return
+        run_dirs = sorted(
+            (entry for entry in os.scandir(save_dir) if entry.is_dir()),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True
+        )
+        for entry in run_dirs[keep_runs - 1:]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    def capture(self, page, description: str, locator=None) -> CapturedArtifact:
+        """截图并交给后台线程写盘；element模式下截取传入的元素，失败时退回视口截图"""
+        started = time.perf_counter()
+        # Playwright只支持png/jpeg，webp在后台线程由Pillow转码
+        screenshot_type = "png" if self.image_format == "png" else "jpeg"
+        options = {"type": screenshot_type}
+        if screenshot_type == "jpeg":
+            options["quality"] = self.quality
+
+        data = None
+        if self.capture_mode == "element" and locator is not None:
+            try:
+                data = locator.screenshot(timeout=2000, **options)
+            except Exception:
+                data = None
+        if data is None:
+            data = page.screenshot(full_page=self.capture_mode == "full_page", **options)
+
+        with self._lock:
+            self._stats["captures"] += 1
+            self._stats["capture_seconds"] += time.perf_counter() - started
+
+        extension = "png" if screenshot_type == "png" else "jpg"
+        artifact = CapturedArtifact(data, extension, f"image/{screenshot_type}", description)
+        try:
+            self._queue.put(artifact, timeout=5)
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped_queue_full"] += 1
+            logger.warning(f"截图写入队列已满，丢弃本地副本: {description}")
+        return artifact
+
+    def _write_loop(self) -> None:
+        while True:
+            artifact = self._queue.get()
+            try:
+                if artifact is None:
+                    return
+                self._write(artifact)
+            except Exception as e:
+                logger.warning(f"截图写入失败: {artifact.description}, 错误: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, artifact: CapturedArtifact) -> None:
+        data, extension = artifact.data, artifact.extension
+        if self.image_format == "webp":
+            data, extension = self._encode_webp(data, extension)
+
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if digest in self._hashes:
+                self._stats["deduplicated"] += 1
+                return
+            over_budget = (self._stats["bytes_written"] + len(data) > self.max_run_bytes
+                           or self._stats["files_written"] >= self.max_files)
+            if over_budget:
+                self._stats["dropped_over_budget"] += 1
+                return
+            self._hashes[digest] = artifact.description
+            self._stats["bytes_written"] += len(data)
+            self._stats["files_written"] += 1
+
+        os.makedirs(self.run_dir, exist_ok=True)
+        safe_desc = "".join([c for c in artifact.description if c.isalnum() or c in " _-"]).strip()[:60]
+        with open(os.path.join(self.run_dir, f"{digest[:16]}_{safe_desc}.{extension}"), "wb") as f:
+            f.write(data)
+
+    def _encode_webp(self, data: bytes, extension: str):
+        """使用Pillow转为webp，未安装时保留原格式"""
+        try:
+            from PIL import Image
+        except ImportError:
+            return data, extension
+        buffer = io.BytesIO()
+        Image.open(io.BytesIO(data)).save(buffer, format="WEBP", quality=self.quality)
+        return buffer.getvalue(), "webp"
+
+    def flush(self) -> None:
+        """等待队列中的截图全部写盘"""
+        self._queue.join()
+
+    def close(self) -> None:
+        """写完剩余截图并停止写线程"""
+        if not self._writer.is_alive():
+            return
+        self._queue.put(None)
+        self._writer.join()
+        if ArtifactPipeline._shared is self:
+            ArtifactPipeline._shared = None
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(self._stats)
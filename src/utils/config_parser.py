@@ -1,6 +1,15 @@
 import yaml
 import os
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Mapping, Optional
+
+from src.utils.config_snapshot import ConfigSnapshot
+
+# 支持的浏览器类型
+SUPPORTED_BROWSERS = ("chromium", "firefox", "webkit")
+# 不随配置快照发给其他机器的配置项
+SECRET_PATHS = ("distributed.token",)
+# 父进程序列化的配置快照路径，子进程（并行worker）直接加载，不再解析YAML和环境变量
+CONFIG_SNAPSHOT_ENV = "UI_AUTOMATOR_CONFIG_SNAPSHOT"
 
 
 class ConfigParser:
@@ -9,10 +18,29 @@ class ConfigParser:
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
             cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
         return cls._instance
 
     def __init__(self, config_file: str = "config/config.yaml", env: str = None):
-        """初始化配置解析器，支持多环境和环境变量配置"""
+        """初始化配置解析器，支持多环境和环境变量配置；同一进程内只编译一次，环境不变时重复创建直接复用"""
+        if self._initialized and (env is None or env == self.current_env) and config_file == self.config_file:
+            return
+        self.config_file = config_file
+
+        snapshot_path = os.getenv(CONFIG_SNAPSHOT_ENV)
+        if snapshot_path and os.path.exists(snapshot_path):
+            snapshot = ConfigSnapshot.load(snapshot_path)
+            if env is None or env == snapshot.meta.get("env"):
+                if snapshot.meta.get("env_redacted"):
+                    # 分布式快照不含来自环境变量的值（账号密码等），由本机环境变量补全
+                    local = {path: value for path, value in self._env_var_paths().items()
+                             if snapshot.get(path) is None}
+                    snapshot = snapshot.with_overrides(local) if local else snapshot
+                self.current_env = snapshot.meta.get("env")
+                self.snapshot = snapshot
+                self._initialized = True
+                return
+
         # 默认配置
         self.default_config = {
             "base_url": "https://example.com",
@@ -25,6 +53,41 @@ class ConfigParser:
             "report": {
                 "allure_results": "reports/allure-results",
                 "screenshots": "screenshots"
+            },
+            "browser_pool": {
+                "max_uses": 0,
+                "max_memory_mb": 0
+            },
+            "readiness": {
+                "default": {"strategy": "domcontentloaded"}
+            },
+            "artifacts": {
+                "capture_mode": "viewport",
+                "format": "jpeg",
+                "quality": 70,
+                "queue_size": 32,
+                "max_run_mb": 200,
+                "max_files": 500,
+                "keep_runs": 5
+            },
+            "data": {
+                "seed": None,
+                "batch_size": 1,
+                "locale": "zh_CN"
+            },
+            "perf": {
+                "enabled": True,
+                "dir": "reports/perf"
+            },
+            "network": {
+                "block_resource_types": [],
+                "block_url_patterns": [],
+                "har": {"mode": "off", "dir": "hars", "not_found": "fallback"}
+            },
+            "auth": {
+                "state_dir": ".ui_cache/auth",
+                "ttl": 3600,
+                "profiles": {}
             }
         }
 
@@ -35,16 +98,19 @@ class ConfigParser:
         self.env_var_config = self._load_from_env_vars()
 
         # 合并配置（优先级：环境变量 > 环境配置 > 用户配置 > 默认配置）
-        self.config = self._merge_configs(
+        merged = self._merge_configs(
             self._merge_configs(
                 self._merge_configs(self.default_config, self.user_config),
                 self.env_specific_config
             ),
             self.env_var_config
         )
+        # 编译为不可变的扁平快照，之后的读取均为查表
+        self.snapshot = ConfigSnapshot.from_dict(merged, meta={"env": self.current_env})
 
         # 验证配置合法性
         self._validate_config()
+        self._initialized = True
 
     def _load_user_config(self, config_file: str) -> Dict[str, Any]:
         """加载用户配置文件"""
@@ -60,13 +126,17 @@ class ConfigParser:
     def _load_from_env_vars(self) -> Dict[str, Any]:
         """从环境变量加载配置（格式：UI_AUTOMATION_XXX_XXX）"""
         env_config = {}
-        prefix = "UI_AUTOMATION_"
-        for env_key, value in os.environ.items():
-            if env_key.startswith(prefix):
-                config_path = env_key[len(prefix):].lower().replace("_", ".")
-                self._set_config_by_path(env_config, config_path, value)
+        for config_path, value in self._env_var_paths().items():
+            self._set_config_by_path(env_config, config_path, value)
         return env_config
 
+    @staticmethod
+    def _env_var_paths() -> Dict[str, str]:
+        """环境变量对应的配置路径 -> 值"""
+        prefix = "UI_AUTOMATION_"
+        return {env_key[len(prefix):].lower().replace("_", "."): value
+                for env_key, value in os.environ.items() if env_key.startswith(prefix)}
+
     def _merge_configs(self, default: Dict[str, Any], user: Dict[str, Any]) -> Dict[str, Any]:
         """递归合并配置字典"""
         merged = default.copy()
@@ -96,24 +166,44 @@ class ConfigParser:
                 raise ValueError(f"缺少必要配置项: {item}")
 
         # 验证浏览器类型
-        valid_browsers = ["chromium", "firefox", "webkit"]
-        if self.get("browser") not in valid_browsers:
-            raise ValueError(f"不支持的浏览器: {self.get('browser')}, 支持: {valid_browsers}")
+        if self.get("browser") not in SUPPORTED_BROWSERS:
+            raise ValueError(f"不支持的浏览器: {self.get('browser')}, 支持: {list(SUPPORTED_BROWSERS)}")
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """合并后的完整配置（嵌套字典副本）"""
+        return self.snapshot.to_dict()
 
     def get(self, path: str, default: Optional[Any] = None) -> Any:
         """通过路径获取配置值"""
-        parts = path.split(".")
-        current = self.config
-        try:
-            for part in parts:
-                current = current[part]
-            return current
-        except (KeyError, TypeError):
-            return default
+        return self.snapshot.get(path, default)
+
+    def resolve(self, value: Any) -> Any:
+        """解析配置变量占位符（如${LOGIN.USERNAME}），无法解析时原样返回"""
+        return self.snapshot.resolve(value)
 
     def get_all(self) -> Dict[str, Any]:
         """获取完整配置"""
-        return self.config.copy()
+        return self.snapshot.to_dict()
+
+    def with_overrides(self, overrides: Mapping[str, Any]) -> ConfigSnapshot:
+        """返回叠加了覆盖项（路径 -> 值）的只读配置，用于单个worker或用例，不影响全局配置"""
+        return self.snapshot.with_overrides(overrides)
+
+    def dump_snapshot(self, path: str, redact_env: bool = False) -> None:
+        """序列化当前配置，子进程设置UI_AUTOMATOR_CONFIG_SNAPSHOT后直接加载
+
+        :param redact_env: 去掉来自环境变量的值和SECRET_PATHS（发给其他机器时使用），加载方从自身环境变量补全
+        """
+        if not redact_env:
+            self.snapshot.dump(path)
+            return
+        config = self.snapshot.to_dict()
+        redacted = [config_path for config_path, value in self._env_var_paths().items()
+                    if self.get(config_path) == value]
+        for config_path in redacted + list(SECRET_PATHS):
+            _remove_path(config, config_path)
+        ConfigSnapshot.from_dict(config, meta=dict(self.snapshot.meta, env_redacted=True)).dump(path)
 
     def update_from_cli(self, cli_args: Dict[str, Any]) -> None:
         """通过命令行参数更新配置"""
@@ -123,6 +213,33 @@ class ConfigParser:
             "base_url": "base_url",
             "env": "current_env"
         }
-        for cli_key, config_path in cli_mapping.items():
-            if cli_key in cli_args and cli_args[cli_key] is not None:
-                self._set_config_by_path(self.config, config_path, cli_args[cli_key])
+        overrides = {
+            config_path: cli_args[cli_key]
+            for cli_key, config_path in cli_mapping.items()
+            if cli_key in cli_args and cli_args[cli_key] is not None
+        }
+        if overrides:
+            self.snapshot = self.snapshot.with_overrides(overrides)
+
+
+def parse_browser_list(value: Optional[str]) -> List[str]:
+    """解析逗号分隔的浏览器矩阵（如"chromium,firefox"），去重并保持顺序"""
+    browsers = []
+    for name in (value or "").split(","):
+        name = name.strip().lower()
+        if not name or name in browsers:
+            continue
+        if name not in SUPPORTED_BROWSERS:
+            raise ValueError(f"不支持的浏览器: {name}, 支持: {list(SUPPORTED_BROWSERS)}")
+        browsers.append(name)
+    return browsers
+
+
+def _remove_path(config: Dict[str, Any], path: str) -> None:
+    """从嵌套字典中删除点分路径对应的配置项"""
+    parts = path.split(".")
+    for part in parts[:-1]:
+        config = config.get(part)
+        if not isinstance(config, dict):
+            return
+    config.pop(parts[-1], None)
@@ -0,0 +1,133 @@
+import json
+import os
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+_MISSING = object()
+# 覆盖层中表示“该路径已被删除”
+_REMOVED = object()
+
+
+def _freeze(value: Any) -> Any:
+    """字典转为只读映射，列表转为元组"""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """只读值转回普通字典/列表"""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def _flatten(value: Any, prefix: str, flat: Dict[str, Any]) -> None:
+    """把嵌套配置展开为点分路径，中间节点同样保留（值为只读映射）"""
+    flat[prefix] = _freeze(value)
+    if isinstance(value, Mapping):
+        for key, item in value.items():
+            _flatten(item, f"{prefix}.{key}", flat)
+
+
+def _index_children(flat: Mapping[str, Any]) -> Dict[str, Tuple[str, ...]]:
+    """按前缀索引扁平表：每个路径的全部子路径"""
+    children: Dict[str, List[str]] = {}
+    for key in flat:
+        parts = key.split(".")
+        for depth in range(1, len(parts)):
+            children.setdefault(".".join(parts[:depth]), []).append(key)
+    return {path: tuple(keys) for path, keys in children.items()}
+
+
+class ConfigSnapshot:
+    """不可变的扁平化配置快照：点分路径直接查表；覆盖项以写时复制的覆盖层叠加，不重新合并配置"""
+
+    __slots__ = ("_base", "_overlay", "_children", "meta")
+
+    def __init__(self, base: Dict[str, Any], overlay: Dict[str, Any] = None, meta: Dict[str, Any] = None,
+                 children: Dict[str, Tuple[str, ...]] = None):
+        self._base = base
+        self._overlay = overlay if overlay is not None else {}
+        # 路径 -> 底层扁平表中的全部子路径，各覆盖层共用，覆盖时不用遍历整个扁平表
+        self._children = children if children is not None else _index_children(base)
+        self.meta = MappingProxyType(dict(meta or {}))
+
+    @classmethod
+    def from_dict(cls, config: Mapping[str, Any], meta: Dict[str, Any] = None) -> "ConfigSnapshot":
+        flat = {}
+        for key, value in config.items():
+            _flatten(value, str(key), flat)
+        return cls(flat, meta=meta)
+
+    def get(self, path: str, default: Optional[Any] = None) -> Any:
+        """通过路径获取配置值；字典返回只读映射、列表返回元组（需要修改时自行dict()/list()复制）"""
+        value = self._lookup(path)
+        return default if value is _MISSING else value
+
+    def _lookup(self, path: str) -> Any:
+        """查找路径对应的只读值，不存在时返回_MISSING"""
+        value = self._overlay.get(path, _MISSING)
+        if value is _MISSING:
+            value = self._base.get(path, _MISSING)
+        return _MISSING if value is _REMOVED else value
+
+    def resolve(self, value: Any) -> Any:
+        """解析配置变量占位符（如${LOGIN.USERNAME}），无法解析时原样返回"""
+        if not isinstance(value, str) or not value.startswith("${") or not value.endswith("}"):
+            return value
+        return self.get(value[2:-1].lower()) or value
+
+    def with_overrides(self, overrides: Mapping[str, Any]) -> "ConfigSnapshot":
+        """返回叠加了覆盖项的新快照（路径 -> 值），原快照不变，底层扁平表和子路径索引共用；
+        耗时只与覆盖层、被覆盖节点的子路径和父节点的直接子项数量有关，与配置总量无关"""
+        overlay = dict(self._overlay)
+        view = ConfigSnapshot(self._base, overlay, self.meta, self._children)
+        for path, value in overrides.items():
+            # 旧值为字典时，其下的子路径一并失效
+            prefix = f"{path}."
+            stale = list(self._children.get(path, ())) + [key for key in overlay if key.startswith(prefix)]
+            for key in stale:
+                if view._lookup(key) is not _MISSING:
+                    overlay[key] = _REMOVED
+            overlay.update(self._flat_value(path, value))
+            # 重建各级父节点（浅复制，子项本身已是只读值），保证get("timeout")与get("timeout.element")一致
+            parts = path.split(".")
+            for depth in range(len(parts) - 1, 0, -1):
+                parent = view._lookup(".".join(parts[:depth]))
+                parent = dict(parent) if isinstance(parent, Mapping) else {}
+                parent[parts[depth]] = view._lookup(".".join(parts[:depth + 1]))
+                overlay[".".join(parts[:depth])] = MappingProxyType(parent)
+        return view
+
+    @staticmethod
+    def _flat_value(path: str, value: Any) -> Dict[str, Any]:
+        flat = {}
+        _flatten(value, path, flat)
+        return flat
+
+    def to_dict(self) -> Dict[str, Any]:
+        """还原为嵌套的普通字典"""
+        top_level = {key for key in list(self._base) + list(self._overlay) if "." not in key}
+        result = {}
+        for key in sorted(top_level):
+            value = self._lookup(key)
+            if value is not _MISSING:
+                result[key] = _thaw(value)
+        return result
+
+    def dump(self, path: str) -> None:
+        """序列化到JSON文件，供子进程直接加载"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"meta": dict(self.meta), "config": self.to_dict()}, f, ensure_ascii=False, default=str)
+
+    @classmethod
+    def load(cls, path: str) -> "ConfigSnapshot":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls.from_dict(data["config"], meta=data.get("meta"))
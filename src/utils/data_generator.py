@@ -1,27 +1,193 @@
+import os
 import random
 import string
-from faker import Faker
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
 
-class DataGenerator:
-    def __init__(self):
-        self.fake = Faker(locale='zh_CN')
+from src.utils.config_parser import ConfigParser
 
-    def random_string(self, length: int) -> str:
-        """生成指定长度的随机字符串（字母+数字）"""
-        return ''.join(random.choices(string.ascii_letters + string.digits, k=length))
+if TYPE_CHECKING:
+    from faker import Faker
 
-    def random_email(self) -> str:
-        """生成随机email"""
-        return self.fake.email()
+# 动态数据生成器注册表：类型名(如RANDOM_EMAIL) -> func(ctx, params, count)，一次生成一批值
+GENERATORS: Dict[str, Callable[["GeneratorContext", str, int], List[Any]]] = {}
 
-    def random_phone(self) -> str:
-        """生成随机手机号"""
-        return self.fake.phone_number()
 
-    def random_int(self, start: int, end: int) -> int:
-        """生成随机整数"""
-        return random.randint(start, end)
+def register_generator(name: str):
+    """注册${RANDOM_*}动态数据生成器的装饰器"""
+    def decorator(func: Callable) -> Callable:
+        GENERATORS[name] = func
+        return func
+    return decorator
 
-    def random_name(self) -> str:
-        """生成随机姓名"""
-        return self.fake.name()
\ No newline at end of file
+
+class GeneratorContext:
+    """生成器可用的资源：用例级随机数、共用的Faker，以及按worker分区的唯一编号"""
+
+    def __init__(self, engine: "DataEngine", rng: random.Random):
+        self.engine = engine
+        self.rng = rng
+
+    @property
+    def fake(self) -> "Faker":
+        """共用的Faker，切换到当前用例的随机数（在DataEngine.fill的锁内调用）"""
+        fake = self.engine.fake
+        fake.random = self.rng
+        return fake
+
+    def unique_token(self, capacity: int) -> int:
+        """返回[0, capacity)内当前worker分区中未用过的编号（编号 % worker数 == worker序号），跨worker不会重复"""
+        return self.engine.unique_token(self.rng, capacity)
+
+
+@register_generator("RANDOM_STRING")
+def _random_string(ctx: GeneratorContext, params: str, count: int) -> List[str]:
+    """生成指定长度的随机字符串（字母+数字）"""
+    try:
+        length = int(params or 8)
+    except ValueError:
+        raise ValueError(f"RANDOM_STRING参数格式错误，应为整数（如RANDOM_STRING:10），实际为: {params}")
+    alphabet = string.ascii_letters + string.digits
+    return ["".join(ctx.rng.choices(alphabet, k=length)) for _ in range(count)]
+
+
+@register_generator("RANDOM_INT")
+def _random_int(ctx: GeneratorContext, params: str, count: int) -> List[int]:
+    """生成随机整数"""
+    try:
+        start, end = map(int, (params or "1-100").split("-"))
+    except ValueError:
+        raise ValueError(f"RANDOM_INT参数格式错误，应为start-end（如RANDOM_INT:1-10），实际为: {params}")
+    return [ctx.rng.randint(start, end) for _ in range(count)]
+
+
+@register_generator("RANDOM_NAME")
+def _random_name(ctx: GeneratorContext, params: str, count: int) -> List[str]:
+    """生成随机姓名"""
+    return [ctx.fake.name() for _ in range(count)]
+
+
+@register_generator("RANDOM_EMAIL")
+def _random_email(ctx: GeneratorContext, params: str, count: int) -> List[str]:
+    """生成随机email，用户名带worker分区内的唯一编号"""
+    return [f"{ctx.fake.user_name()}{ctx.unique_token(10 ** 8):08d}@{ctx.fake.free_email_domain()}"
+            for _ in range(count)]
+
+
+@register_generator("RANDOM_PHONE")
+def _random_phone(ctx: GeneratorContext, params: str, count: int) -> List[str]:
+    """生成随机手机号，后8位为worker分区内的唯一编号；号段取当前语言的手机号段（仅部分语言提供），否则取msisdn的前3位"""
+    fake = ctx.fake
+    prefix = fake.phonenumber_prefix if hasattr(fake, "phonenumber_prefix") else lambda: fake.msisdn()[:3]
+    return [f"{prefix()}{ctx.unique_token(10 ** 8):08d}" for _ in range(count)]
+
+
+class CaseData:
+    """单个用例的动态数据：随机数由(运行种子, 用例ID)决定，与执行顺序和分片无关，可按种子复现"""
+
+    def __init__(self, engine: "DataEngine", case_id: Optional[str]):
+        self.engine = engine
+        self.case_id = case_id
+        self.ctx = GeneratorContext(engine, random.Random(f"{engine.seed}:{case_id}"))
+        self._pools: Dict[Tuple[str, str], List[Any]] = {}
+        # 每种数据上一批生成的数量
+        self._batch_sizes: Dict[Tuple[str, str], int] = {}
+        self.generated: List[Dict[str, Any]] = []
+
+    def generate(self, var_name: str) -> Any:
+        """根据动态类型生成动态数据（如RANDOM_STRING:10 -> 类型=RANDOM_STRING，参数=10）"""
+        data_type, _, params = var_name.partition(":")
+        if data_type not in GENERATORS:
+            raise ValueError(f"不支持的数据类型：{data_type}，支持: {list(GENERATORS)}")
+
+        key = (data_type, params)
+        pool = self._pools.get(key)
+        if not pool:
+            # 池只属于当前用例：首批只生成1个，用完后每批翻倍（不超过batch_size），避免预生成用不到的值和唯一编号
+            count = self._batch_sizes[key] = min(self.engine.batch_size, self._batch_sizes.get(key, 0) * 2 or 1)
+            pool = self._pools[key] = self.engine.fill(GENERATORS[data_type], self.ctx, params, count)
+            pool.reverse()
+        value = pool.pop()
+        self.generated.append({"variable": var_name, "value": value})
+        return value
+
+    def snapshot(self) -> Tuple[Any, Dict[Tuple[str, str], List[Any]], Dict[Tuple[str, str], int], int]:
+        """当前状态（随机数状态、未取出的预生成值、各数据的批大小、已生成数量），用于步骤断点"""
+        return (self.ctx.rng.getstate(), {key: list(pool) for key, pool in self._pools.items()},
+                dict(self._batch_sizes), len(self.generated))
+
+    def restore(self, state: Tuple[Any, Dict[Tuple[str, str], List[Any]], Dict[Tuple[str, str], int], int]) -> None:
+        """恢复到snapshot时的状态，断点之后的步骤重新执行时得到与首次执行相同的值"""
+        rng_state, pools, batch_sizes, generated = state
+        self.ctx.rng.setstate(rng_state)
+        self._pools = {key: list(pool) for key, pool in pools.items()}
+        self._batch_sizes = dict(batch_sizes)
+        del self.generated[generated:]
+
+    def describe(self) -> Dict[str, Any]:
+        """复现信息：种子、worker分区和已生成的值"""
+        return {"seed": self.engine.seed, "partition": f"{self.engine.worker_index}/{self.engine.worker_count}",
+                "values": list(self.generated)}
+
+
+class DataEngine:
+    """进程级测试数据引擎：Faker在首次使用时创建一次，按需分批生成数据；运行种子可复现，唯一值按worker分区避免跨进程冲突"""
+
+    _shared: Optional["DataEngine"] = None
+
+    def __init__(self, seed: Any = None, worker_index: int = 0, worker_count: int = 1,
+                 batch_size: int = 1, locale: str = "zh_CN"):
+        if not 0 <= worker_index < worker_count:
+            raise ValueError(f"worker分区无效: {worker_index}/{worker_count}")
+        self.seed = str(seed) if seed is not None else str(random.SystemRandom().randrange(10 ** 9))
+        self.worker_index = worker_index
+        self.worker_count = worker_count
+        self.batch_size = max(1, int(batch_size))
+        self.locale = locale
+        self._fake: Optional["Faker"] = None
+        self._issued: Set[int] = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: ConfigParser) -> "DataEngine":
+        """种子优先取环境变量UI_AUTOMATOR_DATA_SEED（并行时由父进程统一设置），其次取data.seed"""
+        worker_id = os.getenv("UI_AUTOMATOR_WORKER_ID")
+        return cls(
+            seed=os.getenv("UI_AUTOMATOR_DATA_SEED") or config.get("data.seed"),
+            worker_index=int(worker_id) if worker_id else 0,
+            worker_count=int(os.getenv("UI_AUTOMATOR_WORKER_COUNT") or 1),
+            batch_size=int(config.get("data.batch_size", 1)),
+            locale=config.get("data.locale", "zh_CN"),
+        )
+
+    @classmethod
+    def shared(cls, config: ConfigParser) -> "DataEngine":
+        """进程内共用的数据引擎"""
+        if cls._shared is None:
+            cls._shared = cls.from_config(config)
+        return cls._shared
+
+    @property
+    def fake(self) -> "Faker":
+        """加载Faker及其本地化数据耗时较长，只在用例用到基于Faker的生成器时才导入"""
+        if self._fake is None:
+            from faker import Faker
+            self._fake = Faker(locale=self.locale)
+        return self._fake
+
+    def for_case(self, case_id: Optional[str]) -> CaseData:
+        return CaseData(self, case_id)
+
+    def fill(self, generator: Callable, ctx: GeneratorContext, params: str, count: int = None) -> List[Any]:
+        """用用例的随机数生成一批值（默认batch_size个）；Faker为进程共用，生成期间加锁，由ctx.fake切换到该用例的随机数"""
+        with self._lock:
+            return list(generator(ctx, params, count or self.batch_size))
+
+    def unique_token(self, rng: random.Random, capacity: int) -> int:
+        slots = capacity // self.worker_count
+        for _ in range(100):
+            token = rng.randrange(slots) * self.worker_count + self.worker_index
+            if token not in self._issued:
+                self._issued.add(token)
+                return token
+        raise ValueError(f"worker {self.worker_index} 的唯一值空间已用尽")
@@ -0,0 +1,129 @@
+import csv
+import io
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 支持的数据集格式：扩展名 -> 格式
+DATASET_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+# 用例dataset字段中可用的配置项
+DATASET_KEYS = ("file", "name", "reset", "limit", "max_failures", "max_screenshots", "encoding")
+# 数据行结果附件的列
+RESULT_COLUMNS = ("index", "name", "status", "duration_ms", "failed_step", "error")
+
+
+def validate_dataset(dataset: Any) -> List[str]:
+    """校验用例的dataset结构（reset步骤由调用方按普通步骤校验）"""
+    if not isinstance(dataset, dict):
+        return ["dataset应为字典"]
+    errors = []
+    unknown = [key for key in dataset if key not in DATASET_KEYS]
+    if unknown:
+        errors.append(f"dataset包含不支持的字段: {unknown}，支持: {list(DATASET_KEYS)}")
+    file = dataset.get("file")
+    if not isinstance(file, str):
+        errors.append("dataset缺少file字段")
+    elif os.path.splitext(file)[1].lower() not in DATASET_FORMATS:
+        errors.append(f"不支持的数据集格式: {file}，支持: {list(DATASET_FORMATS)}")
+    if "name" in dataset and not isinstance(dataset["name"], str):
+        errors.append("dataset.name应为字符串模板，如\"{keyword}\"")
+    if not isinstance(dataset.get("reset", []), list):
+        errors.append("dataset.reset应为步骤列表")
+    for key in ("limit", "max_failures", "max_screenshots"):
+        value = dataset.get(key)
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < 0):
+            errors.append(f"dataset.{key}应为非负整数")
+    return errors
+
+
+class Dataset:
+    """外部数据集：CSV/JSONL逐行流式读取，不整体加载到内存"""
+
+    def __init__(self, file: str, name: str = None, limit: int = None, encoding: str = None):
+        self.file = file
+        self.format = DATASET_FORMATS[os.path.splitext(file)[1].lower()]
+        self.name_template = name
+        self.limit = limit
+        # utf-8-sig兼容Excel导出的带BOM的CSV
+        self.encoding = encoding or "utf-8-sig"
+
+    @classmethod
+    def from_case(cls, case: Dict[str, Any]) -> Optional["Dataset"]:
+        """根据用例的dataset字段创建，未声明时返回None"""
+        spec = case.get("dataset")
+        if not spec:
+            return None
+        return cls(spec["file"], spec.get("name"), spec.get("limit"), spec.get("encoding"))
+
+    def __iter__(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """逐行产出 (行号, 行数据)，行号从1开始"""
+        if not os.path.exists(self.file):
+            raise FileNotFoundError(f"数据集文件不存在: {self.file}")
+        with open(self.file, "r", encoding=self.encoding, newline="") as f:
+            rows = csv.DictReader(f) if self.format == "csv" else self._jsonl_rows(f)
+            for index, row in enumerate(rows, start=1):
+                if self.limit is not None and index > self.limit:
+                    return
+                yield index, row
+
+    def _jsonl_rows(self, f) -> Iterator[Dict[str, Any]]:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"数据集解析错误: {self.file} 第{line_no}行, 错误: {e}")
+            if not isinstance(row, dict):
+                raise ValueError(f"数据集格式错误: {self.file} 第{line_no}行应为JSON对象")
+            yield row
+
+    def row_name(self, index: int, row: Dict[str, Any]) -> str:
+        """数据行在报告中的名称，模板引用了不存在的列时退回行号"""
+        if self.name_template:
+            try:
+                return self.name_template.format_map(row)
+            except (KeyError, IndexError, ValueError):
+                pass
+        return f"第{index}行"
+
+
+class DatasetResult:
+    """数据驱动用例的逐行结果，只保留行号、名称、状态、耗时和错误摘要"""
+
+    def __init__(self, file: str):
+        self.file = file
+        self.rows: List[Tuple[int, str, str, float, str, str]] = []
+        self.failed = 0
+
+    def add(self, index: int, name: str, duration: float, failed_step: str = "",
+            error: Optional[BaseException] = None) -> None:
+        status = "passed" if error is None else ("failed" if isinstance(error, AssertionError) else "broken")
+        if error is not None:
+            self.failed += 1
+        message = str(error).splitlines()[0][:200] if error is not None and str(error) else ""
+        self.rows.append((index, name, status, round(duration * 1000, 1), failed_step, message))
+
+    @property
+    def total(self) -> int:
+        return len(self.rows)
+
+    def to_csv(self) -> str:
+        """全部数据行结果（CSV），作为单个报告附件"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(RESULT_COLUMNS)
+        writer.writerows(self.rows)
+        return buffer.getvalue()
+
+    def summary(self, max_listed: int = 10) -> str:
+        """失败摘要：失败行数和前若干失败行"""
+        failed_rows = [row for row in self.rows if row[2] != "passed"]
+        lines = [f"数据集 {self.file}: {self.total} 行中 {self.failed} 行失败"]
+        for index, name, status, _duration, failed_step, error in failed_rows[:max_listed]:
+            lines.append(f"  [{index}] {name}: {status.upper()} {failed_step} {error}".rstrip())
+        if len(failed_rows) > max_listed:
+            lines.append(f"  ……另有 {len(failed_rows) - max_listed} 行失败，详见附件\"数据行结果\"")
+        return "\n".join(lines)
+
@@ -0,0 +1,91 @@
+import os
+import socket
+import time
+from typing import Optional
+
+
+class FileLock:
+    """基于锁文件的跨进程互斥锁（O_EXCL创建，兼容Windows/Linux）"""
+
+    def __init__(self, path: str, timeout: float = 120, stale_after: float = 60, poll_interval: float = 0.1):
+        """
+        :param path: 锁文件路径
+        :param timeout: 获取锁的最长等待时间(秒)
+        :param stale_after: 无法判断持有进程是否存活（如其他机器的进程）时，锁文件超过该时长(秒)未释放视为持有者已异常退出，
+                            应小于timeout
+        :param poll_interval: 轮询间隔(秒)
+        """
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self._fd = None
+
+    def acquire(self) -> None:
+        """获取锁，超时抛出TimeoutError"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                self._fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(self._fd, f"{socket.gethostname()}:{os.getpid()}".encode())
+                return
+            except FileExistsError:
+                self._remove_if_stale()
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"等待文件锁超时: {self.path}")
+                time.sleep(self.poll_interval)
+
+    def _remove_if_stale(self) -> None:
+        """清理持有者已退出遗留的锁文件：本机持有进程已不存在时立即清理，无法判断时按锁文件时长"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                owner = f.read()
+            alive = _owner_alive(owner)
+            if alive is False or (alive is None and time.time() - os.path.getmtime(self.path) > self.stale_after):
+                os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def release(self) -> None:
+        """释放锁"""
+        if self._fd is None:
+            return
+        os.close(self._fd)
+        self._fd = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.release()
+
+
+def _owner_alive(owner: str) -> Optional[bool]:
+    """锁文件记录的持有进程（主机名:pid）是否存活，其他机器的进程或内容不完整时返回None"""
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return None
+    return _pid_alive(int(pid))
+
+
+def _pid_alive(pid: int) -> Optional[bool]:
+    if os.name == "nt":
+        # Windows上os.kill会结束进程，只能通过psutil判断
+        try:
+            import psutil
+        except ImportError:
+            return None
+        return psutil.pid_exists(pid)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -1,43 +1,33 @@
-import yaml
-import os
 from typing import Dict
 
+from src.utils.locator_registry import LocatorRegistry
+
 
 class LocatorParser:
-    def __init__(self, locators_file: str = "config/locators.yaml"):
-        """初始化定位器解析器"""
+    def __init__(self, locators_file: str = "config/locators.yaml", locators_dir: str = "config/locators"):
+        """初始化定位器解析器，同一进程内相同路径的解析器共用一份已加载的注册表"""
         self.locators_file = locators_file
-        self.locators = self._load_locators()
-
-    def _load_locators(self) -> Dict:
-        """加载定位器配置文件"""
-        if not os.path.exists(self.locators_file):
-            raise FileNotFoundError(f"定位器文件不存在: {self.locators_file}")
-
-        try:
-            with open(self.locators_file, "r", encoding="utf-8") as f:
-                locators = yaml.safe_load(f) or {}
-                if not isinstance(locators, dict):
-                    raise ValueError("定位器文件格式错误，应为字典类型")
-                return locators
-        except yaml.YAMLError as e:
-            raise ValueError(f"定位器文件解析错误: {str(e)}")
-
-    def get_locator(self, page_name: str, element_name: str) -> str:
-        """获取指定页面元素的定位器表达式"""
-        if page_name not in self.locators:
-            raise KeyError(f"未找到页面配置: {page_name}")
+        self.registry = LocatorRegistry.shared(locators_file, locators_dir)
 
-        page_locators = self.locators[page_name]
-        if element_name not in page_locators:
-            raise KeyError(f"页面 {page_name} 中未找到元素: {element_name}")
+    @property
+    def locators(self) -> Dict:
+        """全部页面配置"""
+        return self.registry.pages
 
-        locator = page_locators[element_name]
-        if not isinstance(locator, str) or not locator.strip():
-            raise ValueError(f"元素 {page_name}.{element_name} 定位器为空或无效")
+    @property
+    def version(self) -> int:
+        """定位器版本号，检查到文件变化并重新加载后递增"""
+        self.registry.refresh()
+        return self.registry.version
 
-        return locator.strip()
+    def get_locator(self, page_name: str, element_name: str) -> str:
+        """获取指定页面元素的定位器表达式"""
+        return self.registry.get(page_name, element_name)
 
     def get_page_url(self, page_name: str) -> str:
         """获取页面URL配置"""
         return self.get_locator(page_name, "url")
+
+    def get_page_option(self, page_name: str, key: str, default=None):
+        """获取页面的非定位器配置（如ready就绪策略），不存在时返回默认值"""
+        return self.registry.get_option(page_name, key, default)
@@ -0,0 +1,140 @@
+import glob
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+# 页面配置中的非定位器键（其余键均为元素定位器或url）
+PAGE_OPTION_KEYS = ("ready",)
+
+
+class LocatorRegistry:
+    """进程级定位器注册表：一次性加载并校验所有定位器文件，建立(页面, 元素)->表达式索引，文件mtime变化时重新加载
+
+    定位器可以写在单个locators.yaml中，也可以按页面拆分到locators目录下的多个YAML文件，
+    每个文件的顶层键为页面名，同一页面只能在一个文件中定义
+    """
+
+    _instances: Dict[Tuple[str, str], "LocatorRegistry"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, locators_file: str = "config/locators.yaml", locators_dir: str = "config/locators",
+                 check_interval: float = 1.0):
+        self.locators_file = locators_file
+        self.locators_dir = locators_dir
+        # 两次检查文件mtime的最小间隔(秒)，避免每次取定位器都访问文件系统
+        self.check_interval = check_interval
+        self.version = 0
+        self._lock = threading.Lock()
+        self._mtimes: Dict[str, float] = {}
+        self._file_pages: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._pages: Dict[str, Dict[str, Any]] = {}
+        self._index: Dict[Tuple[str, str], str] = {}
+        self._last_check = 0.0
+        self.refresh(force=True)
+
+    @classmethod
+    def shared(cls, locators_file: str = "config/locators.yaml",
+               locators_dir: str = "config/locators") -> "LocatorRegistry":
+        """按文件路径共享的注册表实例"""
+        key = (os.path.abspath(locators_file), os.path.abspath(locators_dir))
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(locators_file, locators_dir)
+            return cls._instances[key]
+
+    def _source_files(self) -> List[str]:
+        files = [self.locators_file] if os.path.exists(self.locators_file) else []
+        if os.path.isdir(self.locators_dir):
+            files += sorted(glob.glob(os.path.join(self.locators_dir, "*.yaml"))
+                            + glob.glob(os.path.join(self.locators_dir, "*.yml")))
+        return files
+
+    def refresh(self, force: bool = False) -> bool:
+        """检查定位器文件是否有新增、删除或修改，只重新解析变化的文件，返回是否重新加载"""
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return False
+        with self._lock:
+            self._last_check = now
+            files = self._source_files()
+            if not files:
+                raise FileNotFoundError(f"定位器文件不存在: {self.locators_file}（或目录 {self.locators_dir}）")
+
+            mtimes = {path: os.path.getmtime(path) for path in files}
+            if mtimes == self._mtimes:
+                return False
+
+            file_pages = {}
+            for path, mtime in mtimes.items():
+                if self._mtimes.get(path) == mtime:
+                    file_pages[path] = self._file_pages[path]
+                else:
+                    file_pages[path] = self._load_file(path)
+            self._build_index(file_pages)
+            self._file_pages = file_pages
+            self._mtimes = mtimes
+            self.version += 1
+            return True
+
+    @staticmethod
+    def _load_file(path: str) -> Dict[str, Dict[str, Any]]:
+        """加载并校验单个定位器文件"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                pages = yaml.safe_load(f) or {}
+        except yaml.YAMLError as e:
+            raise ValueError(f"定位器文件解析错误: {path}, {str(e)}")
+        if not isinstance(pages, dict):
+            raise ValueError(f"定位器文件格式错误，应为字典类型: {path}")
+
+        for page_name, page_locators in pages.items():
+            if not isinstance(page_locators, dict):
+                raise ValueError(f"页面 {page_name} 配置格式错误，应为字典类型: {path}")
+            for element_name, locator in page_locators.items():
+                if element_name in PAGE_OPTION_KEYS:
+                    continue
+                if not isinstance(locator, str) or not locator.strip():
+                    raise ValueError(f"元素 {page_name}.{element_name} 定位器为空或无效: {path}")
+        return pages
+
+    def _build_index(self, file_pages: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+        pages: Dict[str, Dict[str, Any]] = {}
+        owners: Dict[str, str] = {}
+        index: Dict[Tuple[str, str], str] = {}
+        for path, file_content in file_pages.items():
+            for page_name, page_locators in file_content.items():
+                if page_name in owners:
+                    raise ValueError(f"页面 {page_name} 重复定义: {owners[page_name]}, {path}")
+                owners[page_name] = path
+                pages[page_name] = page_locators
+                for element_name, locator in page_locators.items():
+                    if element_name not in PAGE_OPTION_KEYS:
+                        index[(page_name, element_name)] = locator.strip()
+        self._pages = pages
+        self._index = index
+
+    @property
+    def pages(self) -> Dict[str, Dict[str, Any]]:
+        return self._pages
+
+    def get(self, page_name: str, element_name: str) -> str:
+        """获取已校验的定位器表达式"""
+        self.refresh()
+        locator = self._index.get((page_name, element_name))
+        if locator is None:
+            if page_name not in self._pages:
+                raise KeyError(f"未找到页面配置: {page_name}")
+            raise KeyError(f"页面 {page_name} 中未找到元素: {element_name}")
+        return locator
+
+    def has(self, page_name: str, element_name: str) -> bool:
+        """页面中是否定义了该元素"""
+        self.refresh()
+        return (page_name, element_name) in self._index
+
+    def get_option(self, page_name: str, key: str, default=None) -> Optional[Any]:
+        self.refresh()
+        return self._pages.get(page_name, {}).get(key, default)
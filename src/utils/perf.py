@@ -0,0 +1,178 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from src.utils.config_parser import ConfigParser
+
+# 当前用例、当前步骤、当前用例的Playwright调用计数（每个线程/greenlet独立）
+_current_case: contextvars.ContextVar = contextvars.ContextVar("perf_case", default=None)
+_current_step: contextvars.ContextVar = contextvars.ContextVar("perf_step", default=None)
+_call_counter: contextvars.ContextVar = contextvars.ContextVar("perf_calls", default=None)
+
+
+class PerfRecorder:
+    """热点路径耗时记录：记录每次调用的耗时和期间的Playwright调用次数，按运行输出JSONL"""
+
+    def __init__(self):
+        self.enabled = False
+        self.output_path: Optional[str] = None
+        self._records: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def configure(self, config: ConfigParser) -> None:
+        """根据配置启用记录，输出文件按运行ID(和worker ID)区分"""
+        self.enabled = bool(config.get("perf.enabled", False))
+        run_id = os.getenv("UI_AUTOMATOR_RUN_ID") or datetime.now().strftime("%Y%m%d_%H%M%S")
+        worker_id = os.getenv("UI_AUTOMATOR_WORKER_ID")
+        filename = f"{run_id}-worker-{worker_id}.jsonl" if worker_id else f"{run_id}.jsonl"
+        self.output_path = os.path.join(config.get("perf.dir", "reports/perf"), filename)
+
+    @contextmanager
+    def case(self, case_id: str):
+        """标记当前执行的用例，期间的记录归属该用例"""
+        case_token = _current_case.set(case_id)
+        calls_token = _call_counter.set([0])
+        try:
+            yield
+        finally:
+            _current_case.reset(case_token)
+            _call_counter.reset(calls_token)
+
+    def count_call(self) -> None:
+        """Playwright调用计数+1"""
+        counter = _call_counter.get()
+        if counter is not None:
+            counter[0] += 1
+
+    @contextmanager
+    def span(self, name: str, kind: str, page: str = None, locator: str = None, description: str = None):
+        """记录一段代码的耗时和期间的Playwright调用次数"""
+        if not self.enabled:
+            yield
+            return
+        counter = _call_counter.get()
+        calls_before = counter[0] if counter else 0
+        step_token = _current_step.set(description) if kind == "step" else None
+        started = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            duration = time.perf_counter() - started
+            if step_token is not None:
+                _current_step.reset(step_token)
+            calls = (counter[0] if counter else 0) - calls_before
+            self.record(name, duration, kind, page=page, locator=locator, calls=calls, ok=ok,
+                        step=description if kind == "step" else None)
+
+    def record(self, name: str, duration: float, kind: str, page: str = None, locator: str = None,
+               calls: int = 0, ok: bool = True, step: str = None) -> None:
+        """添加一条耗时记录"""
+        if not self.enabled:
+            return
+        case_id = _current_case.get()
+        entry = {
+            "case": case_id,
+            "step": step or _current_step.get(),
+            "kind": kind,
+            "name": name,
+            "page": page,
+            "locator": locator,
+            "duration_ms": round(duration * 1000, 3),
+            "calls": calls,
+            "ok": ok,
+            "ts": time.time(),
+        }
+        with self._lock:
+            self._records[case_id].append(entry)
+
+    def case_records(self, case_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._records.get(case_id, []))
+
+    def all_records(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [entry for entries in self._records.values() for entry in entries]
+
+    def flush(self) -> Optional[str]:
+        """把本次运行的全部记录写入JSONL，返回文件路径"""
+        records = self.all_records()
+        if not self.enabled or not records:
+            return None
+        os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
+        with open(self.output_path, "w", encoding="utf-8") as f:
+            for entry in records:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return self.output_path
+
+
+# 进程级记录器
+recorder = PerfRecorder()
+
+
+def timed(name: str, locator_arg: int = None):
+    """页面对象方法耗时装饰器，locator_arg为元素名参数的位置（不含self）"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            if not recorder.enabled:
+                return func(self, *args, **kwargs)
+            locator = kwargs.get("element_name")
+            if locator is None and locator_arg is not None and len(args) > locator_arg:
+                locator = args[locator_arg]
+            with recorder.span(name, kind="page", page=getattr(self, "page_name", None), locator=locator):
+                return func(self, *args, **kwargs)
+        # 供用例预检查静态检查页面对象方法中的元素名
+        wrapper.locator_arg = locator_arg
+        return wrapper
+    return decorator
+
+
+def _wrap_counting(value: Any) -> Any:
+    if type(value).__module__.startswith("playwright.sync_api"):
+        return CountingProxy(value)
+    return value
+
+
+def _unwrap_counting(value: Any) -> Any:
+    """传给Playwright的参数去掉代理，含列表/字典中的代理（如screenshot的mask、locator.or_）"""
+    if isinstance(value, CountingProxy):
+        return value._target
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap_counting(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _unwrap_counting(item) for key, item in value.items()}
+    return value
+
+
+class CountingProxy:
+    """统计Playwright同步API调用次数的代理，返回的Locator等对象同样被包装，参数中的代理调用前还原"""
+
+    __slots__ = ("_target",)
+
+    def __init__(self, target: Any):
+        object.__setattr__(self, "_target", target)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return _wrap_counting(attr)
+
+        def counted(*args, **kwargs):
+            recorder.count_call()
+            return _wrap_counting(attr(*_unwrap_counting(args), **_unwrap_counting(kwargs)))
+        return counted
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._target, name, value)
+
+    def __repr__(self) -> str:
+        return f"CountingProxy({self._target!r})"
@@ -0,0 +1,104 @@
+import argparse
+import glob
+import json
+import math
+import os
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List
+
+
+def load_records(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """读取JSONL耗时记录，参数可以是文件或目录"""
+    records = []
+    for path in paths:
+        files = sorted(glob.glob(os.path.join(path, "*.jsonl"))) if os.path.isdir(path) else [path]
+        for file in files:
+            run = os.path.splitext(os.path.basename(file))[0]
+            with open(file, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        records.append(dict(json.loads(line), run=run))
+    return records
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """最近秩法百分位"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def aggregate(records: List[Dict[str, Any]], key: str) -> List[Dict[str, Any]]:
+    """按key分组统计次数、p50/p95/max耗时和平均Playwright调用次数，按p95降序"""
+    groups = defaultdict(list)
+    for record in records:
+        value = record.get(key)
+        if value is not None:
+            groups[value].append(record)
+
+    rows = []
+    for value, items in groups.items():
+        durations = sorted(item["duration_ms"] for item in items)
+        rows.append({
+            key: value,
+            "count": len(items),
+            "p50_ms": percentile(durations, 50),
+            "p95_ms": percentile(durations, 95),
+            "max_ms": durations[-1],
+            "avg_calls": sum(item.get("calls", 0) for item in items) / len(items),
+        })
+    return sorted(rows, key=lambda row: row["p95_ms"], reverse=True)
+
+
+def slowest_steps(records: List[Dict[str, Any]], top: int = 10) -> List[Dict[str, Any]]:
+    """全部运行中耗时最长的步骤"""
+    steps = [record for record in records if record.get("kind") == "step"]
+    return sorted(steps, key=lambda record: record["duration_ms"], reverse=True)[:top]
+
+
+def build_report(records: List[Dict[str, Any]], top: int = 10) -> Dict[str, Any]:
+    """汇总报告：按动作、页面对象、定位器统计，以及最慢步骤"""
+    page_calls = [record for record in records if record.get("kind") in ("page", "ready")]
+    return {
+        "runs": sorted({record.get("run") for record in records if record.get("run")}),
+        "by_action": aggregate(records, "name"),
+        "by_page": aggregate(page_calls, "page"),
+        "by_locator": aggregate(page_calls, "locator"),
+        "slowest_steps": slowest_steps(records, top),
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"耗时报告（{len(report['runs'])} 次运行）"]
+    for title, key, rows in (("动作", "name", report["by_action"]),
+                             ("页面对象", "page", report["by_page"]),
+                             ("定位器", "locator", report["by_locator"])):
+        lines.append(f"\n按{title}统计:")
+        lines.append(f"  {'名称':<36}{'次数':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'max(ms)':>10}{'调用数':>8}")
+        for row in rows:
+            lines.append(f"  {str(row[key]):<36}{row['count']:>6}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+                         f"{row['max_ms']:>10.1f}{row['avg_calls']:>8.1f}")
+    lines.append("\n最慢的步骤:")
+    for record in report["slowest_steps"]:
+        lines.append(f"  {record['duration_ms']:>9.1f}ms  {record.get('case')}  {record.get('step')}  "
+                     f"[{record.get('run')}]")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="汇总步骤耗时记录，输出p50/p95/max和最慢步骤")
+    parser.add_argument("paths", nargs="*", default=["reports/perf"], help="JSONL文件或目录，默认：reports/perf")
+    parser.add_argument("--top", type=int, default=10, help="输出最慢步骤的数量")
+    parser.add_argument("--json", dest="json_path", help="同时把汇总结果写入JSON文件")
+    args = parser.parse_args()
+
+    report = build_report(load_records(args.paths), args.top)
+    print(format_report(report))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
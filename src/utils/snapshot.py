@@ -0,0 +1,68 @@
+from typing import Any, Callable, Dict, List
+
+# 元素状态快照中可断言的字段：visible可见性、text首个元素文本、contains文本包含、count匹配数量、
+# min_count最少数量、attributes首个元素属性（值为null表示属性不存在）
+EXPECTATION_KEYS = ("visible", "text", "contains", "count", "min_count", "attributes")
+
+
+def validate_expectations(step: Dict[str, Any]) -> List[str]:
+    """校验assert_snapshot步骤的expected结构：元素名 -> {字段: 预期值}"""
+    expected = step.get("expected")
+    if not isinstance(expected, dict) or not expected:
+        return ["assert_snapshot动作的expected应为非空字典（元素名 -> 预期状态）"]
+    errors = []
+    for element_name, expectation in expected.items():
+        if not isinstance(expectation, dict) or not expectation:
+            errors.append(f"元素 {element_name} 的预期状态应为非空字典")
+            continue
+        unknown = [key for key in expectation if key not in EXPECTATION_KEYS]
+        if unknown:
+            errors.append(f"元素 {element_name} 包含不支持的字段: {unknown}，支持: {list(EXPECTATION_KEYS)}")
+        if "attributes" in expectation and not isinstance(expectation["attributes"], dict):
+            errors.append(f"元素 {element_name} 的attributes应为字典")
+    return errors
+
+
+def required_attributes(expected: Dict[str, Dict[str, Any]]) -> List[str]:
+    """预期中涉及的全部属性名"""
+    names = []
+    for expectation in expected.values():
+        for name in expectation.get("attributes", {}):
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def resolve_expectations(expected: Dict[str, Dict[str, Any]], resolver: Callable[[Any], Any]) -> Dict[str, Any]:
+    """解析预期值中的变量占位符"""
+    resolved = {}
+    for element_name, expectation in expected.items():
+        resolved[element_name] = {
+            key: ({name: resolver(value) for name, value in value.items()} if key == "attributes" else resolver(value))
+            for key, value in expectation.items()
+        }
+    return resolved
+
+
+def diff_snapshot(snapshot: Dict[str, Dict[str, Any]], expected: Dict[str, Dict[str, Any]]) -> List[str]:
+    """对比快照与预期，返回全部不一致项"""
+    mismatches = []
+    for element_name, expectation in expected.items():
+        state = snapshot[element_name]
+        for key, value in expectation.items():
+            if key == "visible" and state["visible"] != bool(value):
+                mismatches.append(f"{element_name}.visible: 实际[{state['visible']}] != 预期[{bool(value)}]")
+            elif key == "text" and state["text"] != str(value):
+                mismatches.append(f"{element_name}.text: 实际[{state['text']}] != 预期[{value}]")
+            elif key == "contains" and str(value) not in (state["text"] or ""):
+                mismatches.append(f"{element_name}.text: 实际[{state['text']}] 不包含 [{value}]")
+            elif key == "count" and state["count"] != int(value):
+                mismatches.append(f"{element_name}.count: 实际[{state['count']}] != 预期[{value}]")
+            elif key == "min_count" and state["count"] < int(value):
+                mismatches.append(f"{element_name}.count: 实际[{state['count']}] 小于 预期最少[{value}]")
+            elif key == "attributes":
+                for name, attr_value in value.items():
+                    actual = state["attributes"].get(name)
+                    if actual != (None if attr_value is None else str(attr_value)):
+                        mismatches.append(f"{element_name}[{name}]: 实际[{actual}] != 预期[{attr_value}]")
+    return mismatches
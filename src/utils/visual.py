@@ -0,0 +1,336 @@
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.utils.config_parser import ConfigParser
+from src.utils.file_lock import FileLock
+
+# 矩形遮罩区域的字段（截图坐标，像素）
+MASK_KEYS = ("x", "y", "width", "height")
+MISSING_MODES = ("create", "fail")
+# 基线索引是本地缓存（含文件修改时间），不与基线一起提交
+INDEX_DIR = os.path.join(".ui_cache", "visual")
+# 差异图只输出差异区域外扩该像素数的部分
+DIFF_MARGIN = 100
+# 感知哈希：缩放到32x32灰度图做DCT，取左上8x8低频分量
+_HASH_SIZE = 32
+_HASH_LOW = 8
+_dct_matrix = None
+
+
+def _imaging():
+    """延迟导入numpy和Pillow，只有使用视觉对比时才需要安装"""
+    try:
+        import numpy
+        from PIL import Image
+    except ImportError:
+        raise ImportError("视觉对比需要安装numpy和Pillow: pip install numpy Pillow")
+    return numpy, Image
+
+
+def validate_visual_step(step: Dict[str, Any]) -> List[str]:
+    """校验assert_visual步骤：name基线名称，mask为元素名或{x, y, width, height}矩形"""
+    errors = []
+    if not isinstance(step.get("name"), str) or not step["name"]:
+        errors.append("assert_visual动作的name应为非空字符串")
+    elif any(char in step["name"] for char in "/\\"):
+        errors.append(f"assert_visual动作的name不能包含路径分隔符: {step['name']}")
+    if "element" in step and not isinstance(step["element"], str):
+        errors.append("assert_visual动作的element应为元素名")
+    masks = step.get("mask", [])
+    if not isinstance(masks, list):
+        errors.append("assert_visual动作的mask应为列表")
+        masks = []
+    for mask in masks:
+        if isinstance(mask, dict):
+            if sorted(mask) != sorted(MASK_KEYS) or not all(isinstance(mask[key], int) for key in MASK_KEYS):
+                errors.append(f"mask矩形应为整数字段{list(MASK_KEYS)}: {mask}")
+        elif not isinstance(mask, str):
+            errors.append(f"mask应为元素名或矩形: {mask}")
+    for key in ("tolerance", "threshold"):
+        if key in step and (not isinstance(step[key], (int, float)) or step[key] < 0):
+            errors.append(f"assert_visual动作的{key}应为非负数")
+    return errors
+
+
+def decode_image(data: bytes):
+    """图片字节解码为 高x宽x3 的uint8数组"""
+    numpy, Image = _imaging()
+    with Image.open(io.BytesIO(data)) as image:
+        return numpy.asarray(image.convert("RGB"))
+
+
+def encode_png(pixels) -> bytes:
+    _numpy, Image = _imaging()
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def perceptual_hash(pixels) -> str:
+    """64位DCT感知哈希（十六进制），内容近似的截图哈希距离小"""
+    global _dct_matrix
+    numpy, Image = _imaging()
+    if _dct_matrix is None:
+        n = numpy.arange(_HASH_SIZE)
+        matrix = numpy.cos(numpy.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * _HASH_SIZE))
+        matrix[0] /= numpy.sqrt(2)
+        _dct_matrix = matrix * numpy.sqrt(2 / _HASH_SIZE)
+    gray = Image.fromarray(pixels).convert("L").resize((_HASH_SIZE, _HASH_SIZE), Image.BILINEAR)
+    dct = _dct_matrix @ numpy.asarray(gray, dtype=numpy.float64) @ _dct_matrix.T
+    low = dct[:_HASH_LOW, :_HASH_LOW].flatten()
+    bits = low > numpy.median(low[1:])
+    return f"{int(''.join('1' if bit else '0' for bit in bits), 2):016x}"
+
+
+def hash_distance(first: str, second: str) -> int:
+    """两个感知哈希的汉明距离"""
+    return bin(int(first, 16) ^ int(second, 16)).count("1")
+
+
+def diff_pixels(actual, baseline, masks: Sequence[Dict[str, int]] = (), pixel_threshold: int = 16):
+    """
+    逐像素对比（数组运算），返回(差异像素布尔图, 参与对比的像素数)
+    :param masks: 不参与对比的矩形区域
+    :param pixel_threshold: 各通道差值都不超过该值的像素视为相同，用于忽略抗锯齿
+    """
+    numpy, _Image = _imaging()
+    height = actual.shape[0]
+    changed = numpy.zeros(actual.shape[:2], dtype=bool)
+    # 先按行找出有任何字节不同的范围，整页截图通常只有局部变化，只在该范围内计算差值
+    different_rows = numpy.flatnonzero((actual.reshape(height, -1) != baseline.reshape(height, -1)).any(axis=1))
+    if different_rows.size:
+        top, bottom = different_rows[0], different_rows[-1] + 1
+        # uint8上用max-min求差值绝对值，避免转换为更宽的整数类型；按通道比较比沿通道轴归约快
+        delta = numpy.maximum(actual[top:bottom], baseline[top:bottom])
+        delta -= numpy.minimum(actual[top:bottom], baseline[top:bottom])
+        changed[top:bottom] = ((delta[..., 0] > pixel_threshold) | (delta[..., 1] > pixel_threshold)
+                               | (delta[..., 2] > pixel_threshold))
+    compared = changed.size
+    if masks:
+        valid = numpy.ones(changed.shape, dtype=bool)
+        for mask in masks:
+            valid[max(mask["y"], 0):mask["y"] + mask["height"], max(mask["x"], 0):mask["x"] + mask["width"]] = False
+        changed &= valid
+        compared = int(valid.sum())
+    return changed, compared
+
+
+def changed_box(changed, margin: int = 0) -> Optional[Dict[str, int]]:
+    """差异像素的外接矩形（向外扩展margin像素），无差异时返回None"""
+    numpy, _Image = _imaging()
+    rows = numpy.flatnonzero(changed.any(axis=1))
+    if not rows.size:
+        return None
+    columns = numpy.flatnonzero(changed[rows[0]:rows[-1] + 1].any(axis=0))
+    height, width = changed.shape
+    top, left = max(int(rows[0]) - margin, 0), max(int(columns[0]) - margin, 0)
+    bottom, right = min(int(rows[-1]) + 1 + margin, height), min(int(columns[-1]) + 1 + margin, width)
+    return {"x": left, "y": top, "width": right - left, "height": bottom - top}
+
+
+def render_diff(actual, changed, masks: Sequence[Dict[str, int]] = (), box: Dict[str, int] = None) -> bytes:
+    """差异图：实际截图淡化为背景，差异像素标红，遮罩区域标灰；指定box时只输出该区域，减小报告体积"""
+    image = actual // 4 + 191
+    for mask in masks:
+        image[max(mask["y"], 0):mask["y"] + mask["height"], max(mask["x"], 0):mask["x"] + mask["width"]] = 128
+    image[changed] = (255, 0, 0)
+    if box:
+        image = image[box["y"]:box["y"] + box["height"], box["x"]:box["x"] + box["width"]]
+    return encode_png(image)
+
+
+class VisualResult:
+    """一次视觉对比的结果"""
+
+    def __init__(self, name: str, passed: bool, message: str, change_percent: float = 0.0,
+                 changed_pixels: int = 0, compared_pixels: int = 0, skipped_by: str = None,
+                 baseline_created: bool = False, diff_png: bytes = None, diff_box: Dict[str, int] = None):
+        self.name = name
+        self.passed = passed
+        self.message = message
+        self.change_percent = change_percent
+        self.changed_pixels = changed_pixels
+        self.compared_pixels = compared_pixels
+        self.skipped_by = skipped_by
+        self.baseline_created = baseline_created
+        self.diff_png = diff_png
+        self.diff_box = diff_box
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "passed": self.passed,
+            "message": self.message,
+            "change_percent": round(self.change_percent, 4),
+            "changed_pixels": self.changed_pixels,
+            "compared_pixels": self.compared_pixels,
+            "skipped_by": self.skipped_by,
+            "baseline_created": self.baseline_created,
+            "diff_box": self.diff_box,
+        }
+
+
+class BaselineIndex:
+    """基线索引：基线文件的字节哈希和感知哈希，文件未变化时不用重新解码基线"""
+
+    def __init__(self, baseline_dir: str, index_dir: str = INDEX_DIR):
+        self.baseline_dir = baseline_dir
+        self.path = os.path.join(index_dir, re.sub(r"[^\w.-]", "_", os.path.normpath(baseline_dir)) + ".json")
+        self._entries: Dict[str, Dict[str, Any]] = self._read()
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, relative_path: str) -> Dict[str, Any]:
+        """基线的索引项，基线文件被替换（如git拉取）后自动重建"""
+        full_path = os.path.join(self.baseline_dir, relative_path)
+        stat = os.stat(full_path)
+        with self._lock:
+            entry = self._entries.get(relative_path)
+        if entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+            return entry
+        with open(full_path, "rb") as f:
+            data = f.read()
+        return self.put(relative_path, data, decode_image(data))
+
+    def put(self, relative_path: str, data: bytes, pixels) -> Dict[str, Any]:
+        stat = os.stat(os.path.join(self.baseline_dir, relative_path))
+        entry = {
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "phash": perceptual_hash(pixels),
+            "width": int(pixels.shape[1]),
+            "height": int(pixels.shape[0]),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+        }
+        with self._lock:
+            self._entries[relative_path] = entry
+        self._save(relative_path, entry)
+        return entry
+
+    def _save(self, relative_path: str, entry: Dict[str, Any]) -> None:
+        """合并其他进程写入的索引后原子写回"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        lock = FileLock(f"{self.path}.lock", timeout=30, stale_after=20)
+        lock.acquire()
+        try:
+            entries = self._read()
+            entries[relative_path] = entry
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        finally:
+            lock.release()
+
+
+class VisualEngine:
+    """视觉回归对比：截图字节与基线一致时直接通过，感知哈希可选跳过，其余情况逐像素对比"""
+
+    # 浏览器类型 -> 进程内共用的对比引擎
+    _shared: Dict[str, "VisualEngine"] = {}
+
+    def __init__(self, baseline_dir: str, tolerance: float = 0.1, pixel_threshold: int = 16,
+                 phash_skip_distance: int = None, missing: str = "create", update: bool = False,
+                 index_dir: str = INDEX_DIR):
+        """
+        :param tolerance: 允许的差异像素占比(%)
+        :param pixel_threshold: 单个像素各通道差值不超过该值视为相同
+        :param phash_skip_distance: 感知哈希距离不超过该值时跳过逐像素对比，None表示不按感知哈希跳过
+        :param missing: 基线不存在时 create创建基线并通过 / fail失败
+        :param update: 用本次截图覆盖基线
+        """
+        if missing not in MISSING_MODES:
+            raise ValueError(f"不支持的基线缺失处理方式: {missing}, 支持: {list(MISSING_MODES)}")
+        self.baseline_dir = baseline_dir
+        self.tolerance = tolerance
+        self.pixel_threshold = pixel_threshold
+        self.phash_skip_distance = phash_skip_distance
+        self.missing = missing
+        self.update = update
+        self.index = BaselineIndex(baseline_dir, index_dir)
+
+    @classmethod
+    def from_config(cls, config: ConfigParser) -> "VisualEngine":
+        """基线按浏览器类型分目录保存，不同浏览器的渲染结果不互相比较"""
+        phash_skip_distance = config.get("visual.phash_skip_distance")
+        return cls(
+            baseline_dir=os.path.join(config.get("visual.baseline_dir", "visual_baselines"), config.get("browser")),
+            tolerance=float(config.get("visual.tolerance", 0.1)),
+            pixel_threshold=int(config.get("visual.pixel_threshold", 16)),
+            phash_skip_distance=None if phash_skip_distance is None else int(phash_skip_distance),
+            missing=config.get("visual.missing", "create"),
+            update=bool(config.get("visual.update", False)) or os.getenv("UI_AUTOMATOR_UPDATE_BASELINES") == "1",
+        )
+
+    @classmethod
+    def shared(cls, config: ConfigParser) -> "VisualEngine":
+        """进程内按浏览器共用的对比引擎（每个浏览器的基线索引只加载一次）"""
+        browser = config.get("browser")
+        if browser not in cls._shared:
+            cls._shared[browser] = cls.from_config(config)
+        return cls._shared[browser]
+
+    def baseline_path(self, page_name: str, name: str) -> str:
+        return f"{page_name}/{name}.png"
+
+    def check(self, page_name: str, name: str, data: bytes, masks: Sequence[Dict[str, int]] = (),
+              tolerance: float = None, pixel_threshold: int = None) -> VisualResult:
+        """对比截图与基线"""
+        relative_path = self.baseline_path(page_name, name)
+        full_path = os.path.join(self.baseline_dir, relative_path)
+        tolerance = self.tolerance if tolerance is None else tolerance
+        pixel_threshold = self.pixel_threshold if pixel_threshold is None else pixel_threshold
+
+        if self.update or not os.path.exists(full_path):
+            if not self.update and self.missing == "fail":
+                return VisualResult(name, False, f"基线不存在: {full_path}，设置UI_AUTOMATOR_UPDATE_BASELINES=1生成基线")
+            self._write_baseline(relative_path, data)
+            return VisualResult(name, True, f"已{'更新' if self.update else '创建'}基线: {full_path}",
+                                baseline_created=True)
+
+        entry = self.index.get(relative_path)
+        if hashlib.sha256(data).hexdigest() == entry["sha256"]:
+            return VisualResult(name, True, "截图与基线完全一致", skipped_by="bytes")
+
+        actual = decode_image(data)
+        if self.phash_skip_distance is not None:
+            distance = hash_distance(perceptual_hash(actual), entry["phash"])
+            if distance <= self.phash_skip_distance:
+                return VisualResult(name, True, f"感知哈希距离 {distance}，跳过逐像素对比", skipped_by="phash")
+
+        with open(full_path, "rb") as f:
+            baseline = decode_image(f.read())
+        if actual.shape != baseline.shape:
+            return VisualResult(name, False, f"截图尺寸 {actual.shape[1]}x{actual.shape[0]} 与基线 "
+                                             f"{baseline.shape[1]}x{baseline.shape[0]} 不一致",
+                                change_percent=100.0, diff_png=encode_png(actual))
+
+        changed, compared = diff_pixels(actual, baseline, masks, pixel_threshold)
+        changed_pixels = int(changed.sum())
+        change_percent = changed_pixels / compared * 100 if compared else 0.0
+        passed = change_percent <= tolerance
+        message = f"差异像素占比 {change_percent:.4f}%（允许 {tolerance}%）"
+        box = changed_box(changed, margin=DIFF_MARGIN) if changed_pixels else None
+        return VisualResult(name, passed, message if passed else f"视觉对比失败: {message}", change_percent,
+                            changed_pixels, compared, diff_png=render_diff(actual, changed, masks, box) if box else None,
+                            diff_box=box)
+
+    def _write_baseline(self, relative_path: str, data: bytes) -> None:
+        full_path = os.path.join(self.baseline_dir, relative_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        tmp_path = f"{full_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, full_path)
+        self.index.put(relative_path, data, decode_image(data))
@@ -0,0 +1,90 @@
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from src.execution_plan import CompiledStep, bind_case, bind_reset, parse_case_file
+from src.page_objects import PAGE_OBJECT_MAP
+from src.test_case_runner import TestCaseRunner  # 导入时注册全部动作
+from src.utils.config_parser import ConfigParser
+
+
+def _run_case(test_case_runner: TestCaseRunner) -> None:
+    """YAML用例的占位函数，用于声明用例依赖的fixture"""
+
+
+class YamlItem(pytest.Function):
+    """单个YAML用例，步骤在收集阶段编译完成；浏览器矩阵模式下每个浏览器一个item，共用编译结果"""
+
+    def __init__(self, *, case: Dict[str, Any], config_parser: ConfigParser, browser: Optional[str] = None,
+                 compiled: Optional["YamlItem"] = None, **kwargs):
+        super().__init__(callobj=_run_case, **kwargs)
+        self.params = case
+        self.browser = browser
+        # 用例使用的配置：矩阵item叠加自身的浏览器，依赖浏览器的配置读取（如视觉基线目录）与实际启动的浏览器一致
+        self.case_config = config_parser.with_overrides({"browser": browser}) if browser else config_parser
+        # 不含浏览器后缀的用例ID，矩阵中同一用例的各浏览器item相同
+        self.case_id = f"{self.parent.nodeid}::{self.originalname}"
+        if browser:
+            self.user_properties.append(("browser", browser))
+        if compiled is not None:
+            self.steps, self.reset_steps, self.bind_error = compiled.steps, compiled.reset_steps, compiled.bind_error
+            return
+        self.steps: List[CompiledStep] = []
+        self.reset_steps: List[CompiledStep] = []
+        self.bind_error: Optional[Exception] = None
+        page_class = PAGE_OBJECT_MAP.get(case.get("page_object"))
+        try:
+            if page_class is None:
+                raise ValueError(f"无效的页面对象：{case.get('page_object')}")
+            self.steps = bind_case(case, page_class, config_parser)
+            self.reset_steps = bind_reset(case, page_class, config_parser)
+        except (ValueError, AttributeError) as e:
+            self.bind_error = e
+
+    def setup(self) -> None:
+        # 编译失败时在启动浏览器之前报错
+        if self.bind_error:
+            pytest.fail(f"用例编译失败: {self.bind_error}", pytrace=False)
+        super().setup()
+
+    def runtest(self) -> None:
+        # allure只在执行用例时用到，收集阶段不加载
+        import allure
+        if self.params.get("description"):
+            allure.dynamic.description(self.params["description"])
+        if self.browser:
+            allure.dynamic.tag(self.browser)
+            allure.dynamic.parameter("browser", self.browser)
+        runner: TestCaseRunner = self.funcargs["test_case_runner"]
+        runner.run_case(self.params, self.steps, self.reset_steps)
+
+    def reportinfo(self):
+        return self.path, 0, f"yaml: {self.name}"
+
+
+class YamlFile(pytest.File):
+    """YAML用例文件，解析结果按内容哈希缓存"""
+
+    def __init__(self, *, config_parser: ConfigParser, browsers: Optional[List[str]] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.config_parser = config_parser
+        self.browsers = browsers or []
+
+    def collect(self):
+        cases = parse_case_file(str(self.path))
+        for case_name, case in cases.items():
+            if not self.browsers:
+                yield YamlItem.from_parent(self, name=case_name, case=case, config_parser=self.config_parser)
+                continue
+            # 浏览器矩阵：用例只编译一次，每个浏览器生成一个item，如 test_login[firefox]
+            compiled = None
+            for browser in self.browsers:
+                item = YamlItem.from_parent(self, name=f"{case_name}[{browser}]", originalname=case_name, case=case,
+                                            config_parser=self.config_parser, browser=browser, compiled=compiled)
+                compiled = compiled or item
+                yield item
+
+
+def is_case_file(file_path) -> bool:
+    """tests目录下的test_*.yaml / test_*.yml为用例文件"""
+    return file_path.suffix in (".yaml", ".yml") and file_path.name.startswith("test")
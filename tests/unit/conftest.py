@@ -0,0 +1,19 @@
+import pytest
+
+from src.utils.config_parser import CONFIG_SNAPSHOT_ENV, ConfigParser
+
+
+@pytest.fixture
+def fresh_config(monkeypatch):
+    """按当前环境变量重新编译配置的ConfigParser，用例结束后恢复会话中的单例"""
+    session_instance = ConfigParser._instance
+    monkeypatch.delenv(CONFIG_SNAPSHOT_ENV, raising=False)
+    monkeypatch.setenv("UI_AUTOMATION_LOGIN_USERNAME", "tester")
+    monkeypatch.setenv("UI_AUTOMATION_LOGIN_PASSWORD", "secret")
+
+    def build(**kwargs) -> ConfigParser:
+        ConfigParser._instance = None
+        return ConfigParser(**kwargs)
+
+    yield build
+    ConfigParser._instance = session_instance
@@ -0,0 +1,49 @@
+from collections.abc import Mapping
+
+import pytest
+
+from src.auth_cache import AuthStateCache
+from src.utils.config_snapshot import ConfigSnapshot
+
+
+def test_get_returns_read_only_views_without_copying(fresh_config):
+    config = fresh_config()
+    profile = config.get("auth.profiles.default")
+    assert isinstance(profile, Mapping)
+    assert config.get("auth.profiles.default") is profile
+    with pytest.raises(TypeError):
+        profile["username"] = "changed"
+    assert isinstance(config.get("network.block_resource_types"), tuple)
+
+
+def test_auth_profile_resolves_from_real_config(fresh_config):
+    credentials = AuthStateCache(fresh_config())._get_profile("default")
+    assert credentials == {"username": "tester", "password": "secret"}
+
+
+def test_overrides_rebuild_parents_and_drop_replaced_children(fresh_config):
+    view = fresh_config().with_overrides({"auth.profiles.default.username": "other"})
+    assert dict(view.get("auth.profiles.default")) == {"username": "other", "password": "${LOGIN.PASSWORD}"}
+    assert view.get("auth.profiles")["default"]["username"] == "other"
+
+    view = view.with_overrides({"auth.profiles": {"ci": {"username": "ci"}}})
+    assert view.get("auth.profiles.default") is None
+    assert view.get("auth.profiles.default.username") is None
+    assert view.get("auth.profiles.ci.username") == "ci"
+    assert view.to_dict()["auth"]["profiles"] == {"ci": {"username": "ci"}}
+
+
+def test_overrides_only_touch_affected_paths():
+    snapshot = ConfigSnapshot.from_dict({f"section{i}": {"key": i} for i in range(1000)})
+
+    class _CountingBase(dict):
+        reads = 0
+
+        def __iter__(self):
+            _CountingBase.reads += 1
+            return super().__iter__()
+
+    snapshot = ConfigSnapshot(_CountingBase(snapshot._base), children=snapshot._children)
+    view = snapshot.with_overrides({"section1.key": "new"})
+    assert _CountingBase.reads == 0
+    assert view.get("section1") == {"key": "new"} and view.get("section2.key") == 2
@@ -0,0 +1,47 @@
+from src.utils.data_generator import DataEngine
+
+
+def _counting_engine(monkeypatch, **kwargs):
+    engine = DataEngine(seed=1, **kwargs)
+    counts = []
+    original = engine.fill
+
+    def fill(generator, ctx, params, count=None):
+        counts.append(count)
+        return original(generator, ctx, params, count)
+
+    monkeypatch.setattr(engine, "fill", fill)
+    return engine, counts
+
+
+def test_generates_on_demand_by_default(monkeypatch):
+    engine, counts = _counting_engine(monkeypatch)
+    case_data = engine.for_case("case")
+    case_data.generate("RANDOM_STRING:8")
+    assert counts == [1]
+
+
+def test_batches_grow_up_to_batch_size(monkeypatch):
+    engine, counts = _counting_engine(monkeypatch, batch_size=4)
+    case_data = engine.for_case("case")
+    for _ in range(11):
+        case_data.generate("RANDOM_INT:1-1000")
+    assert counts == [1, 2, 4, 4]
+
+
+def test_values_are_reproducible_after_restore():
+    case_data = DataEngine(seed=1, batch_size=8).for_case("case")
+    case_data.generate("RANDOM_STRING:8")
+    state = case_data.snapshot()
+    first = [case_data.generate("RANDOM_STRING:8") for _ in range(5)]
+    case_data.restore(state)
+    assert [case_data.generate("RANDOM_STRING:8") for _ in range(5)] == first
+    assert len(case_data.generated) == 6
+
+
+def test_phone_and_email_work_for_non_chinese_locale():
+    case_data = DataEngine(seed=1, locale="en_US").for_case("case")
+    phone = case_data.generate("RANDOM_PHONE")
+    assert phone.isdigit() and len(phone) == 11
+    assert "@" in case_data.generate("RANDOM_EMAIL")
+    assert case_data.generate("RANDOM_NAME")
@@ -0,0 +1,73 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.distributed import TOKEN_HEADER, Coordinator
+from src.timing_db import TimingDB
+from src.utils.config_parser import CONFIG_SNAPSHOT_ENV
+
+
+@pytest.fixture
+def coordinator_factory(fresh_config, tmp_path):
+    coordinators = []
+
+    def build(**kwargs) -> Coordinator:
+        coordinator = Coordinator([], fresh_config(), allure_dir=str(tmp_path / "allure"),
+                                  timing_db=TimingDB(str(tmp_path / "timings.db")), **kwargs)
+        coordinators.append(coordinator)
+        return coordinator
+
+    yield build
+    for coordinator in coordinators:
+        coordinator.httpd.server_close()
+
+
+def test_refuses_public_bind_without_token(coordinator_factory):
+    with pytest.raises(ValueError, match="distributed.token"):
+        coordinator_factory(host="0.0.0.0")
+    coordinator_factory(host="0.0.0.0", token="s3cret")
+    coordinator_factory(host="127.0.0.1")
+
+
+def test_snapshot_leaves_out_env_secrets(coordinator_factory, fresh_config, monkeypatch, tmp_path):
+    monkeypatch.setenv("UI_AUTOMATION_DISTRIBUTED_TOKEN", "s3cret")
+    snapshot = coordinator_factory(token="s3cret").register("worker-host", 1)["config_snapshot"]
+    assert "tester" not in snapshot and "secret" not in snapshot
+    assert json.loads(snapshot)["config"]["auth"]["profiles"]["default"]["username"] == "${LOGIN.USERNAME}"
+
+    # worker从自身环境变量补全
+    snapshot_path = tmp_path / "config.json"
+    snapshot_path.write_text(snapshot, encoding="utf-8")
+    monkeypatch.setenv(CONFIG_SNAPSHOT_ENV, str(snapshot_path))
+    monkeypatch.setenv("UI_AUTOMATION_LOGIN_USERNAME", "worker-user")
+    monkeypatch.delenv("UI_AUTOMATION_DISTRIBUTED_TOKEN")
+    worker_config = fresh_config()
+    assert worker_config.get("login.username") == "worker-user"
+    assert worker_config.get("distributed.token") is None
+
+
+def test_requests_need_token(coordinator_factory):
+    coordinator = coordinator_factory(token="s3cret")
+    coordinator.httpd.timeout = 5
+    url = f"{coordinator.local_url}/register"
+    payload = json.dumps({"host": "worker-host", "pid": 1}).encode("utf-8")
+    for headers in ({}, {TOKEN_HEADER: "wrong"}):
+        request = urllib.request.Request(url, data=payload, headers=headers)
+        with pytest.raises(urllib.error.HTTPError) as error:
+            _serve_once(coordinator, request)
+        assert error.value.code == 403
+    request = urllib.request.Request(url, data=payload, headers={TOKEN_HEADER: "s3cret"})
+    assert "config_snapshot" in json.loads(_serve_once(coordinator, request))
+
+
+def _serve_once(coordinator: Coordinator, request: urllib.request.Request) -> bytes:
+    thread = threading.Thread(target=coordinator.httpd.handle_request)
+    thread.start()
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.read()
+    finally:
+        thread.join()
@@ -0,0 +1,43 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from src.utils.file_lock import FileLock
+
+
+def _dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_reclaims_lock_left_by_dead_process(tmp_path):
+    path = tmp_path / "state.json.lock"
+    path.write_text(f"{socket.gethostname()}:{_dead_pid()}", encoding="utf-8")
+    started = time.monotonic()
+    with FileLock(str(path), timeout=2):
+        assert path.read_text(encoding="utf-8") == f"{socket.gethostname()}:{os.getpid()}"
+    assert time.monotonic() - started < 1
+    assert not path.exists()
+
+
+def test_waits_for_live_holder(tmp_path):
+    path = tmp_path / "state.json.lock"
+    path.write_text(f"{socket.gethostname()}:{os.getpid()}", encoding="utf-8")
+    os.utime(path, (0, 0))
+    with pytest.raises(TimeoutError):
+        FileLock(str(path), timeout=0.3, stale_after=0).acquire()
+
+
+def test_unknown_holder_reclaimed_after_stale_after(tmp_path):
+    path = tmp_path / "state.json.lock"
+    path.write_text("other-host:1234", encoding="utf-8")
+    with pytest.raises(TimeoutError):
+        FileLock(str(path), timeout=0.3, stale_after=60).acquire()
+    os.utime(path, (time.time() - 120, time.time() - 120))
+    with FileLock(str(path), timeout=0.3, stale_after=60):
+        pass
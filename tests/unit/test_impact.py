@@ -0,0 +1,24 @@
+from src import impact
+from src.impact import ImpactIndex, diff_contents, select_cases
+
+DATASET = "tests/data/search_keywords.csv"
+
+
+def test_dataset_change_selects_referencing_cases():
+    index = ImpactIndex().build()
+    changes = diff_contents({DATASET: "keyword\nold\n"}, {DATASET: "keyword\nnew\n"}, "tests")
+    assert changes.files == {DATASET} and not changes.framework_files
+    selected = dict(select_cases(index, changes))
+    assert selected
+    assert all(DATASET in index.cases[case_id].files for case_id in selected)
+    assert all(reasons == [f"数据集变更: {DATASET}"] for reasons in selected.values())
+
+
+def test_since_last_run_tracks_datasets(tmp_path, monkeypatch):
+    state_path = str(tmp_path / "last_run.json")
+    assert DATASET in impact.tracked_files("tests")
+    impact.save_run_state("tests", state_path)
+    original = impact._state_content
+    monkeypatch.setattr(impact, "_state_content",
+                        lambda path: "sha256:changed" if path == DATASET else original(path))
+    assert impact.changes_since_last_run("tests", state_path).files == {DATASET}
@@ -0,0 +1,46 @@
+from src.async_engine import SyncProxy, _unwrap
+from src.page_objects.base_page import BasePage
+from src.utils.perf import CountingProxy
+
+
+class _Locator:
+    def __init__(self, selector):
+        self.selector = selector
+
+    def screenshot(self, **options):
+        return options
+
+
+class _Page:
+    def locator(self, selector):
+        return _Locator(selector)
+
+    def screenshot(self, **options):
+        return options
+
+
+# 与Playwright同步API对象一样被CountingProxy包装
+_Locator.__module__ = _Page.__module__ = "playwright.sync_api._generated"
+
+
+class _Locators:
+    version = 1
+
+    def get_locator(self, page_name, element_name):
+        return f"#{element_name}"
+
+
+def test_visual_mask_passes_unwrapped_locators(fresh_config):
+    page = BasePage(CountingProxy(_Page()), _Locators(), fresh_config(), "search_page")
+    options = page.capture_visual(mask_elements=["banner", "clock"])
+    assert [type(locator) for locator in options["mask"]] == [_Locator, _Locator]
+    assert [locator.selector for locator in options["mask"]] == ["#banner", "#clock"]
+
+    options = page.capture_visual("result_list", mask_elements=["banner"])
+    assert type(options["mask"][0]) is _Locator
+
+
+def test_sync_proxy_unwraps_nested_arguments():
+    target = object()
+    assert _unwrap({"mask": [SyncProxy(target)], "type": "png"}) == {"mask": [target], "type": "png"}
+    assert _unwrap((SyncProxy(target), 1)) == (target, 1)
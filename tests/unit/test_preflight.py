@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.preflight import Preflight
+from src.utils.config_parser import CONFIG_SNAPSHOT_ENV
+from src.utils.locator_parser import LocatorParser
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+AUTH_CASE = {
+    "page_object": "login_page",
+    "auth": "default",
+    "steps": [{"action": "load", "description": "加载登录页面"}],
+}
+
+
+def test_auth_case_passes_with_configured_profile(fresh_config):
+    issues = Preflight(fresh_config(), LocatorParser()).check_cases([("tests/test_auth.yaml::test_auth", AUTH_CASE)])
+    assert [str(issue) for issue in issues] == []
+
+
+def test_unknown_auth_profile_is_reported(fresh_config):
+    case = dict(AUTH_CASE, auth="defualt")
+    problems = Preflight(fresh_config(), LocatorParser()).check_case(case)
+    assert problems == ["未找到登录配置: auth.profiles.defualt，是否为: default"]
+
+
+def test_failed_preflight_keeps_running_other_tests(tmp_path):
+    env = {key: value for key, value in os.environ.items() if not key.startswith("UI_AUTOMATION_LOGIN_")}
+    env.pop(CONFIG_SNAPSHOT_ENV, None)
+    result = subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", f"--alluredir={tmp_path}",
+         "tests/unit/test_data_generator.py", "tests/test_login.yaml"],
+        cwd=ROOT_DIR, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == pytest.ExitCode.TESTS_FAILED, result.stdout
+    assert "用例预检查发现" in result.stdout
+    assert "passed, 2 errors" in result.stdout
@@ -0,0 +1,38 @@
+from src.page_objects.base_page import BasePage
+
+
+class _Page:
+    def __init__(self):
+        self.calls = []
+
+    def goto(self, url, **options):
+        self.calls.append(("goto", options))
+
+    def wait_for_load_state(self, state, timeout):
+        self.calls.append((state, timeout))
+
+
+class _Locators:
+    version = 1
+
+    def get_page_url(self, page_name):
+        return "/search"
+
+    def get_page_option(self, page_name, option):
+        return None
+
+
+def test_load_waits_with_page_load_timeout(fresh_config):
+    config = fresh_config().with_overrides({"timeout.page_load": 30000, "timeout.element": 5000,
+                                            "readiness.default": {"strategy": "domcontentloaded"}})
+    page = _Page()
+    BasePage(page, _Locators(), config, "search_page").load()
+    assert page.calls == [("goto", {"timeout": 30000, "wait_until": "commit"}), ("domcontentloaded", 30000)]
+
+
+def test_other_events_use_element_timeout(fresh_config):
+    config = fresh_config().with_overrides({"timeout.page_load": 30000, "timeout.element": 5000,
+                                            "readiness.default": {"strategy": "load"}})
+    page = _Page()
+    BasePage(page, _Locators(), config, "search_page").wait_for_page_ready("search")
+    assert page.calls == [("load", 5000)]
@@ -0,0 +1,41 @@
+import pytest
+
+from src.execution_plan import CompiledStep
+from src.test_case_runner import TestCaseRunner
+
+
+class _CrashedTrace:
+    def begin_step(self, description):
+        pass
+
+    def failure_traces(self):
+        raise RuntimeError("Target page, context or browser has been closed")
+
+
+def test_trace_failure_keeps_step_error(fresh_config):
+    runner = TestCaseRunner(None, fresh_config(), object(), artifacts=object(), data=object(), trace=_CrashedTrace())
+    runner.capture_on_failure = False
+    runner.report_steps = False
+
+    def handler(runner, step, args):
+        raise TimeoutError("步骤超时")
+
+    step = CompiledStep("click", "点击", handler, None, None, [], None, {})
+    with pytest.raises(TimeoutError, match="步骤超时"):
+        runner.run_step(step)
+
+
+class _CrashedArtifacts:
+    def capture(self, page, description, locator=None):
+        raise RuntimeError("Target page, context or browser has been closed")
+
+
+def test_screenshot_failure_keeps_step_error(fresh_config):
+    runner = TestCaseRunner(None, fresh_config(), object(), artifacts=_CrashedArtifacts(), data=object())
+    runner.report_steps = False
+
+    def handler(runner, step, args):
+        raise TimeoutError("步骤超时")
+
+    with pytest.raises(TimeoutError, match="步骤超时"):
+        runner.run_step(CompiledStep("click", "点击", handler, None, None, [], None, {}))
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+from src.timing_db import TimingDB, TimingRecorder
+from src.yaml_collector import YamlItem
+
+CASE_ID = "tests/test_login.yaml::test_successful_login"
+
+
+def _yaml_item(nodeid: str) -> YamlItem:
+    # 只用到nodeid，不经过收集流程构造
+    item = object.__new__(YamlItem)
+    item._nodeid = nodeid
+    return item
+
+
+def _run(recorder: TimingRecorder, nodeid: str, duration: float = 1.0) -> None:
+    for when in ("setup", "call", "teardown"):
+        recorder.pytest_runtest_logreport(SimpleNamespace(
+            nodeid=nodeid, when=when, duration=duration, failed=False, skipped=False, user_properties=[],
+        ))
+
+
+def test_recorder_only_records_yaml_cases(tmp_path):
+    db = TimingDB(str(tmp_path / "timings.db"))
+    recorder = TimingRecorder(db, browser="chromium")
+    recorder.pytest_collection_modifyitems([_yaml_item(CASE_ID), SimpleNamespace(nodeid="tests/unit/test_x.py::test_x")])
+    _run(recorder, CASE_ID)
+    _run(recorder, "tests/unit/test_x.py::test_x")
+    assert db.average_durations() == {CASE_ID: 3.0}
+
+
+def test_record_keeps_only_history_window_per_case_and_browser(tmp_path):
+    db = TimingDB(str(tmp_path / "timings.db"), history=3)
+    db.record_retries(CASE_ID, [{"step_index": 1, "step": "点击", "error": "超时", "checkpoint_index": 0,
+                                 "saved_seconds": 1.0}])
+    for duration in range(1, 6):
+        db.record(CASE_ID, float(duration), "passed", browser="chromium")
+    db.record(CASE_ID, 10.0, "passed", browser="firefox")
+
+    rows = db.conn.execute("SELECT browser, duration FROM case_runs ORDER BY id").fetchall()
+    assert rows == [("chromium", 3.0), ("chromium", 4.0), ("chromium", 5.0), ("firefox", 10.0)]
+    assert db.average_durations(browser="chromium", window=10) == {CASE_ID: 4.0}
+    assert db.retry_hotspots() == []
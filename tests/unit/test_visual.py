@@ -0,0 +1,13 @@
+import os
+
+from src.utils.visual import VisualEngine
+
+
+def test_shared_engine_is_per_browser(fresh_config, monkeypatch):
+    monkeypatch.setattr(VisualEngine, "_shared", {})
+    config = fresh_config()
+    chromium = VisualEngine.shared(config)
+    firefox = VisualEngine.shared(config.with_overrides({"browser": "firefox"}))
+    assert os.path.basename(chromium.baseline_dir) == "chromium"
+    assert os.path.basename(firefox.baseline_dir) == "firefox"
+    assert VisualEngine.shared(config) is chromium